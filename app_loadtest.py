@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+Streamlit 앱 부하 테스트 (헤드리스, streamlit.testing.v1.AppTest 기반)
+
+브라우저 없이 한 프로세스 안에서 세션 N개를 흉내 내어 각 세션이 입력을 바꾸고 "계산하기"를 누르고
+내보내기(다운로드 버튼)를 누르는 재실행을 반복합니다. st.cache_resource 등 프로세스 공유 자원은
+실제 서버처럼 모든 세션이 함께 사용합니다.
+
+측정 항목
+- 재실행 지연시간: 동작별(최초 로드 / 로고 업로드 / 입력 변경 / 계산하기 / 다운로드) p50·p90·p95·p99·최대
+- CPU 시간: 재실행 동안의 프로세스 CPU 시간 (동시 실행 중이면 겹친 재실행의 몫도 포함되므로
+  정확한 재실행당 값은 --concurrency 1로 측정)
+- 서버 메모리: 테스트 전후 프로세스 RSS, 세션 전부가 살아 있는 상태에서의 증가분
+- 세션 보관 로고: st.session_state.saved_logo_png를 보관한 세션 수, 참조 합계, 실제 고유 바이트
+  (memlogo 계열은 세션마다 사본을, 멀티페이지 앱은 프로세스 캐시 객체 하나를 공유)
+
+사용 예)
+    python app_loadtest.py --sessions 20 --concurrency 4 --iterations 5 --out loadtest_report.json
+    python app_loadtest.py --app app_streamlit_tax_credit_excel_pro_memlogo_fix.py --baseline old_report.json
+
+보고서(JSON)는 릴리스 간 비교용이며, --baseline을 주면 동작별 p95 변화를 함께 출력합니다.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_APPS = [
+    "pages/2_Pro_보고서.py",
+    "app_streamlit_tax_credit_excel_pro.py",
+    "app_streamlit_tax_credit_excel_pro_memlogo.py",
+    "app_streamlit_tax_credit_excel_pro_memlogo_fix.py",
+]
+PERCENTILES = [50, 90, 95, 99]
+
+# 동작 이름
+ACTION_LOAD = "load"
+ACTION_LOGO = "upload_logo"
+ACTION_INPUT = "change_input"
+ACTION_RUN = "calculate"
+ACTION_DOWNLOAD = "download"
+
+
+# -----------------------------
+# 1) 측정 도구
+# -----------------------------
+
+def _rss_bytes() -> int:
+    """현재 프로세스 RSS (리눅스는 /proc, 그 외는 최대 RSS로 대체)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_logo_png(size: int = 256, seed: int = 0) -> bytes:
+    """압축이 잘 되지 않는 테스트용 PNG (실제 로고 업로드와 비슷한 크기)"""
+    import io
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    img = Image.fromarray(rng.integers(0, 256, (size, size, 3), dtype=np.uint8), "RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class _Recorder:
+    """스레드 안전한 (동작 -> [지연시간], [CPU 시간], 오류 수, 첫 오류 메시지) 집계"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.cpu: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_samples: Dict[str, str] = {}
+
+    def rerun(self, action: str, at: AppTest, step) -> AppTest:
+        """step(at)으로 재실행 1회를 수행하고 지연시간·CPU 시간·예외를 기록"""
+        # 스크립트는 AppTest 내부 스레드에서 실행되므로 스레드 CPU가 아닌 프로세스 CPU로 측정
+        wall, cpu = time.perf_counter(), time.process_time()
+        error = None
+        try:
+            at = step(at)
+            if len(at.exception):
+                error = at.exception[0].value
+        except Exception as e:  # 시간 초과 등 AppTest 자체 오류
+            error = f"{type(e).__name__}: {e}"
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        with self._lock:
+            self.latency[action].append(wall)
+            self.cpu[action].append(cpu)
+            if error is not None:
+                self.errors[action] += 1
+                self.error_samples.setdefault(action, error)
+        return at
+
+
+# -----------------------------
+# 2) 세션 시나리오
+# -----------------------------
+
+def _find(elements, label_part: str):
+    for el in elements:
+        if label_part in el.label:
+            return el
+    return None
+
+
+def run_session(app_path: str, rec: _Recorder, iterations: int, logo_png: Optional[bytes], seed: int, timeout: float) -> AppTest:
+    """
+    세션 1개: 최초 로드 → (로고 업로드) → [입력 변경 → 계산하기 → 다운로드 버튼 전부] × iterations
+    반환한 AppTest는 세션 상태를 붙잡고 있는 "살아 있는 세션"으로 취급합니다.
+    """
+    rnd = random.Random(seed)
+    at = AppTest.from_file(app_path, default_timeout=timeout)
+    at = rec.rerun(ACTION_LOAD, at, lambda a: a.run())
+
+    if logo_png is not None:
+        uploader = _find(at.file_uploader, "로고")
+        if uploader is not None:
+            at = rec.rerun(ACTION_LOGO, at, lambda a: uploader.upload("logo.png", logo_png, "image/png").run())
+
+    for _ in range(iterations):
+        field = _find(at.number_input, "당해 상시근로자 수")
+        if field is not None:
+            value = rnd.randint(40, 120)
+            at = rec.rerun(ACTION_INPUT, at, lambda a: field.set_value(value).run())
+        button = _find(at.button, "계산하기")
+        if button is not None:
+            at = rec.rerun(ACTION_RUN, at, lambda a: button.click().run())
+        for i in range(len(at.download_button)):
+            if i < len(at.download_button):
+                at = rec.rerun(ACTION_DOWNLOAD, at, lambda a: a.download_button[i].click().run())
+    return at
+
+
+def _logo_retention(sessions: List[AppTest]) -> dict:
+    """세션들이 saved_logo_png로 붙잡고 있는 로고 바이트 (참조 합계 / 고유 객체 합계)"""
+    held, unique = 0, {}
+    n = 0
+    for at in sessions:
+        try:
+            logo = at.session_state["saved_logo_png"] if "saved_logo_png" in at.session_state else None
+        except Exception:
+            logo = None
+        if logo:
+            n += 1
+            held += len(logo)
+            unique[id(logo)] = len(logo)
+    return {"sessions_holding": n, "referenced_bytes": held, "unique_bytes": sum(unique.values())}
+
+
+def _summary(values: List[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    arr = np.asarray(values) * 1000.0
+    out = {"count": len(values)}
+    out.update({f"p{p}_ms": round(float(np.percentile(arr, p)), 2) for p in PERCENTILES})
+    out["max_ms"] = round(float(arr.max()), 2)
+    out["mean_ms"] = round(float(arr.mean()), 2)
+    return out
+
+
+def load_test_app(app_path: str, sessions: int, concurrency: int, iterations: int,
+                  logo_png: Optional[bytes], timeout: float = 60.0) -> dict:
+    """앱 1개에 대해 세션 sessions개를 동시 concurrency개씩 실행하고 결과 dict 반환"""
+    # 모듈 import 등 1회성 비용이 메모리 증가분에 섞이지 않도록 측정 전에 한 번 실행
+    AppTest.from_file(app_path, default_timeout=timeout).run()
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    rec = _Recorder()
+    rss_before = _rss_bytes()
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
+        live = list(ex.map(
+            lambda i: run_session(app_path, rec, iterations, logo_png, seed=i, timeout=timeout),
+            range(sessions),
+        ))
+
+    elapsed = time.perf_counter() - started
+    rss_after = _rss_bytes()
+    reruns = sum(len(v) for v in rec.latency.values())
+    return {
+        "app": os.path.relpath(app_path, BASE_DIR),
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "iterations": iterations,
+        "reruns": reruns,
+        "elapsed_s": round(elapsed, 3),
+        "reruns_per_s": round(reruns / elapsed, 2) if elapsed else None,
+        "process_cpu_s": round(time.process_time() - cpu_started, 3),
+        "latency": {a: _summary(v) for a, v in rec.latency.items()},
+        "cpu": {a: _summary(v) for a, v in rec.cpu.items()},
+        "errors": dict(rec.errors),
+        "error_samples": dict(rec.error_samples),
+        "memory": {
+            "rss_before_bytes": rss_before,
+            "rss_after_bytes": rss_after,
+            "rss_growth_bytes": rss_after - rss_before,
+            "rss_growth_per_session_bytes": (rss_after - rss_before) // max(1, sessions),
+            "saved_logo_png": _logo_retention(live),
+        },
+    }
+
+
+# -----------------------------
+# 3) 보고서
+# -----------------------------
+
+def _print_app(result: dict, baseline: Optional[dict]) -> None:
+    mem = result["memory"]
+    logo = mem["saved_logo_png"]
+    print(f"\n## {result['app']}")
+    print(f"세션 {result['sessions']} (동시 {result['concurrency']}), 재실행 {result['reruns']}회, "
+          f"{result['elapsed_s']}s ({result['reruns_per_s']}회/s), 프로세스 CPU {result['process_cpu_s']}s")
+    print(f"RSS 증가 {mem['rss_growth_bytes'] / 1e6:.1f}MB (세션당 {mem['rss_growth_per_session_bytes'] / 1e3:.0f}KB), "
+          f"saved_logo_png: 세션 {logo['sessions_holding']}개, 참조 {logo['referenced_bytes'] / 1e3:.0f}KB, "
+          f"고유 {logo['unique_bytes'] / 1e3:.0f}KB")
+    for action, count in result["errors"].items():
+        print(f"오류 {action} {count}회: {result['error_samples'].get(action)}")
+
+    print("| 동작 | 횟수 | p50 | p90 | p95 | p99 | 최대 | CPU p50 | p95 변화 |")
+    print("|---|---:|---:|---:|---:|---:|---:|---:|---:|")
+    for action, lat in result["latency"].items():
+        delta = ""
+        if baseline is not None:
+            old = baseline.get("latency", {}).get(action, {}).get("p95_ms")
+            if old:
+                delta = f"{(lat['p95_ms'] - old) / old * 100:+.0f}%"
+        cpu = result["cpu"][action]
+        print(f"| {action} | {lat['count']} | {lat['p50_ms']} | {lat['p90_ms']} | {lat['p95_ms']} "
+              f"| {lat['p99_ms']} | {lat['max_ms']} | {cpu['p50_ms']} | {delta} |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamlit 앱 헤드리스 부하 테스트 (AppTest)")
+    parser.add_argument("--app", action="append", default=None, help="대상 앱 스크립트 (여러 번 지정 가능, 기본: Pro 계열 전부)")
+    parser.add_argument("--sessions", type=int, default=10, help="흉내 낼 세션 수")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시에 재실행하는 세션 수 (스레드)")
+    parser.add_argument("--iterations", type=int, default=3, help="세션당 입력 변경 → 계산 → 다운로드 반복 횟수")
+    parser.add_argument("--logo", default=None, help="업로드할 로고 파일 (기본: 256×256 테스트 PNG, 'none'이면 생략)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="재실행 1회 시간 제한(초)")
+    parser.add_argument("--out", default="loadtest_report.json", help="보고서(JSON) 저장 경로")
+    parser.add_argument("--baseline", default=None, help="비교할 이전 보고서(JSON)")
+    args = parser.parse_args()
+
+    # 헤드리스 실행 시 반복되는 ScriptRunContext 경고 등 억제 (앱 예외는 보고서에 집계)
+    # (AppTest가 실행마다 streamlit 로거 수준을 설정 값으로 되돌리므로 logging 단에서 차단)
+    logging.disable(logging.ERROR)
+
+    if args.logo == "none":
+        logo_png = None
+    elif args.logo:
+        with open(args.logo, "rb") as f:
+            logo_png = f.read()
+    else:
+        logo_png = make_logo_png()
+
+    apps = [os.path.join(BASE_DIR, a) if not os.path.isabs(a) else a for a in (args.app or DEFAULT_APPS)]
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {r["app"]: r for r in json.load(f)["apps"]}
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "streamlit": st.__version__,
+        "cpu_count": os.cpu_count(),
+        "logo_bytes": len(logo_png) if logo_png else 0,
+        "apps": [],
+    }
+    for app in apps:
+        result = load_test_app(app, args.sessions, args.concurrency, args.iterations, logo_png, args.timeout)
+        report["apps"].append(result)
+        _print_app(result, baseline.get(result["app"]) if args.baseline else None)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n보고서 저장: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+통합고용세액공제 멀티페이지 앱(streamlit_app.py + pages/)의 공용 구성요소
+
+여러 앱 스크립트에 복사되어 있던 데모 파라미터, 파라미터 로더, 입력 위젯, 로고 처리를 모았습니다.
+st.cache_resource로 감싼 자원은 서버 프로세스 전체에서 한 번만 만들어 모든 세션·페이지가 공유합니다.
+- 정책 파라미터: 파일 내용(바이트)별로 1회 검증·컴파일
+- 로고: 내용별로 1회 PNG 변환 (같은 로고를 올린 세션들은 같은 바이트 객체를 공유)
+- 엑셀 서식: employment_tax_credit_report.report_styles (프로세스당 1회)
+- 백그라운드 작업 실행기: 작업·결과물을 만료 전까지 보관 (세션별로는 작업 ID만 보관)
+"""
+
+from __future__ import annotations
+import json
+import os
+import re
+import uuid
+from contextlib import nullcontext
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from employment_tax_credit_calc import (
+    CompanySize, Region, HeadcountInputs, PolicyParameters, ClawbackTiers, load_params_from_bytes,
+)
+from employment_tax_credit_batch import CompiledPolicy, compile_policy, calc_clawback_array
+from employment_tax_credit_jobs import JobRunner
+from employment_tax_credit_ledger import ClientLedger
+from employment_tax_credit_memprof import MemoryProfiler, enabled_from_env, profiled_stage, profiling
+from employment_tax_credit_region import load_region_resolver
+from employment_tax_credit_report import normalize_logo
+
+
+# 데모용 기본 파라미터 (policy_params_example.json과 동일)
+DEMO_POLICY_CONFIG = {
+    "per_head_basic": {
+        "중소기업": {"수도권": 1200000, "지방": 1300000},
+        "중견기업": {"수도권": 900000, "지방": 1000000},
+        "대기업":   {"수도권": 600000, "지방": 700000}
+    },
+    "per_head_youth": {
+        "중소기업": {"수도권": 1500000, "지방": 1600000},
+        "중견기업": {"수도권": 1100000, "지방": 1200000},
+        "대기업":   {"수도권": 800000,  "지방": 900000}
+    },
+    "per_head_conversion": 800000,
+    "per_head_return_from_parental": 800000,
+    "retention_years": {"중소기업": 3, "중견기업": 3, "대기업": 2},
+    "max_credit_total": None,
+    "min_tax_limit_rate": 0.07,
+    "excluded_industries": ["유흥주점업", "기타소비성서비스업"],
+    "excluded_industry_codes": ["56211", "56212", "91291"]
+}
+DEMO_POLICY_BYTES = json.dumps(DEMO_POLICY_CONFIG, ensure_ascii=False, sort_keys=True).encode("utf-8")
+
+# 한글 ↔ 내부 코드 매핑
+CLAWBACK_OPTIONS = {
+    "비례 추징 (감소율만큼)": "proportional",
+    "전액 추징 (감소 발생 시 전체)": "all_or_nothing",
+    "구간 추징 (감소율 구간별 단계)": "tiered"
+}
+
+
+# -----------------------------
+# 프로세스 공유 캐시
+# -----------------------------
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def load_policy(raw: bytes) -> Tuple[PolicyParameters, CompiledPolicy]:
+    """정책 JSON 바이트 -> (PolicyParameters, CompiledPolicy). 검증 실패 시 PolicyValidationError"""
+    params = load_params_from_bytes(raw)
+    return params, compile_policy(params)
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def load_logo(raw: bytes) -> bytes:
+    """업로드 로고 -> 엑셀 삽입용 PNG 바이트"""
+    return normalize_logo(raw)
+
+
+# 원장 DB는 서버 설정 디렉터리 안에만 만들고, 화면에서는 파일 이름(확장자 제외)만 고름
+LEDGER_DIR_ENV = "TAX_CREDIT_LEDGER_DIR"
+LEDGER_SUFFIX = ".sqlite3"
+_LEDGER_NAME = re.compile(r"^[0-9A-Za-z가-힣_-]{1,64}$")
+
+
+def ledger_dir() -> str:
+    """원장 DB 디렉터리 (환경변수 TAX_CREDIT_LEDGER_DIR, 기본값: 현재 디렉터리의 ledgers/)"""
+    return os.path.abspath(os.environ.get(LEDGER_DIR_ENV) or "ledgers")
+
+
+def ledger_names() -> list:
+    """원장 디렉터리에 있는 원장 이름 목록"""
+    try:
+        files = os.listdir(ledger_dir())
+    except FileNotFoundError:
+        return []
+    return sorted(f[:-len(LEDGER_SUFFIX)] for f in files
+                  if f.endswith(LEDGER_SUFFIX) and _LEDGER_NAME.match(f[:-len(LEDGER_SUFFIX)]))
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def open_ledger(name: str) -> ClientLedger:
+    """
+    고객 원장 DB 연결 (이름별 1개를 모든 세션이 공유, 내부 잠금으로 직렬화)
+    - name은 원장 디렉터리 안의 파일 이름(확장자 제외)만 허용. 경로 구분자·상위 디렉터리 지정은 ValueError
+    """
+    if not _LEDGER_NAME.match(name):
+        raise ValueError(f"원장 이름은 한글·영문·숫자·_·- 64자 이내로 입력하세요: {name!r}")
+    return ClientLedger(os.path.join(ledger_dir(), name + LEDGER_SUFFIX))
+
+
+@st.cache_resource(show_spinner=False)
+def job_runner() -> JobRunner:
+    """백그라운드 작업 실행기 (서버 프로세스당 1개, 세션·재실행과 무관하게 작업과 결과물 보관)"""
+    return JobRunner(workers=1)
+
+
+def session_owner() -> str:
+    """현재 브라우저 세션의 작업 소유자 ID (세션 상태에 한 번 만들어 재실행 간 유지)"""
+    if "job_owner" not in st.session_state:
+        st.session_state.job_owner = uuid.uuid4().hex
+    return st.session_state.job_owner
+
+
+# -----------------------------
+# 사이드바 / 입력 위젯
+# -----------------------------
+
+def policy_sidebar(header: str = "1) 정책 파라미터") -> Optional[PolicyParameters]:
+    """파라미터 JSON 업로드 또는 데모 파라미터 선택 -> PolicyParameters (없으면 None)"""
+    st.header(header)
+    uploaded = st.file_uploader("시행령 기준 파라미터 JSON 업로드", type=["json"], accept_multiple_files=False)
+    default_info = st.toggle("예시 파라미터 사용 (업로드 없을 때)", value=True)
+
+    if uploaded is not None:
+        try:
+            params, _ = load_policy(uploaded.getvalue())
+            st.success("업로드한 파라미터를 불러왔습니다.")
+            return params
+        except Exception as e:
+            st.error(f"파라미터 로딩 실패: {e}")
+            return None
+    if default_info:
+        params, _ = load_policy(DEMO_POLICY_BYTES)
+        st.info("예시 파라미터를 사용 중입니다. (업로드 시 자동 대체)")
+        return params
+    return None
+
+
+def company_sidebar(header: str) -> Tuple[CompanySize, Region]:
+    st.header(header)
+    size_label = st.selectbox("기업규모", [s.value for s in CompanySize], index=0, help="중소/중견/대기업 선택")
+    location = st.text_input("사업장 주소 또는 행정구역 코드 (선택)", help="입력하면 아래 지역을 수도권/지방으로 자동 선택합니다.")
+    detected = None
+    if location.strip():
+        resolver = load_region_resolver()
+        is_code = location.replace("-", "").strip().isdigit()
+        detected = resolver.resolve(location, None) if is_code else resolver.resolve(None, location)
+        if detected is None:
+            st.caption("주소/코드로 지역을 판정하지 못했습니다. 직접 선택하세요.")
+    regions = list(Region)
+    region_label = st.selectbox(
+        "지역", [r.value for r in regions], index=regions.index(detected) if detected else 1, help="사업장 소재지 기준"
+    )
+    return CompanySize(size_label), Region(region_label)
+
+
+def clawback_method_select() -> str:
+    selected_label = st.selectbox(
+        "추징 방식 선택",
+        list(CLAWBACK_OPTIONS.keys()),
+        index=0,
+        help="감소율에 따라 추징액을 계산하는 방식을 선택합니다."
+    )
+    return CLAWBACK_OPTIONS[selected_label]
+
+
+def report_options_sidebar(header: str = "2) 보고서 옵션") -> Tuple[str, Optional[bytes]]:
+    """
+    회사/기관명 + 로고 입력 -> (회사명, PNG 로고 바이트 또는 None)
+    - "계속 사용"을 선택하면 세션에 저장하여 다음 실행에도 재사용합니다.
+      (세션에는 프로세스 캐시의 PNG 객체를 가리키는 참조만 저장)
+    """
+    if "saved_logo_png" not in st.session_state:
+        st.session_state.saved_logo_png = None
+    if "saved_company_name" not in st.session_state:
+        st.session_state.saved_company_name = None
+
+    st.header(header)
+    company_name = st.text_input("회사/기관명 (머리글용)", value=st.session_state.saved_company_name or "(기관명)")
+    logo_file = st.file_uploader("회사 로고 (PNG/JPG)", type=["png", "jpg", "jpeg"], accept_multiple_files=False)
+    remember = st.checkbox("이 로고를 계속 사용(세션에 저장)", value=True, help="브라우저 새로고침/재실행 시에도 유지됩니다. 앱/서버 재시작 시에는 초기화될 수 있습니다.")
+
+    logo_png = None
+    if logo_file is not None:
+        try:
+            logo_png = load_logo(logo_file.getvalue())
+        except Exception as e:
+            st.warning(f"로고를 읽을 수 없습니다: {e}")
+        if remember:
+            st.session_state.saved_logo_png = logo_png
+    elif st.session_state.saved_logo_png is not None:
+        logo_png = st.session_state.saved_logo_png
+
+    if company_name and remember:
+        st.session_state.saved_company_name = company_name
+    return company_name or "(기관명)", logo_png
+
+
+def headcount_inputs() -> Tuple[HeadcountInputs, Optional[int]]:
+    """고용 인원 + 세전세액 입력 -> (HeadcountInputs, tax_before_credit 또는 None)"""
+    st.header("고용 인원 입력")
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        prev_total = st.number_input("전년 상시근로자 수", min_value=0, value=50, step=1)
+        prev_youth = st.number_input("전년 청년등 상시근로자 수", min_value=0, value=10, step=1)
+    with col2:
+        curr_total = st.number_input("당해 상시근로자 수", min_value=0, value=60, step=1)
+        curr_youth = st.number_input("당해 청년등 상시근로자 수", min_value=0, value=14, step=1)
+    with col3:
+        converted_regular = st.number_input("정규직 전환 인원 (해당연도)", min_value=0, value=2, step=1)
+        returned_parental = st.number_input("육아휴직 복귀 인원 (해당연도)", min_value=0, value=1, step=1)
+
+    st.header("세액 한도/최저한세 옵션")
+    tax_before_credit = st.number_input(
+        "세전세액(최저한세 적용 시 필요)",
+        min_value=0, value=120_000_000, step=1,
+        help="입력하지 않으면 최저한세 한도는 적용하지 않습니다."
+    )
+    heads = HeadcountInputs(
+        prev_total=int(prev_total),
+        curr_total=int(curr_total),
+        prev_youth=int(prev_youth),
+        curr_youth=int(curr_youth),
+        converted_regular=int(converted_regular),
+        returned_from_parental_leave=int(returned_parental),
+    )
+    return heads, (int(tax_before_credit) if tax_before_credit else None)
+
+
+# -----------------------------
+# 다년 추징표 편집기
+# -----------------------------
+
+@profiled_stage("schedule_build")
+def clawback_schedule_frame(
+    edited: pd.DataFrame,
+    credit_applied: int,
+    base_headcount_at_credit: int,
+    retention_years: int,
+    method: str,
+    tiers: Optional[ClawbackTiers] = None,
+    state_key: str = "_clawback_schedule_prev",
+) -> pd.DataFrame:
+    """
+    data_editor로 편집한 (연차, 사후연도 인원) 표 -> 추징세액 열을 붙여 연차순으로 정렬한 표
+    - 행 단위 루프 대신 calc_clawback_array로 열 전체를 한 번에 계산합니다.
+    - 직전 실행의 입력/결과를 세션에 보관해 두고, 공제액·방식이 같으면 값이 바뀐 행만 다시 계산합니다.
+    - 빈 칸이 있는 행(동적으로 막 추가한 행 등)은 제외합니다.
+    - tiers: 정책의 구간 추징표 (params.clawback_tiers, tiered 방식에서 사용)
+    """
+    frame = edited[["연차", "사후연도 인원"]].apply(pd.to_numeric, errors="coerce").dropna()
+    years = frame["연차"].to_numpy(dtype=np.int64)
+    followups = frame["사후연도 인원"].to_numpy(dtype=np.int64)
+    signature = (int(credit_applied), int(base_headcount_at_credit), int(retention_years), method, tiers)
+
+    prev = st.session_state.get(state_key)
+    if prev is not None and prev["signature"] == signature and len(prev["years"]) == len(years):
+        changed = (prev["years"] != years) | (prev["followups"] != followups)
+        amounts = prev["amounts"].copy()
+    else:
+        changed = np.ones(len(years), dtype=bool)
+        amounts = np.zeros(len(years), dtype=np.int64)
+
+    if changed.any():
+        amounts[changed] = calc_clawback_array(
+            credit_applied, base_headcount_at_credit, followups[changed],
+            retention_years, years[changed], method, tiers=tiers,
+        )
+    st.session_state[state_key] = {
+        "signature": signature, "years": years, "followups": followups, "amounts": amounts,
+    }
+
+    order = np.argsort(years, kind="stable")
+    return pd.DataFrame({
+        "연차": years[order],
+        "사후연도 인원": followups[order],
+        "추징세액": amounts[order],
+    })
+
+
+# -----------------------------
+# 메모리 진단 (TAX_CREDIT_MEMPROF=1 일 때만)
+# -----------------------------
+
+def memprof_session():
+    """진단 모드면 tracemalloc 진단 세션, 아니면 None을 내주는 빈 context manager"""
+    return profiling() if enabled_from_env() else nullcontext()
+
+
+def memprof_panel(prof: Optional[MemoryProfiler]) -> None:
+    """단계별 최대 메모리·상위 할당 위치 표 (진단 세션이 없거나 측정된 단계가 없으면 표시하지 않음)"""
+    if prof is None or not prof.stages:
+        return
+    with st.expander("메모리 진단 (tracemalloc)", expanded=False):
+        st.caption(
+            "단계 시작 대비 최대 추가 메모리와 할당 위치 상위 목록입니다. 추적 중에는 계산이 느려집니다. "
+            "공유 캐시에 있는 자원(정책 파라미터·로고)은 처음 불러올 때만 측정됩니다."
+        )
+        st.dataframe(pd.DataFrame(prof.records()), use_container_width=True, hide_index=True)
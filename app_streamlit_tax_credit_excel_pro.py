@@ -15,8 +15,9 @@ from openpyxl.drawing.image import Image as XLImage
 from employment_tax_credit_calc import (
     CompanySize, Region, HeadcountInputs,
     load_params_from_json, calc_gross_credit,
-    apply_caps_and_min_tax, calc_clawback, PolicyParameters
+    apply_caps_and_min_tax, PolicyParameters
 )
+from app_shared import clawback_schedule_frame
 
 st.set_page_config(page_title="통합고용세액공제 계산기 (Pro)", layout="wide")
 
@@ -119,6 +120,10 @@ st.divider()
 run = st.button("계산하기", type="primary", disabled=(params is None))
 
 if run:
+    # 계산 후에는 추징표 편집 등으로 재실행되어도 결과를 계속 표시
+    st.session_state.calculated = True
+
+if run or st.session_state.get("calculated"):
     if params is None:
         st.error("파라미터(JSON)를 먼저 불러오세요.")
     else:
@@ -151,25 +156,11 @@ if run:
             # 기본값은 매년 1명 감소(예시)
             init_rows.append({"연차": yr, "사후연도 인원": max(0, int(curr_total) - yr)})
         edited = st.data_editor(pd.DataFrame(init_rows), num_rows="dynamic")
-        # 계산
-        schedule = []
-        for _, row in edited.iterrows():
-            yidx = int(row["연차"])
-            fol = int(row["사후연도 인원"])
-            claw = calc_clawback(
-                credit_applied=int(applied),
-                base_headcount_at_credit=int(curr_total),
-                headcount_in_followup_year=fol,
-                retention_years_for_company=int(retention_years),
-                year_index_from_credit=yidx,
-                method=clawback_method,
-            )
-            schedule.append({
-                "연차": yidx,
-                "사후연도 인원": fol,
-                "추징세액": int(claw)
-            })
-        schedule_df = pd.DataFrame(schedule).sort_values("연차").reset_index(drop=True)
+        # 추징표 계산 (열 단위 일괄 계산, 바뀐 행만 재계산)
+        schedule_df = clawback_schedule_frame(
+            edited, int(applied), int(curr_total), int(retention_years), clawback_method, params.clawback_tiers,
+        )
+        schedule = schedule_df.to_dict("records")
         st.dataframe(schedule_df, use_container_width=True)
         total_clawback = int(schedule_df["추징세액"].sum())
         st.metric("추징세액 합계", f"{total_clawback:,} 원")
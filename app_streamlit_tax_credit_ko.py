@@ -150,6 +150,7 @@ if run:
             retention_years_for_company=retention_years,
             year_index_from_credit=int(clawback_year_index),
             method=clawback_method,
+            tiers=params.clawback_tiers,
         )
         st.metric("추징세액", f"{clawback:,} 원")
         st.caption("※ 감소율·방식(비례/전액/구간)에 따라 상이합니다.")
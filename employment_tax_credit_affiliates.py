@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+관계기업 묶음(지분 관계 그래프) -> 묶음 단위 인원·재무 합산 -> 기업규모 판정 입력
+
+기업규모 판정(employment_tax_credit_size)은 관계기업 합산분(affiliate_revenue / affiliate_assets)을 더해
+판정하지만, 지금까지는 이 값을 사용자가 직접 계산해 넣어야 했습니다. 고객 마스터의 지분 관계는
+(소유 기업, 피소유 기업[, 지분율]) 간선 표로 관리되므로, 이 모듈은 간선 표에 union-find를 돌려 관계기업
+묶음을 만들고 묶음별로 인원·재무를 배열 합산해 규모 판정 입력 열을 채웁니다.
+
+- 묶음 구성: 간선마다 union (크기 기준 합치기 + 경로 절반 압축, 간선 수에 거의 선형)
+  포트폴리오에 없는 지주회사 등도 묶음을 잇는 마디로 포함합니다 (재무 자료는 0으로 봄).
+- min_share: 간선 표에 share 열(지분율, 0~1 또는 %)이 있으면 이 값 이상인 간선만 사용
+- 합산: 묶음 번호로 np.bincount — 관계기업 합산분 = 묶음 합계 - 자기 금액
+- large_group(상호출자제한기업집단)은 묶음 안에 한 곳이라도 있으면 묶음 전체에 적용
+
+채우는 열: affiliate_group(묶음 대표 = 묶음 안 가장 작은 company_id), affiliate_count,
+           affiliate_revenue, affiliate_assets, affiliate_headcount, large_group
+(묶음에 다른 기업이 없는 행은 입력값을 그대로 둡니다. company_id가 빈 행은 묶지 않고
+ affiliate_group을 빈 값, affiliate_count를 0으로 둡니다)
+
+사용 예)
+    df = fill_company_sizes(fill_affiliates(df, edges))   # 묶음 합산 후 규모 판정
+
+    python employment_tax_credit_affiliates.py portfolio.csv --edges ownership.csv --out portfolio_grouped.csv
+"""
+
+from __future__ import annotations
+import argparse
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from employment_tax_credit_batch import CSV_DTYPES
+from employment_tax_credit_size import fill_company_sizes, parse_flags
+
+
+EDGE_COLUMNS = ("parent_id", "child_id")
+SHARE_COLUMN = "share"
+# 묶음별로 합산하는 열 (포트폴리오 열 -> 관계기업 합산분 열)
+SUM_COLUMNS = {"revenue": "affiliate_revenue", "assets": "affiliate_assets", "headcount": "affiliate_headcount"}
+
+
+class UnionFind:
+    """0..n-1 정수 마디의 서로소 집합 (크기 기준 합치기 + 경로 절반 압축)"""
+
+    def __init__(self, n: int):
+        self.parent: List[int] = list(range(n))
+        self.size: List[int] = [1] * n
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+
+    def union_all(self, left: np.ndarray, right: np.ndarray) -> None:
+        # 반복문 안의 속성 조회를 줄이려고 지역 변수로 묶어 둠 (간선 수십만 개 기준)
+        parent, size = self.parent, self.size
+        for a, b in zip(left.tolist(), right.tolist()):
+            while parent[a] != a:
+                parent[a] = parent[parent[a]]
+                a = parent[a]
+            while parent[b] != b:
+                parent[b] = parent[parent[b]]
+                b = parent[b]
+            if a == b:
+                continue
+            if size[a] < size[b]:
+                a, b = b, a
+            parent[b] = a
+            size[a] += size[b]
+
+    def roots(self) -> np.ndarray:
+        """마디별 대표 마디 배열"""
+        return np.fromiter((self.find(x) for x in range(len(self.parent))), dtype=np.int64, count=len(self.parent))
+
+
+def _share_mask(edges: pd.DataFrame, min_share: Optional[float]) -> np.ndarray:
+    if min_share is None or SHARE_COLUMN not in edges.columns:
+        return np.ones(len(edges), dtype=bool)
+    share = pd.to_numeric(edges[SHARE_COLUMN], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    # 1보다 큰 값은 %로 입력된 것으로 봄
+    share = np.where(share > 1, share / 100.0, share)
+    threshold = min_share / 100.0 if min_share > 1 else min_share
+    return share >= threshold
+
+
+def _blank_ids(values: pd.Series) -> np.ndarray:
+    """빈 ID(NaN·공백 문자열) mask"""
+    text = values.astype("string").str.strip()
+    return (text.isna() | (text == "")).to_numpy(dtype=bool)
+
+
+def affiliate_groups(
+    company_ids: pd.Series,
+    edges: pd.DataFrame,
+    min_share: Optional[float] = None,
+) -> pd.DataFrame:
+    """
+    company_id 열 + 간선 표 -> 행별 (affiliate_group, affiliate_count) DataFrame (입력 index 유지)
+    - 간선 표 열: parent_id, child_id[, share]  (빈 ID가 있는 간선은 무시)
+    - company_id가 빈 행은 어느 묶음에도 넣지 않음 (affiliate_group 빈 값, affiliate_count 0)
+    """
+    missing = [c for c in EDGE_COLUMNS if c not in edges.columns]
+    if missing:
+        raise ValueError(f"간선 표에 필요한 열이 없습니다: {missing}")
+    edges = edges.loc[
+        _share_mask(edges, min_share) & ~_blank_ids(edges["parent_id"]) & ~_blank_ids(edges["child_id"])
+    ]
+    blank = _blank_ids(company_ids)
+    ids = company_ids[~blank].astype(str).str.strip()
+    nodes = pd.concat(
+        [ids, edges["parent_id"].astype(str).str.strip(), edges["child_id"].astype(str).str.strip()], ignore_index=True,
+    )
+    codes, uniques = pd.factorize(nodes)
+    n, m = len(ids), len(edges)
+
+    uf = UnionFind(len(uniques))
+    uf.union_all(codes[n:n + m], codes[n + m:])
+    roots = uf.roots()
+
+    # 묶음 대표 = 묶음 안 가장 작은 company_id (실행마다 같은 값이 나오도록)
+    names = np.asarray(uniques, dtype=object)
+    order = np.argsort(names.astype(str), kind="stable")
+    rank = np.empty(len(names), dtype=np.int64)
+    rank[order] = np.arange(len(names))
+    lowest = np.full(len(names), len(names), dtype=np.int64)
+    np.minimum.at(lowest, roots, rank)
+    labels = names[order[lowest[roots]]]
+    row_roots = roots[codes[:n]]
+    # 포트폴리오 안에서 같은 묶음에 속한 기업 수 (같은 company_id 중복 행은 한 번만)
+    first = ~pd.Series(codes[:n]).duplicated().to_numpy()
+    count = np.bincount(row_roots[first], minlength=len(uniques))[row_roots]
+    group = np.full(len(company_ids), np.nan, dtype=object)
+    group[~blank] = labels[codes[:n]]
+    counts = np.zeros(len(company_ids), dtype=np.int64)
+    counts[~blank] = count
+    return pd.DataFrame({"affiliate_group": group, "affiliate_count": counts}, index=company_ids.index)
+
+
+def fill_affiliates(
+    df: pd.DataFrame,
+    edges: pd.DataFrame,
+    min_share: Optional[float] = None,
+) -> pd.DataFrame:
+    """
+    포트폴리오 + 간선 표 -> 관계기업 묶음·합산분 열을 채운 DataFrame (입력은 변경하지 않음)
+    - 묶음 합계는 기업별 1행 기준 (같은 company_id의 중복 행은 첫 행만 합산)
+    - headcount 열이 없으면 curr_total로 인원을 합산
+    """
+    groups = affiliate_groups(df["company_id"], edges, min_share)
+    # 빈 ID 행은 factorize 번호 -1 -> 묶음 합계에서 빼고(shared=False) 자기 입력값을 그대로 둠
+    group_codes, _ = pd.factorize(groups["affiliate_group"])
+    grouped = group_codes >= 0
+    n_groups = group_codes.max() + 1 if grouped.any() else 0
+    first = grouped & ~df["company_id"].astype(str).duplicated().to_numpy()
+    shared = groups["affiliate_count"].to_numpy() > 1
+    safe_codes = np.where(grouped, group_codes, 0)
+
+    out = df.assign(affiliate_group=groups["affiliate_group"], affiliate_count=groups["affiliate_count"])
+    for column, target in SUM_COLUMNS.items():
+        source = column if column in df.columns else ("curr_total" if column == "headcount" else None)
+        if source is None or source not in df.columns:
+            continue
+        own = pd.to_numeric(df[source], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        own0 = np.where(np.isnan(own), 0.0, own)
+        totals = np.bincount(group_codes[first], weights=own0[first], minlength=n_groups)
+        others = totals[safe_codes] - own0 if n_groups else own0
+        current = (
+            pd.to_numeric(df[target], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            if target in df.columns else np.full(len(df), np.nan)
+        )
+        out[target] = np.where(shared, others, current)
+
+    if "large_group" in df.columns:
+        # 알 수 없는 값은 묶음에 대기업집단이 없으면 원래 값을 그대로 남김 (규모 판정 단계에서 미판정 처리)
+        flag, unknown = parse_flags(df["large_group"])
+        any_large = np.bincount(group_codes[grouped], weights=flag[grouped], minlength=n_groups) > 0
+        large = flag | (grouped & any_large[safe_codes] if n_groups else flag)
+        out["large_group"] = np.where(unknown & ~large, df["large_group"].to_numpy(dtype=object), large)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="관계기업 묶음 합산 후 기업규모 판정")
+    parser.add_argument("portfolio_csv", help="기업 목록 CSV (company_id, revenue, assets, headcount 등)")
+    parser.add_argument("--edges", required=True, help="지분 관계 간선 CSV (parent_id, child_id[, share])")
+    parser.add_argument("--min-share", type=float, default=None, help="이 지분율 이상인 간선만 사용 (예: 0.3 또는 30)")
+    parser.add_argument("--year", type=int, default=None, help="기업규모 기준표 적용 연도")
+    parser.add_argument("--out", default="portfolio_grouped.csv", help="결과 CSV 경로")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.portfolio_csv, dtype=CSV_DTYPES)
+    edges = pd.read_csv(args.edges, dtype={"parent_id": str, "child_id": str})
+    try:
+        grouped = fill_company_sizes(fill_affiliates(df, edges, args.min_share), year=args.year)
+    except ValueError as e:
+        parser.error(str(e))
+    grouped.to_csv(args.out, index=False, encoding="utf-8-sig")
+
+    multi = grouped.loc[grouped["affiliate_count"] > 1, "affiliate_group"]
+    print(f"간선 {len(edges):,}개 -> 관계기업 묶음 {multi.nunique():,}개 ({len(multi):,}개사)")
+    if "company_size" in grouped.columns:
+        counts = grouped["company_size"].value_counts()
+        print("기업규모: " + " / ".join(f"{k} {v:,}" for k, v in counts.items()))
+    print(f"결과: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+통합고용세액공제 경정청구(최근 5년) 누락 공제 일괄 탐색
+
+과거 연도에 받지 못한 공제를 찾으려면 기업·연도마다 그 해의 법령 단가로 계산기를 다시 돌려야 했습니다.
+이 모듈은 연도별 인원 이력과 연도별 정책 파일 폴더를 받아, 모든 기업 × 경정청구 가능 연도 × 연속 연도 쌍
+(직전 연도 → 해당 연도)을 한 번에 계산하고, 이미 공제받은 금액을 뺀 미청구 공제액을 기업·연도별로 돌려줍니다.
+
+- 연도 쌍 구성: 기업·연도순으로 정렬한 뒤 한 칸씩 민 열(shift)로 직전 연도 값을 붙입니다.
+  직전 연도 자료가 없는(연도가 이어지지 않는) 행은 계산 대상에서 빠집니다.
+- 계산: 연도마다 그 해 정책으로 calc_portfolio (검증·제외 업종·최저한세 포함) — 연도×행 묶음 단위로
+  작업자 프로세스 여러 개에 나누어 실행합니다.
+- 기업규모·지역이 비어 있으면 employment_tax_credit_size / employment_tax_credit_region으로 채웁니다.
+
+입력
+- 인원 이력 (연도별 1행): company_id, year, total, youth(선택), company_size, region,
+  converted_regular, returned_from_parental_leave, tax_before_credit, industry_code (선택) 등
+  (ClientLedger.headcount_history와 같은 형식)
+- 정책 폴더: 파일명에 연도 4자리가 들어간 정책 JSON (예: policies/2021.json, policy_2022.json)
+- 기존 공제 내역 (선택): company_id, credit_year, applied_credit (원장 credits 표 형식)
+
+사용 예)
+    python employment_tax_credit_backfill.py history.csv --policy-dir policies/ --as-of 2025 --out backfill.csv
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from employment_tax_credit_calc import PolicyParameters, load_params_from_dict, load_params_from_json, params_to_dict
+from employment_tax_credit_batch import CSV_DTYPES, ERROR_COLUMNS, RULE_MISSING, calc_portfolio
+from employment_tax_credit_metrics import BATCH_ROWS, BATCH_SECONDS, add_metrics_argument, dump_metrics
+from employment_tax_credit_region import fill_regions
+from employment_tax_credit_size import FINANCIAL_COLUMNS, fill_company_sizes, first_threshold_year
+
+
+DEFAULT_LOOKBACK_YEARS = 5
+DEFAULT_CHUNK_ROWS = 20_000
+# 직전 연도 쌍으로 옮길 열 (이력 열 -> calc_portfolio 입력 열)
+_PAIR_COLUMNS = {"total": "curr_total", "youth": "curr_youth"}
+_PREV_COLUMNS = {"total": "prev_total", "youth": "prev_youth"}
+RESULT_COLUMNS = [
+    "company_id", "year", "gross_credit", "applied_credit", "claimed_credit", "unclaimed_credit", "retention_years",
+]
+
+# 재무 자료로 규모를 판정해야 하는데 그 연도에 적용할 기업규모 기준표가 없는 연도 쌍
+RULE_NO_SIZE_THRESHOLDS = "no_size_thresholds"
+
+_YEAR_IN_NAME = re.compile(r"(?<!\d)(19|20)\d{2}(?!\d)")
+
+
+# -----------------------------
+# 1) 입력 준비
+# -----------------------------
+
+def load_policy_dir(path: str) -> Dict[int, PolicyParameters]:
+    """정책 폴더 -> {연도: PolicyParameters} (파일명에서 연도를 읽고, 검증 실패 시 PolicyValidationError)"""
+    policies: Dict[int, PolicyParameters] = {}
+    for name in sorted(os.listdir(path)):
+        m = _YEAR_IN_NAME.search(name)
+        if m is None or not name.lower().endswith(".json"):
+            continue
+        year = int(m.group(0))
+        if year in policies:
+            raise ValueError(f"{year}년 정책 파일이 둘 이상입니다: {name}")
+        policies[year] = load_params_from_json(os.path.join(path, name))
+    return policies
+
+
+def year_pairs(history: pd.DataFrame) -> pd.DataFrame:
+    """
+    연도별 인원 이력 -> 연속 연도 쌍 (year 행에 직전 연도 인원을 prev_* 열로 붙임)
+    - 직전 연도 행이 없는 행은 제외합니다.
+    - youth 열이 없으면 0으로 봅니다. 열은 있는데 값이 빈 칸은 그대로 NaN으로 둡니다
+      (0으로 채우면 없던 청년 증가가 생기므로 scan_backfill에서 누락 오류로 보고)
+    """
+    missing = [c for c in ("company_id", "year", "total") if c not in history.columns]
+    if missing:
+        raise ValueError(f"필수 열이 없습니다: {', '.join(missing)}")
+    df = history.sort_values(["company_id", "year"], kind="stable").reset_index(drop=True)
+    if "youth" not in df.columns:
+        df["youth"] = 0
+    same = df["company_id"].eq(df["company_id"].shift(1)).to_numpy()
+    consecutive = same & (df["year"].to_numpy() - df["year"].shift(1).fillna(-1).to_numpy() == 1)
+    prev = {new: df[old].shift(1) for old, new in _PREV_COLUMNS.items()}
+    df = df.rename(columns=_PAIR_COLUMNS).assign(**prev)
+    return df[consecutive].reset_index(drop=True)
+
+
+def claimed_by_year(credits: Optional[pd.DataFrame]) -> pd.DataFrame:
+    """기존 공제 내역 -> (company_id, year, claimed_credit) (같은 기업·연도는 합산)"""
+    if credits is None or credits.empty:
+        return pd.DataFrame({"company_id": pd.Series(dtype=object), "year": pd.Series(dtype=np.int64),
+                             "claimed_credit": pd.Series(dtype=np.int64)})
+    year_col = "credit_year" if "credit_year" in credits.columns else "year"
+    amount_col = "applied_credit" if "applied_credit" in credits.columns else "claimed_credit"
+    out = credits.groupby(["company_id", year_col], as_index=False)[amount_col].sum()
+    return out.rename(columns={year_col: "year", amount_col: "claimed_credit"})
+
+
+# -----------------------------
+# 2) 연도×묶음 계산 (작업자 프로세스)
+# -----------------------------
+
+def _price_chunk(job: Tuple[int, dict, pd.DataFrame, str]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    year, params_dict, frame, clawback_method = job
+    params = load_params_from_dict(params_dict)
+    result = calc_portfolio(frame, params, clawback_method=clawback_method)
+    res = result.results
+    priced = pd.DataFrame({
+        "company_id": frame.loc[res.index, "company_id"].to_numpy(),
+        "year": year,
+        "gross_credit": res["gross_credit"].to_numpy(),
+        "applied_credit": res["applied_credit"].to_numpy(),
+        "retention_years": res["retention_years"].to_numpy(),
+    })
+    errors = result.errors.assign(
+        company_id=frame.loc[result.errors["row"], "company_id"].to_numpy(), year=year,
+    )
+    return priced, errors
+
+
+def _empty_priced() -> pd.DataFrame:
+    return pd.DataFrame({
+        "company_id": pd.Series(dtype=object),
+        **{c: pd.Series(dtype=np.int64) for c in ("year", "gross_credit", "applied_credit", "retention_years")},
+    })
+
+
+def _jobs(
+    pairs: pd.DataFrame,
+    policies: Dict[int, PolicyParameters],
+    clawback_method: str,
+    chunk_rows: int,
+) -> Iterator[Tuple[int, dict, pd.DataFrame, str]]:
+    for year, frame in pairs.groupby("year", sort=True):
+        params_dict = params_to_dict(policies[int(year)])
+        for start in range(0, len(frame), chunk_rows):
+            yield int(year), params_dict, frame.iloc[start:start + chunk_rows], clawback_method
+
+
+def scan_backfill(
+    history: pd.DataFrame,
+    policies: Dict[int, PolicyParameters],
+    as_of_year: int,
+    claimed: Optional[pd.DataFrame] = None,
+    lookback_years: int = DEFAULT_LOOKBACK_YEARS,
+    workers: Optional[int] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    clawback_method: str = "proportional",
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    경정청구 가능 연도(as_of_year - lookback_years ~ as_of_year - 1) 중 정책 파일이 있는 연도를 모두 계산
+    -> (결과표, 오류표)
+    - 결과표: RESULT_COLUMNS (unclaimed_credit = max(적용 공제액 - 기존 공제액, 0)), 미청구액 큰 순
+    - 오류표: row(연도 쌍 번호), field, rule, company_id, year — 입력 오류·제외 업종 행,
+      기업규모 기준표가 없는 연도의 쌍(RULE_NO_SIZE_THRESHOLDS)
+    - workers: 작업자 프로세스 수 (기본: CPU 수, 1이면 현재 프로세스에서 계산)
+    """
+    start = time.perf_counter()
+    years = [y for y in range(as_of_year - lookback_years, as_of_year) if y in policies]
+    pairs = year_pairs(history)
+    pairs = pairs[pairs["year"].isin(years)].reset_index(drop=True)
+    if "tax_year" not in pairs.columns:
+        pairs["tax_year"] = pairs["year"]  # 기업규모 판정 기준 연도
+    pairs = fill_company_sizes(fill_regions(pairs))
+
+    # 계산하지 않고 오류표로 보고할 쌍
+    # - 직전·당해 청년등 인원 중 빈 값: 누락 오류 (0으로 보면 없던 청년 증가가 생기므로)
+    # - 규모를 재무 자료로 판정해야 하는데 기준표가 없는 연도: 기준표 없음 오류 (단순 누락과 구분)
+    checks = [(field, RULE_MISSING, pairs[field].isna().to_numpy()) for field in ("prev_youth", "curr_youth")]
+    first_year = first_threshold_year()
+    if first_year is not None and all(c in pairs.columns for c in FINANCIAL_COLUMNS):
+        size_year = pd.to_numeric(pairs["tax_year"], errors="coerce").fillna(pairs["year"]).to_numpy()
+        checks.append((
+            "company_size", RULE_NO_SIZE_THRESHOLDS,
+            pairs["company_size"].isna().to_numpy() & (size_year < first_year),
+        ))
+    errors: List[pd.DataFrame] = []
+    skip = np.zeros(len(pairs), dtype=bool)
+    for field, rule, mask in checks:
+        if mask.any():
+            errors.append(pd.DataFrame({
+                "row": np.flatnonzero(mask), "field": field, "rule": rule,
+                "company_id": pairs.loc[mask, "company_id"].to_numpy(), "year": pairs.loc[mask, "year"].to_numpy(),
+            }))
+        skip |= mask
+
+    jobs = list(_jobs(pairs[~skip], policies, clawback_method, max(1, chunk_rows)))
+    workers = max(1, workers or os.cpu_count() or 1)
+    if workers == 1 or len(jobs) <= 1:
+        outputs = [_price_chunk(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            outputs = list(pool.map(_price_chunk, jobs))
+
+    priced: List[pd.DataFrame] = [o[0] for o in outputs]
+    errors.extend(o[1] for o in outputs)
+    result = pd.concat(priced, ignore_index=True) if priced else _empty_priced()
+    result = result.merge(claimed_by_year(claimed), on=["company_id", "year"], how="left")
+    result["claimed_credit"] = result["claimed_credit"].fillna(0).astype(np.int64)
+    result["unclaimed_credit"] = np.maximum(
+        result["applied_credit"].to_numpy(dtype=np.int64) - result["claimed_credit"].to_numpy(), 0
+    )
+    result = result[RESULT_COLUMNS].sort_values(
+        ["unclaimed_credit", "company_id", "year"], ascending=[False, True, True], kind="stable",
+    ).reset_index(drop=True)
+    error_table = (
+        pd.concat(errors, ignore_index=True) if errors
+        else pd.DataFrame({c: pd.Series(dtype=object) for c in ERROR_COLUMNS + ["company_id", "year"]})
+    )
+    BATCH_ROWS.labels(job="backfill", outcome="ok").inc(len(result))
+    BATCH_ROWS.labels(job="backfill", outcome="error").inc(len(error_table[["company_id", "year"]].drop_duplicates()))
+    BATCH_SECONDS.labels(job="backfill").observe(time.perf_counter() - start)
+    return result, error_table
+
+
+# -----------------------------
+# 3) CLI
+# -----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="경정청구 누락 공제 일괄 탐색 (최근 5년)")
+    parser.add_argument("history_csv", nargs="?", help="연도별 인원 이력 CSV (company_id, year, total, youth, ...)")
+    parser.add_argument("--ledger", default=None, help="인원 이력·기존 공제 내역을 읽을 고객 원장 DB (history_csv 대신)")
+    parser.add_argument("--policy-dir", required=True, help="연도별 정책 JSON 폴더 (파일명에 연도 포함)")
+    parser.add_argument("--as-of", type=int, required=True, help="경정청구 기준 연도 (이전 --lookback년을 탐색)")
+    parser.add_argument("--lookback", type=int, default=DEFAULT_LOOKBACK_YEARS, help="탐색 연수 (기본 5)")
+    parser.add_argument("--claimed", default=None, help="기존 공제 내역 CSV (company_id, credit_year, applied_credit)")
+    parser.add_argument("--workers", type=int, default=None, help="작업자 프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--out", default="backfill.csv", help="결과 CSV 경로 (오류표는 *_errors.csv)")
+    add_metrics_argument(parser)
+    args = parser.parse_args()
+    if (args.history_csv is None) == (args.ledger is None):
+        parser.error("history_csv와 --ledger 중 하나를 지정하세요")
+
+    policies = load_policy_dir(args.policy_dir)
+    first_year = args.as_of - args.lookback - 1  # 첫 탐색 연도의 직전 연도까지 필요
+    claimed = pd.read_csv(args.claimed, dtype=CSV_DTYPES) if args.claimed else None
+    if args.ledger:
+        from employment_tax_credit_ledger import ClientLedger
+
+        with ClientLedger(args.ledger) as ledger:
+            history = ledger.headcount_history(first_year, args.as_of - 1)
+            if claimed is None:
+                claimed = ledger.credits_between(first_year + 1, args.as_of - 1)
+    else:
+        history = pd.read_csv(args.history_csv, dtype=CSV_DTYPES)
+
+    result, errors = scan_backfill(
+        history, policies, args.as_of, claimed, lookback_years=args.lookback, workers=args.workers,
+    )
+    result.to_csv(args.out, index=False, encoding="utf-8-sig")
+    if len(errors):
+        root, ext = os.path.splitext(args.out)
+        errors.to_csv(f"{root}_errors{ext or '.csv'}", index=False, encoding="utf-8-sig")
+
+    found = result[result["unclaimed_credit"] > 0]
+    print(f"탐색 연도: {', '.join(str(y) for y in sorted(result['year'].unique())) or '없음'}")
+    print(f"미청구 공제: {len(found):,}건 / {found['company_id'].nunique():,}개사, 합계 {int(found['unclaimed_credit'].sum()):,}원")
+    if len(errors):
+        print(f"입력 오류·제외 업종: {len(errors):,}건")
+    print(f"결과: {args.out}")
+    dump_metrics(args.metrics_out)
+
+
+if __name__ == "__main__":
+    main()
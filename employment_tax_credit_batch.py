@@ -0,0 +1,606 @@
+# -*- coding: utf-8 -*-
+"""
+통합고용세액공제 포트폴리오(다수 기업) 일괄 계산 모듈
+
+employment_tax_credit_calc.py의 단건 계산 로직을 pandas/numpy 열 연산으로 옮긴 배치 경로입니다.
+수만~수십만 행의 기업 목록을 한 번에 검증하고, 유효한 행만 빠른 경로로 계산합니다.
+
+기능 개요
+- 입력 검증: 포트폴리오 전체를 열 단위(벡터화)로 검사하여 (row, field, rule) 오류표 생성
+  * 잘못된 행이 있어도 전체 실행이 중단되지 않고, 유효한 행만 계산을 계속합니다.
+  * 제외 업종 선별: industry_code 열을 정책의 업종 코드 접두어 색인과 한 번에 대조하여
+    제외 업종 기업은 공제 계산·캐시 조회 전에 걸러냅니다 (rule="excluded_industry")
+- 정책 파라미터 컴파일: 규모×지역 단가를 배열로 펼쳐 행별 조회를 인덱싱 한 번으로 처리
+- 일괄 계산: 총공제액 / 적용 공제액(한도·최저한세) / 유지기간 / 다년 추징표
+- 결과 캐시(선택): employment_tax_credit_cache.ResultCache를 넘기면 입력이 같은 기업은 재계산 생략
+
+입력 DataFrame 열 (HeadcountInputs 필드명과 동일)
+- 필수: company_size("중소기업" 등), region("수도권"/"지방"), prev_total, curr_total
+- 선택(없으면 0): prev_youth, curr_youth, converted_regular, returned_from_parental_leave
+- 선택(없으면 최저한세 미적용): tax_before_credit (빈 값 = 미적용)
+- 선택(없으면 추징표 없음): followup_totals (사후 1년차부터의 연도 말 상시근로자 수 리스트)
+- 선택(없으면 업종 선별 생략): industry_code (한국표준산업분류 코드, 앞자리 0이 있으므로 문자열로 읽기 — CSV_DTYPES)
+"""
+
+from __future__ import annotations
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from employment_tax_credit_calc import (
+    CompanySize, Region, PolicyParameters, ClawbackTiers, IndustryIndex, industry_index, rate_to_fraction,
+)
+from employment_tax_credit_cache import (
+    CachedResult, ResultCache, policy_fingerprint, digest_key, clawback_setting_token,
+)
+from employment_tax_credit_memprof import profiled_stage
+from employment_tax_credit_metrics import BATCH_ROWS, CLAWBACK_EVALUATIONS, CREDIT_COMPUTATIONS, PORTFOLIO_SECONDS
+
+
+# -----------------------------
+# 1) 열 정의 / 검증 규칙
+# -----------------------------
+
+SIZE_VALUES: List[str] = [s.value for s in CompanySize]
+REGION_VALUES: List[str] = [r.value for r in Region]
+
+REQUIRED_COLUMNS = ["company_size", "region", "prev_total", "curr_total"]
+HEADCOUNT_FIELDS = [
+    "prev_total",
+    "curr_total",
+    "prev_youth",
+    "curr_youth",
+    "converted_regular",
+    "returned_from_parental_leave",
+]
+OPTIONAL_DEFAULTS: Dict[str, int] = {
+    "prev_youth": 0,
+    "curr_youth": 0,
+    "converted_regular": 0,
+    "returned_from_parental_leave": 0,
+}
+ERROR_COLUMNS = ["row", "field", "rule"]
+# CSV에서 문자열로 읽어야 하는 열 (pd.read_csv(..., dtype=CSV_DTYPES))
+CSV_DTYPES: Dict[str, type] = {"company_id": str, "industry_code": str, "district_code": str}
+
+# 오류표의 rule 값
+RULE_MISSING = "missing"                    # 필수 값 누락
+RULE_NOT_INTEGER = "not_integer"            # 숫자가 아니거나 정수가 아님
+RULE_NEGATIVE = "negative"                  # 음수
+RULE_UNKNOWN_SIZE = "unknown_size"          # CompanySize에 없는 규모
+RULE_UNKNOWN_REGION = "unknown_region"      # Region에 없는 지역
+RULE_YOUTH_EXCEEDS_TOTAL = "youth_exceeds_total"  # 청년등 인원 > 전체 인원
+RULE_EXCLUDED_INDUSTRY = "excluded_industry"  # 정책의 제외 업종(하위 분류 포함)
+
+
+@dataclass
+class ValidationReport:
+    """
+    포트폴리오 검증 결과
+    - valid_mask: 행별 유효 여부 (입력 DataFrame 행 순서와 동일한 bool 배열)
+    - errors: 오류표 DataFrame (row=입력 index 라벨, field=열 이름, rule=위반 규칙)
+    - columns: 검증 과정에서 정수로 변환된 열 (계산 단계에서 재사용, 무효 값은 0)
+        * followup_lengths / followup_flat: 행별 사후연도 인원 개수와 이를 이어 붙인 1차원 배열
+    """
+    valid_mask: np.ndarray
+    errors: pd.DataFrame
+    columns: Dict[str, np.ndarray]
+
+    @property
+    def n_valid(self) -> int:
+        return int(self.valid_mask.sum())
+
+    @property
+    def n_invalid(self) -> int:
+        return int(len(self.valid_mask) - self.valid_mask.sum())
+
+
+@dataclass
+class PortfolioResult:
+    """
+    일괄 계산 결과
+    - results: 유효 행만 담은 DataFrame (입력 index 유지)
+        gross_credit / applied_credit / retention_years / clawback_schedule(연차별 추징액 리스트) / clawback_total
+    - errors: ValidationReport.errors와 동일한 오류표
+    """
+    results: pd.DataFrame
+    errors: pd.DataFrame
+
+
+def _int_column(values: pd.Series):
+    """
+    숫자 열을 int64로 변환하고 (값, 누락 mask, 비정수 mask)를 반환
+    - 숫자로 바꿀 수 없거나 소수부가 있는 값은 비정수로 분류
+    - inf·int64 범위를 벗어난 값도 변환 전에 비정수로 분류 (캐스팅 시 엉뚱한 값이 되지 않도록)
+    """
+    numeric = pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    missing = values.isna().to_numpy()
+    bad = np.isnan(numeric) & ~missing
+    finite = np.isfinite(numeric)
+    bad |= ~np.isnan(numeric) & ~finite
+    bad |= finite & ((numeric != np.floor(numeric)) | (np.abs(numeric) >= 2.0 ** 63))
+    as_int = np.where(missing | bad, 0, numeric).astype(np.int64)
+    return as_int, missing, bad
+
+
+def excluded_industry_mask(codes: pd.Series, exclusions: Optional[IndustryIndex]) -> np.ndarray:
+    """
+    업종 코드 열 -> 제외 업종 여부 bool 배열 (IndustryIndex.excludes의 벡터화 버전)
+    - 정렬된 접두어 배열에 searchsorted 한 번으로 후보 접두어를 찾고 startswith로 확인합니다.
+    - 빈 값·코드가 없는 행은 제외하지 않습니다.
+    """
+    n = len(codes)
+    if exclusions is None or not exclusions.prefixes or n == 0:
+        return np.zeros(n, dtype=bool)
+    present = codes.notna().to_numpy()
+    norm = (
+        codes[present].astype(str)
+        .str.replace(r"[\s.\-]", "", regex=True).str.upper()
+        .to_numpy(dtype=str)
+    )
+    prefixes = np.asarray(exclusions.prefixes, dtype=str)
+    pos = np.searchsorted(prefixes, norm, side="right") - 1
+    hit = (pos >= 0) & (np.char.str_len(norm) > 0)
+    hit &= np.char.startswith(norm, prefixes[np.maximum(pos, 0)])
+    out = np.zeros(n, dtype=bool)
+    out[present] = hit
+    return out
+
+
+def validate_portfolio(df: pd.DataFrame, exclusions: Optional[IndustryIndex] = None) -> ValidationReport:
+    """
+    포트폴리오 입력값을 열 단위로 검증
+    - 행 단위 루프 없이 규칙별 mask를 계산한 뒤 위반 위치만 오류표로 모읍니다.
+    - 필수 열 자체가 없으면 행별 오류가 아니라 구조 오류이므로 ValueError를 발생시킵니다.
+    - exclusions: 제외 업종 접두어 색인 (industry_code 열이 있을 때 선별, CompiledPolicy.industry_index)
+    """
+    missing_cols = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing_cols:
+        raise ValueError(f"필수 열이 없습니다: {', '.join(missing_cols)}")
+
+    n = len(df)
+    index = df.index
+    valid = np.ones(n, dtype=bool)
+    parts: List[pd.DataFrame] = []
+
+    def _flag(mask: np.ndarray, field: str, rule: str) -> None:
+        nonlocal valid
+        if mask.any():
+            parts.append(pd.DataFrame({"pos": np.flatnonzero(mask), "field": field, "rule": rule}))
+            valid &= ~mask
+
+    # 제외 업종: 다른 규칙과 무관하게 계산 대상에서 제외
+    if "industry_code" in df.columns:
+        _flag(excluded_industry_mask(df["industry_code"], exclusions), "industry_code", RULE_EXCLUDED_INDUSTRY)
+
+    # 범주형 열: 규모/지역
+    for field, allowed, rule in (
+        ("company_size", SIZE_VALUES, RULE_UNKNOWN_SIZE),
+        ("region", REGION_VALUES, RULE_UNKNOWN_REGION),
+    ):
+        col = df[field]
+        missing = col.isna().to_numpy()
+        _flag(missing, field, RULE_MISSING)
+        _flag(~missing & ~col.isin(allowed).to_numpy(), field, rule)
+
+    # 인원 열: 누락 / 비정수 / 음수
+    columns: Dict[str, np.ndarray] = {}
+    for field in HEADCOUNT_FIELDS:
+        if field not in df.columns:
+            columns[field] = np.full(n, OPTIONAL_DEFAULTS[field], dtype=np.int64)
+            continue
+        as_int, missing, bad = _int_column(df[field])
+        if field in OPTIONAL_DEFAULTS:
+            as_int = np.where(missing, OPTIONAL_DEFAULTS[field], as_int)
+        else:
+            _flag(missing, field, RULE_MISSING)
+        _flag(bad, field, RULE_NOT_INTEGER)
+        _flag(as_int < 0, field, RULE_NEGATIVE)
+        columns[field] = as_int
+
+    # 교차 규칙: 청년등 인원은 전체 인원을 넘을 수 없음
+    _flag(columns["prev_youth"] > columns["prev_total"], "prev_youth", RULE_YOUTH_EXCEEDS_TOTAL)
+    _flag(columns["curr_youth"] > columns["curr_total"], "curr_youth", RULE_YOUTH_EXCEEDS_TOTAL)
+
+    # 세전세액: 빈 값은 최저한세 미적용 (-1로 표시)
+    if "tax_before_credit" in df.columns:
+        as_int, missing, bad = _int_column(df["tax_before_credit"])
+        _flag(bad, "tax_before_credit", RULE_NOT_INTEGER)
+        _flag(as_int < 0, "tax_before_credit", RULE_NEGATIVE)
+        columns["tax_before_credit"] = np.where(missing, -1, as_int)
+    else:
+        columns["tax_before_credit"] = np.full(n, -1, dtype=np.int64)
+
+    # 사후연도 인원 리스트: explode로 펼쳐 원소 단위로 검사
+    if "followup_totals" in df.columns:
+        col = df["followup_totals"].astype(object)
+        # 리스트가 아닌 값(문자열·숫자 등)은 행 단위로 비정수 처리하고 빈 리스트로 취급
+        is_list = col.map(lambda v: isinstance(v, (list, tuple, np.ndarray))).to_numpy(dtype=bool)
+        _flag(~is_list & col.notna().to_numpy(), "followup_totals", RULE_NOT_INTEGER)
+        col = col.where(is_list, None)
+        lengths = col.map(lambda v: 0 if v is None else len(v)).to_numpy(dtype=np.int64)
+        flat = col[lengths > 0].explode()
+        as_int, missing, bad = _int_column(flat)
+        row_pos = np.repeat(np.arange(n), lengths)
+        for rule, elem_mask in ((RULE_MISSING, missing), (RULE_NOT_INTEGER, bad), (RULE_NEGATIVE, as_int < 0)):
+            row_mask = np.zeros(n, dtype=bool)
+            row_mask[row_pos[elem_mask]] = True
+            _flag(row_mask, "followup_totals", rule)
+        columns["followup_lengths"] = lengths
+        columns["followup_flat"] = as_int
+    else:
+        columns["followup_lengths"] = np.zeros(n, dtype=np.int64)
+        columns["followup_flat"] = np.zeros(0, dtype=np.int64)
+
+    if parts:
+        errors = pd.concat(parts, ignore_index=True).sort_values("pos", kind="stable")
+        errors = pd.DataFrame({
+            "row": index[errors["pos"].to_numpy()],
+            "field": errors["field"].to_numpy(),
+            "rule": errors["rule"].to_numpy(),
+        })
+    else:
+        errors = pd.DataFrame({c: pd.Series(dtype="object") for c in ERROR_COLUMNS})
+
+    return ValidationReport(valid_mask=valid, errors=errors, columns=columns)
+
+
+# -----------------------------
+# 2) 정책 파라미터 컴파일
+# -----------------------------
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    """
+    배열 인덱싱용으로 펼친 정책 파라미터
+    - basic[size_idx, region_idx] / youth[size_idx, region_idx]: 1인당 공제액 (int64)
+    - retention[size_idx]: 유지기간(년)
+      (size_idx는 SIZE_VALUES 순서, region_idx는 REGION_VALUES 순서)
+    - min_tax_rate_num / min_tax_rate_den: 최저한세 한도율의 정수 분수 (정확 모드용, 0.07 -> 7/100)
+    - clawback_tiers: 정책의 구간 추징표 (없으면 None)
+    - industry_index: 제외 업종 코드 접두어 색인 (없으면 None)
+    """
+    basic: np.ndarray
+    youth: np.ndarray
+    conversion: int
+    parental: int
+    retention: np.ndarray
+    max_credit_total: Optional[int]
+    min_tax_limit_rate: Optional[float]
+    min_tax_rate_num: Optional[int] = None
+    min_tax_rate_den: Optional[int] = None
+    clawback_tiers: Optional[ClawbackTiers] = None
+    industry_index: Optional[IndustryIndex] = None
+
+
+def compile_policy(params: PolicyParameters) -> CompiledPolicy:
+    """PolicyParameters를 규모×지역 배열로 변환 (포트폴리오 계산 전 1회)"""
+    sizes = list(CompanySize)
+    regions = list(Region)
+    basic = np.array([[int(params.per_head_basic[s][r]) for r in regions] for s in sizes], dtype=np.int64)
+    youth = np.array([[int(params.per_head_youth[s][r]) for r in regions] for s in sizes], dtype=np.int64)
+    retention = np.array([int((params.retention_years or {}).get(s, 0)) for s in sizes], dtype=np.int64)
+    rate_num, rate_den = (
+        rate_to_fraction(params.min_tax_limit_rate) if params.min_tax_limit_rate is not None else (None, None)
+    )
+    return CompiledPolicy(
+        basic=basic,
+        youth=youth,
+        conversion=int(params.per_head_conversion),
+        parental=int(params.per_head_return_from_parental),
+        retention=retention,
+        max_credit_total=(int(params.max_credit_total) if params.max_credit_total is not None else None),
+        min_tax_limit_rate=(float(params.min_tax_limit_rate) if params.min_tax_limit_rate is not None else None),
+        min_tax_rate_num=rate_num,
+        min_tax_rate_den=rate_den,
+        clawback_tiers=params.clawback_tiers,
+        industry_index=industry_index(params),
+    )
+
+
+# -----------------------------
+# 3) 일괄 계산 (빠른 경로)
+# -----------------------------
+
+def _codes(values: pd.Series, categories: List[str]) -> np.ndarray:
+    return pd.Categorical(values, categories=categories).codes.astype(np.int64)
+
+
+_CLAWBACK_ARRAY = CLAWBACK_EVALUATIONS.labels(mode="array")
+_COMPUTED_PORTFOLIO = CREDIT_COMPUTATIONS.labels(mode="portfolio")
+_PORTFOLIO_VALID = BATCH_ROWS.labels(job="portfolio", outcome="ok")
+_PORTFOLIO_INVALID = BATCH_ROWS.labels(job="portfolio", outcome="error")
+
+
+def _record_portfolio(start: float, valid: int, total: int) -> None:
+    PORTFOLIO_SECONDS.observe(time.perf_counter() - start)
+    _COMPUTED_PORTFOLIO.inc(valid)
+    _PORTFOLIO_VALID.inc(valid)
+    _PORTFOLIO_INVALID.inc(total - valid)
+
+
+def calc_clawback_array(
+    credit_applied: np.ndarray,
+    base_headcount_at_credit: np.ndarray,
+    headcount_in_followup_year: np.ndarray,
+    retention_years_for_company: np.ndarray,
+    year_index_from_credit: np.ndarray,
+    method: str = "proportional",
+    tiered_thresholds: Optional[Dict[str, float]] = None,
+    exact: bool = False,
+    tiers: Optional[ClawbackTiers] = None,
+) -> np.ndarray:
+    """
+    calc_clawback의 배열 버전 (인자는 같은 길이의 배열 또는 스칼라)
+    - 반올림(round half to even)까지 단건 함수와 동일한 결과를 냅니다.
+    - tiered: 구간 번호를 np.searchsorted로 한 번에 찾으므로 구간 수와 무관하게 비용이 같습니다.
+    - exact=True: 정수 연산만 사용 (calc_clawback(exact=True)와 비트 단위로 같은 결과)
+      중간 곱이 int64 범위를 넘을 수 있으면 파이썬 정수로 계산합니다.
+    """
+    credit = np.asarray(credit_applied, dtype=np.int64)
+    base = np.asarray(base_headcount_at_credit, dtype=np.int64)
+    followup = np.asarray(headcount_in_followup_year, dtype=np.int64)
+    retention = np.asarray(retention_years_for_company, dtype=np.int64)
+    year_idx = np.asarray(year_index_from_credit, dtype=np.int64)
+    _CLAWBACK_ARRAY.inc(max(credit.size, base.size, followup.size, year_idx.size))
+
+    decrease = np.maximum(0, base - followup)
+    active = (year_idx >= 1) & (year_idx <= retention) & (base > 0) & (decrease > 0)
+    safe_base = np.where(base > 0, base, 1)
+
+    if method == "tiered":
+        table = ClawbackTiers.from_thresholds(tiered_thresholds) if tiered_thresholds or tiers is None else tiers
+        amount = _tiered_amount(table, credit, safe_base, decrease, exact)
+    elif method == "all_or_nothing":
+        amount = credit
+    elif exact:
+        amount = _div_round_half_even(_int_product(credit, decrease), safe_base)
+    else:
+        amount = np.round(credit * (decrease / safe_base.astype(np.float64))).astype(np.int64)
+    return np.where(active, amount, 0).astype(np.int64)
+
+
+_INT64_MAX = int(np.iinfo(np.int64).max)
+
+
+def _int_product(a, b) -> np.ndarray:
+    """
+    원소별 정수 곱 a × b
+    - 최댓값끼리의 곱이 int64 범위 안이면 int64로, 넘칠 수 있으면 파이썬 정수(object 배열)로 계산
+      (int64 곱은 넘쳐도 경고 없이 값이 틀어지므로)
+    """
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    a_max = int(np.abs(a).max(initial=0))
+    b_max = int(np.abs(b).max(initial=0))
+    if a_max == 0 or b_max <= _INT64_MAX // a_max:
+        return a * b
+    return a.astype(object) * b.astype(object)
+
+
+def _to_int64(values: np.ndarray) -> np.ndarray:
+    """
+    _int_product 계열 결과 -> int64
+    - object 배열에 int64 범위를 벗어난 값이 있으면 OverflowError (잘라 내면 틀린 금액이 조용히 나가므로)
+    """
+    values = np.asarray(values)
+    if values.dtype == object and values.size:
+        out_of_range = np.abs(values) > _INT64_MAX
+        if out_of_range.any():
+            first = int(np.flatnonzero(out_of_range.ravel())[0])
+            raise OverflowError(
+                f"정수 연산 결과가 int64 범위를 벗어났습니다 ({out_of_range.sum()}건, 첫 값: {values.ravel()[first]})"
+            )
+    return values.astype(np.int64)
+
+
+def floor_mul_div(a, num, den) -> np.ndarray:
+    """floor(a × num / den)를 넘침 없이 정수 연산으로 (int64 배열, 최저한세 한도의 exact 모드용)"""
+    return _to_int64(_int_product(a, num) // np.asarray(den, dtype=np.int64))
+
+
+def _div_round_half_even(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """div_round_half_even의 배열 버전 (num ≥ 0, den > 0, num은 int64 또는 파이썬 정수 object 배열)"""
+    q = num // den
+    r = num - q * den
+    return _to_int64(q + ((2 * r > den) | ((2 * r == den) & (q % 2 == 1))))
+
+
+def _tiered_amount(
+    table: ClawbackTiers,
+    credit: np.ndarray,
+    base: np.ndarray,
+    decrease: np.ndarray,
+    exact: bool,
+) -> np.ndarray:
+    """구간 추징액 (base > 0). 구간 번호는 단건 함수의 bisect_right와 같은 searchsorted(side="right")"""
+    if exact:
+        idx = np.searchsorted(
+            np.asarray(table.scaled_breakpoints, dtype=np.int64), floor_mul_div(decrease, table.scale, base), side="right",
+        )
+        num = np.asarray(table.rate_num, dtype=np.int64)[idx]
+        den = np.asarray(table.rate_den, dtype=np.int64)[idx]
+        return _div_round_half_even(_int_product(credit, num), den)
+    idx = np.searchsorted(np.asarray(table.breakpoints, dtype=np.float64), decrease / base.astype(np.float64), side="right")
+    rate = np.asarray(table.rates, dtype=np.float64)[idx]
+    return np.where(rate >= 1.0, credit, np.round(credit * rate).astype(np.int64))
+
+
+def _calc_rows(
+    compiled: CompiledPolicy,
+    cols: Dict[str, np.ndarray],
+    size_idx: np.ndarray,
+    region_idx: np.ndarray,
+    clawback_method: str,
+    tiered_thresholds: Optional[Dict[str, float]],
+    exact: bool = False,
+) -> Dict[str, object]:
+    """검증을 통과한 행들의 정수 열 -> 결과 열 (gross/applied/retention/추징표)"""
+    increase_total = np.maximum(0, cols["curr_total"] - cols["prev_total"])
+    increase_youth = np.maximum(0, cols["curr_youth"] - cols["prev_youth"])
+
+    gross = (
+        increase_total * compiled.basic[size_idx, region_idx]
+        + increase_youth * compiled.youth[size_idx, region_idx]
+        + cols["converted_regular"] * compiled.conversion
+        + cols["returned_from_parental_leave"] * compiled.parental
+    )
+    gross = np.maximum(0, gross)
+
+    applied = gross.copy()
+    if compiled.max_credit_total is not None:
+        applied = np.minimum(applied, compiled.max_credit_total)
+    if compiled.min_tax_limit_rate is not None:
+        tax = cols["tax_before_credit"]
+        has_tax = tax >= 0
+        if exact:
+            limit = floor_mul_div(tax, compiled.min_tax_rate_num, compiled.min_tax_rate_den)
+        else:
+            limit = np.floor(compiled.min_tax_limit_rate * tax.astype(np.float64)).astype(np.int64)
+        applied = np.where(has_tax, np.minimum(applied, limit), applied)
+    applied = np.maximum(0, applied)
+    retention = compiled.retention[size_idx]
+
+    # 다년 추징표: 행별 사후연도 인원을 펼친 1차원 배열에서 한 번에 계산
+    lengths = cols["followup_lengths"]
+    owner = np.repeat(np.arange(len(lengths)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    year_idx = np.arange(len(owner)) - starts[owner] + 1
+    flat = calc_clawback_array(
+        applied[owner], cols["curr_total"][owner], cols["followup_flat"],
+        retention[owner], year_idx, clawback_method, tiered_thresholds, exact, compiled.clawback_tiers,
+    )
+    schedules = [part.tolist() for part in np.split(flat, np.cumsum(lengths)[:-1])] if len(lengths) else []
+
+    return {
+        "gross_credit": gross,
+        "applied_credit": applied,
+        "retention_years": retention,
+        "clawback_schedule": schedules,
+        "clawback_total": _sum_by_owner(flat, owner, len(lengths)),
+    }
+
+
+def _sum_by_owner(values: np.ndarray, owner: np.ndarray, n: int) -> np.ndarray:
+    """행별 정수 합계 (bincount의 float 가중치를 거치지 않아 2^53을 넘는 합계도 정확)"""
+    total = np.zeros(n, dtype=np.int64)
+    np.add.at(total, owner, values)
+    return total
+
+
+def _subset(cols: Dict[str, np.ndarray], mask: np.ndarray) -> Dict[str, np.ndarray]:
+    """행 mask로 열 dict를 자름 (followup_flat은 행 길이에 맞춰 함께 자름)"""
+    out = {k: v[mask] for k, v in cols.items() if k != "followup_flat"}
+    owner = np.repeat(np.arange(len(mask)), cols["followup_lengths"])
+    out["followup_flat"] = cols["followup_flat"][mask[owner]]
+    return out
+
+
+def _row_keys(
+    policy_hash: str,
+    sizes: np.ndarray,
+    regions: np.ndarray,
+    cols: Dict[str, np.ndarray],
+    setting: str,
+) -> List[str]:
+    """행별 캐시 키 (employment_tax_credit_cache.canonical_inputs와 같은 형식)"""
+    heads = np.column_stack([cols[f] for f in HEADCOUNT_FIELDS]).astype(str).tolist()
+    taxes = cols["tax_before_credit"].tolist()
+    flat = cols["followup_flat"].astype(str).tolist()
+    bounds = np.concatenate([[0], np.cumsum(cols["followup_lengths"])]).tolist()
+    prefix = policy_hash + "|"
+    return [
+        digest_key(
+            f"{prefix}{size}|{region}|{','.join(h)}|{'' if tax < 0 else tax}|{setting}|"
+            f"{','.join(flat[bounds[i]:bounds[i + 1]])}"
+        )
+        for i, (size, region, h, tax) in enumerate(zip(sizes.tolist(), regions.tolist(), heads, taxes))
+    ]
+
+
+@profiled_stage("portfolio_calc")
+def calc_portfolio(
+    df: pd.DataFrame,
+    params: PolicyParameters,
+    compiled: Optional[CompiledPolicy] = None,
+    clawback_method: str = "proportional",
+    tiered_thresholds: Optional[Dict[str, float]] = None,
+    cache: Optional[ResultCache] = None,
+    exact: bool = False,
+) -> PortfolioResult:
+    """
+    포트폴리오 일괄 계산
+    - validate_portfolio로 전체를 검증·제외 업종 선별한 뒤, 유효 행만 배열 연산으로 계산합니다.
+    - 결과는 단건 함수(calc_gross_credit → apply_caps_and_min_tax → calc_clawback)와 동일합니다.
+    - cache를 주면 키를 일괄 조회하여 적중한 행은 계산을 건너뛰고, 새로 계산한 행만 일괄 저장합니다.
+    - exact=True: 최저한세·추징액을 정수 연산으로 계산 (단건 함수의 exact=True와 동일)
+    """
+    start = time.perf_counter()
+    compiled = compiled or compile_policy(params)
+    report = validate_portfolio(df, compiled.industry_index)
+    mask = report.valid_mask
+    cols = _subset(report.columns, mask)
+    size_idx = _codes(df["company_size"], SIZE_VALUES)[mask]
+    region_idx = _codes(df["region"], REGION_VALUES)[mask]
+    index = df.index[mask]
+
+    if cache is None:
+        out = _calc_rows(compiled, cols, size_idx, region_idx, clawback_method, tiered_thresholds, exact)
+        _record_portfolio(start, len(index), len(df))
+        return PortfolioResult(results=pd.DataFrame(out, index=index), errors=report.errors)
+
+    sizes = np.asarray(SIZE_VALUES, dtype=object)[size_idx]
+    regions = np.asarray(REGION_VALUES, dtype=object)[region_idx]
+    keys = _row_keys(
+        policy_fingerprint(params), sizes, regions, cols,
+        clawback_setting_token(clawback_method, tiered_thresholds, exact),
+    )
+    hits = cache.get_many(keys)
+    miss = np.array([k not in hits for k in keys], dtype=bool)
+
+    n = len(keys)
+    gross = np.zeros(n, dtype=np.int64)
+    applied = np.zeros(n, dtype=np.int64)
+    retention = np.zeros(n, dtype=np.int64)
+    totals = np.zeros(n, dtype=np.int64)
+    schedules: List[list] = [None] * n
+
+    hit_pos = np.flatnonzero(~miss)
+    if len(hit_pos):
+        found = [hits[keys[i]] for i in hit_pos.tolist()]
+        gross[hit_pos], applied[hit_pos], retention[hit_pos] = np.array(
+            [v[:3] for v in found], dtype=np.int64
+        ).T
+        totals[hit_pos] = [sum(v.clawback_schedule) for v in found]
+        for i, v in zip(hit_pos.tolist(), found):
+            schedules[i] = v.clawback_schedule
+
+    if miss.any():
+        miss_pos = np.flatnonzero(miss)
+        out = _calc_rows(
+            compiled, _subset(cols, miss), size_idx[miss], region_idx[miss],
+            clawback_method, tiered_thresholds, exact,
+        )
+        gross[miss], applied[miss], retention[miss] = out["gross_credit"], out["applied_credit"], out["retention_years"]
+        totals[miss] = out["clawback_total"]
+        items = []
+        for j, i in enumerate(miss_pos.tolist()):
+            schedules[i] = out["clawback_schedule"][j]
+            items.append((keys[i], CachedResult(int(gross[i]), int(applied[i]), int(retention[i]), schedules[i])))
+        cache.put_many(items)
+
+    results = pd.DataFrame(
+        {
+            "gross_credit": gross,
+            "applied_credit": applied,
+            "retention_years": retention,
+            "clawback_schedule": schedules,
+            "clawback_total": totals,
+        },
+        index=index,
+    )
+    _record_portfolio(start, len(index), len(df))
+    return PortfolioResult(results=results, errors=report.errors)
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+통합고용세액공제 계산 결과 영구 캐시 (로컬 SQLite, WAL 모드)
+
+같은 포트폴리오를 조금씩 고쳐 가며 반복 실행할 때, 입력이 바뀌지 않은 기업은 다시 계산하지 않고
+디스크에 저장된 결과를 그대로 사용합니다.
+
+기능 개요
+- 캐시 키: 정책 파라미터 지문(policy_fingerprint) + 정규화된 인원 입력값 + 세전세액 + 추징 설정의 해시
+- 저장 값: 총공제액, 적용 공제액, 유지기간, 다년 추징표
+- 크기 기반 축출: 저장 용량이 max_bytes를 넘으면 가장 오래 조회되지 않은 항목부터 삭제
+  (용량은 저장 트랜잭션 안에서 DB의 SUM(nbytes)로 다시 읽으므로 같은 파일을 쓰는 다른 프로세스·인스턴스의
+   저장분도 포함)
+- 일괄 조회/저장: get_many / put_many (포트폴리오 단위로 한 번에 처리)
+
+사용 예)
+    cache = ResultCache("tax_credit_cache.sqlite3")
+    result = calc_portfolio(df, params, cache=cache)
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from employment_tax_credit_calc import PolicyParameters, params_to_dict
+
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+_SQL_CHUNK = 500  # SQLite 바인딩 변수 개수 제한 대비
+_ACCESS_RESOLUTION = 3600.0  # last_access 갱신 최소 간격(초): 반복 실행 시 불필요한 쓰기 방지
+
+
+class CachedResult(NamedTuple):
+    """캐시에 저장되는 기업 1건의 계산 결과"""
+    gross_credit: int
+    applied_credit: int
+    retention_years: int
+    clawback_schedule: List[int]
+
+
+def policy_fingerprint(params: PolicyParameters) -> str:
+    """정책 파라미터의 안정적인 해시 (키 순서·Enum 표현과 무관하게 같은 값이면 같은 해시)"""
+    canonical = json.dumps(params_to_dict(params), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def clawback_setting_token(
+    method: str,
+    tiered_thresholds: Optional[Dict[str, float]] = None,
+    exact: bool = False,
+) -> str:
+    """추징 방식 + 임계값 + 계산 모드(정확 모드면 ":exact")를 키에 넣을 문자열로 정규화"""
+    token = method
+    if tiered_thresholds:
+        token += ":" + json.dumps(tiered_thresholds, sort_keys=True, separators=(",", ":"))
+    return token + (":exact" if exact else "")
+
+
+def digest_key(canonical: str) -> str:
+    """정규화된 입력 문자열 -> 캐시 키 (blake2b 128bit)"""
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def canonical_inputs(
+    policy_hash: str,
+    company_size: str,
+    region: str,
+    headcounts: Sequence[int],
+    tax_before_credit: Optional[int],
+    clawback_setting: str,
+    followup_totals: Sequence[int] = (),
+) -> str:
+    """
+    캐시 키의 원문: 각 항목을 "|"로, 정수 목록은 ","로 이어 붙임
+    - headcounts: HeadcountInputs 필드 순서의 정수 6개
+    - tax_before_credit: None이면 빈 문자열
+    (배치 경로는 같은 형식을 열 연산으로 만들어 digest_key에 넘깁니다)
+    """
+    return "|".join([
+        policy_hash,
+        company_size,
+        region,
+        ",".join(str(int(v)) for v in headcounts),
+        "" if tax_before_credit is None else str(int(tax_before_credit)),
+        clawback_setting,
+        ",".join(str(int(v)) for v in followup_totals),
+    ])
+
+
+def result_key(*args, **kwargs) -> str:
+    """단건 캐시 키 (인자는 canonical_inputs와 동일)"""
+    return digest_key(canonical_inputs(*args, **kwargs))
+
+
+def _encode_schedule(schedule: Sequence[int]) -> str:
+    return ",".join(str(int(v)) for v in schedule)
+
+
+def _decode_schedule(text: str) -> List[int]:
+    return [int(v) for v in text.split(",")] if text else []
+
+
+class ResultCache:
+    """
+    SQLite 기반 결과 캐시 (로컬 전용)
+    - path: DB 파일 경로 (":memory:" 가능)
+    - max_bytes: 저장 항목 총 크기(대략치) 상한. 초과 시 last_access가 오래된 항목부터 축출
+    """
+
+    def __init__(self, path: str = "tax_credit_cache.sqlite3", max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " gross_credit INTEGER NOT NULL,"
+            " applied_credit INTEGER NOT NULL,"
+            " retention_years INTEGER NOT NULL,"
+            " clawback_schedule TEXT NOT NULL,"
+            " nbytes INTEGER NOT NULL,"
+            " last_access REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        # 축출 순서 조회와 SUM(nbytes)를 본 테이블 없이 처리하는 커버링 인덱스 (key는 기본키라 자동 포함)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_access_bytes ON results(last_access, nbytes)")
+        self._conn.execute("DROP INDEX IF EXISTS idx_results_last_access")
+
+    def _sum_bytes(self) -> int:
+        return int(self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM results").fetchone()[0])
+
+    @contextmanager
+    def _transaction(self, immediate: bool = False):
+        """
+        BEGIN … COMMIT, 실패하면 ROLLBACK 후 예외 전달
+        (열린 트랜잭션이 남으면 이 연결의 이후 BEGIN이 모두 실패하므로 — 다른 프로세스 때문인 "database is locked" 포함)
+        """
+        self._conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield
+            self._conn.execute("COMMIT")
+        except BaseException:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            raise
+
+    # --- 조회 / 저장 ---
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, CachedResult]:
+        """키 목록을 한 번에 조회하여 {key: CachedResult} 반환 (없는 키는 제외)"""
+        found: Dict[str, CachedResult] = {}
+        if not keys:
+            return found
+        now = time.time()
+        keys = list(keys)
+        with self._lock, self._transaction():
+            for i in range(0, len(keys), _SQL_CHUNK):
+                chunk = keys[i:i + _SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT key, gross_credit, applied_credit, retention_years, clawback_schedule"
+                    f" FROM results WHERE key IN ({marks})",
+                    chunk,
+                ).fetchall()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE results SET last_access = ? WHERE key IN ({marks}) AND last_access < ?",
+                        [now, *chunk, now - _ACCESS_RESOLUTION],
+                    )
+                for k, g, a, r, sched in rows:
+                    found[k] = CachedResult(g, a, r, _decode_schedule(sched))
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, CachedResult]]) -> None:
+        """(key, CachedResult) 목록을 저장하고, 같은 트랜잭션에서 DB 전체 용량을 다시 읽어 필요하면 축출"""
+        now = time.time()
+        by_key: Dict[str, tuple] = {}
+        for k, v in items:
+            sched = _encode_schedule(v.clawback_schedule)
+            # 키 + 정수 3개 + 추징표 문자열의 대략적인 저장 크기
+            by_key[k] = (k, int(v.gross_credit), int(v.applied_credit), int(v.retention_years), sched,
+                         len(k) + 24 + len(sched), now)
+        if not by_key:
+            return
+        # 쓰기 잠금을 먼저 잡아(IMMEDIATE) 용량 확인과 축출 사이에 다른 프로세스의 저장이 끼어들지 않도록
+        with self._lock, self._transaction(immediate=True):
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results"
+                "(key, gross_credit, applied_credit, retention_years, clawback_schedule, nbytes, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                list(by_key.values()),
+            )
+            total = self._sum_bytes()
+            if total > self.max_bytes:
+                self._evict(total)
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        return self.get_many([key]).get(key)
+
+    def put(self, key: str, value: CachedResult) -> None:
+        self.put_many([(key, value)])
+
+    # --- 관리 ---
+
+    def _evict(self, total: int) -> None:
+        """오래된 항목부터 삭제하여 max_bytes의 90% 이하로 줄임 (잦은 축출 방지, 호출자의 트랜잭션 안에서)"""
+        target = int(self.max_bytes * 0.9)
+        excess = total - target
+        victims: List[str] = []
+        freed = 0
+        for k, nbytes in self._conn.execute("SELECT key, nbytes FROM results ORDER BY last_access"):
+            if freed >= excess:
+                break
+            victims.append(k)
+            freed += nbytes
+        self._conn.executemany("DELETE FROM results WHERE key = ?", [(k,) for k in victims])
+
+    @property
+    def total_bytes(self) -> int:
+        """DB에 저장된 항목 총 크기 (다른 프로세스·인스턴스의 저장분 포함)"""
+        with self._lock:
+            return self._sum_bytes()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -9,7 +9,14 @@
 기능 개요
 - 세액공제액 계산 (상시근로자 증가, 청년등 증가, 정규직 전환, 육아휴직 복귀)
 - 사후관리(유지기간 내 인원감소) 시 추징세액 계산 (방식 선택형: 비례/전액/티어드)
+  * 티어드: 정책 JSON의 clawback_tiers로 N구간 추징표 지정 가능 (이진 탐색으로 구간 조회)
+- 정확 모드(exact=True / --exact): 한도율·감소율을 정수 분수로 두고 정수 연산으로 반올림
+- 지역 자동 판정: --district-code / --address (employment_tax_credit_region 참고)
+- 기업규모 자동 판정: --revenue / --assets (+ --industry-code) (employment_tax_credit_size 참고)
+- 제외 업종 선별: 정책 JSON의 excluded_industry_codes(업종 코드 접두어)로 하위 분류까지 제외 (--industry-code)
+- 정책 파라미터 JSON 스키마 검증 (규모×지역 단가 누락, 값 범위, 유지기간 구조; 내용 해시별 캐시)
 - 간단한 CLI (예시): JSON 파라미터 + 인원 입력값을 받아 결과 출력
+  * --ndjson: 표준입력의 기업별 JSON Lines를 읽어 결과를 한 줄씩 출력 (employment_tax_credit_ndjson 참고)
 
 작성자: ChatGPT
 """
@@ -17,10 +24,23 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from enum import Enum
-from typing import Dict, Optional, Literal
+from collections import OrderedDict
+from fractions import Fraction
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, List, Optional, Literal, Sequence, Tuple
 import json
 import math
 import argparse
+import hashlib
+import sys
+import threading
+import time
+
+from employment_tax_credit_metrics import (
+    CLAWBACK_EVALUATIONS, CREDIT_COMPUTATIONS, POLICY_LOAD_SECONDS, POLICY_LOADS, add_metrics_argument, dump_metrics,
+)
+from employment_tax_credit_memprof import profiled_stage
 
 
 # -----------------------------
@@ -65,6 +85,103 @@ class HeadcountInputs:
         return max(0, self.curr_youth - self.prev_youth)
 
 
+@dataclass(frozen=True)
+class ClawbackTiers:
+    """
+    구간 추징표 (tiered 방식)
+    - breakpoints: 감소율 경계 (오름차순, 0~1)
+    - rates: 구간별 추징률 (len(breakpoints) + 1개)
+      감소율 < breakpoints[0] -> rates[0], breakpoints[i-1] ≤ 감소율 < breakpoints[i] -> rates[i],
+      감소율 ≥ breakpoints[-1] -> rates[-1]
+    예) breakpoints=(0.02, 0.05), rates=(0.0, 0.5, 1.0)  (기존 half/full 임계값 방식과 동일)
+
+    정확 모드용 정수 표현도 함께 보관합니다.
+    - scale: 경계값 분모들의 최소공배수, scaled_breakpoints: 경계값 × scale (정수)
+      감소율 ≥ 경계값  <=>  (감소 인원 × scale) // 기준 인원 ≥ 경계값 × scale
+    - rate_num / rate_den: 추징률의 정수 분수
+    """
+    breakpoints: Tuple[float, ...]
+    rates: Tuple[float, ...]
+
+    def __post_init__(self):
+        if len(self.rates) != len(self.breakpoints) + 1:
+            raise ValueError("rates는 breakpoints보다 1개 많아야 합니다")
+        fracs = [rate_to_fraction(b) for b in self.breakpoints]
+        scale = 1
+        for _, d in fracs:
+            scale = scale * d // math.gcd(scale, d)
+        rate_fracs = [rate_to_fraction(r) for r in self.rates]
+        object.__setattr__(self, "scale", scale)
+        object.__setattr__(self, "scaled_breakpoints", tuple(n * (scale // d) for n, d in fracs))
+        object.__setattr__(self, "rate_num", tuple(n for n, _ in rate_fracs))
+        object.__setattr__(self, "rate_den", tuple(d for _, d in rate_fracs))
+
+    @classmethod
+    def from_thresholds(cls, thresholds: Optional[Dict[str, float]] = None) -> "ClawbackTiers":
+        """기존 {"half": 0.02, "full": 0.05} 임계값 -> 0/50/100% 3구간 표 (같은 임계값은 캐시 재사용)"""
+        thresholds = thresholds or {"none": 0.0, "half": 0.02, "full": 0.05}
+        return _threshold_tiers(thresholds.get("half", 0.02), thresholds.get("full", 0.05))
+
+    def tier_index(self, decrease: int, base: int, exact: bool = False) -> int:
+        """감소 인원 / 기준 인원이 속하는 구간 번호 (이진 탐색, base > 0)"""
+        if exact:
+            return bisect_right(self.scaled_breakpoints, decrease * self.scale // base)
+        return bisect_right(self.breakpoints, decrease / float(base))
+
+
+@lru_cache(maxsize=64)
+def _threshold_tiers(half: float, full: float) -> ClawbackTiers:
+    return ClawbackTiers((half, full), (0.0, 0.5, 1.0))
+
+
+_INDUSTRY_CODE_JUNK = str.maketrans("", "", " -.")
+
+
+def normalize_industry_code(code: str) -> str:
+    """업종 코드 표기 정리 (공백·하이픈·마침표 제거, 영문 대문자): " c 10-1 " -> "C101" """
+    return str(code).translate(_INDUSTRY_CODE_JUNK).strip().upper()
+
+
+@dataclass(frozen=True)
+class IndustryIndex:
+    """
+    제외 업종 코드 접두어 색인 (한국표준산업분류 코드)
+    - 접두어가 같은 하위 분류도 제외: "5621"이면 56211(일반유흥주점업), 56212(무도유흥주점업)도 해당
+    - prefixes: 정렬된 접두어 목록 (다른 접두어로 이미 덮이는 긴 접두어는 제거)
+      이렇게 정리하면 코드를 덮을 수 있는 접두어는 정렬 순서상 코드 바로 앞의 1개뿐이므로
+      이진 탐색 한 번 + startswith 한 번으로 판정합니다.
+    """
+    prefixes: Tuple[str, ...]
+
+    @classmethod
+    def from_codes(cls, codes: Sequence[str]) -> "IndustryIndex":
+        kept: List[str] = []
+        for code in sorted({normalize_industry_code(c) for c in codes} - {""}):
+            if not kept or not code.startswith(kept[-1]):
+                kept.append(code)
+        return cls(tuple(kept))
+
+    def excludes(self, code: Optional[str]) -> bool:
+        """코드가 제외 업종(또는 그 하위 분류)이면 True (코드가 없으면 False)"""
+        if code is None:
+            return False
+        code = normalize_industry_code(code)
+        i = bisect_right(self.prefixes, code) - 1
+        return bool(code) and i >= 0 and code.startswith(self.prefixes[i])
+
+
+@lru_cache(maxsize=64)
+def _industry_index(codes: Tuple[str, ...]) -> IndustryIndex:
+    return IndustryIndex.from_codes(codes)
+
+
+def industry_index(params: "PolicyParameters") -> Optional[IndustryIndex]:
+    """정책의 excluded_industry_codes -> 접두어 색인 (없으면 None, 같은 코드 목록은 캐시 재사용)"""
+    if not params.excluded_industry_codes:
+        return None
+    return _industry_index(tuple(params.excluded_industry_codes))
+
+
 @dataclass
 class PolicyParameters:
     """
@@ -76,7 +193,9 @@ class PolicyParameters:
     - retention_years[size]: 공제 후 유지기간(년)
     - max_credit_total (선택): 총 공제 한도 (없으면 None)
     - min_tax_limit_rate (선택): 최저한세 한도율 (예: 0.07). 세전 세액과 함께 제공 시 적용.
-    - excluded_industries (선택): 제외 업종 코드 리스트
+    - excluded_industries (선택): 제외 업종명 리스트 (표시용)
+    - excluded_industry_codes (선택): 제외 업종 코드(한국표준산업분류) 접두어 리스트 — 하위 분류까지 제외
+    - clawback_tiers (선택): 구간 추징표 (tiered 방식의 기본 구간, 없으면 0/50/100% 2임계값)
     """
     per_head_basic: Dict[CompanySize, Dict[Region, int]]
     per_head_youth: Dict[CompanySize, Dict[Region, int]]
@@ -86,12 +205,19 @@ class PolicyParameters:
     max_credit_total: Optional[int] = None
     min_tax_limit_rate: Optional[float] = None
     excluded_industries: Optional[list] = None
+    excluded_industry_codes: Optional[list] = None
+    clawback_tiers: Optional[ClawbackTiers] = None
 
 
 # -----------------------------
 # 2) 계산 로직
 # -----------------------------
 
+# 레이블 조합별 지표는 미리 잡아 두고 호출마다 inc만 (핫 패스 부담 최소화)
+_COMPUTED_SINGLE = CREDIT_COMPUTATIONS.labels(mode="single")
+_CLAWBACK_SINGLE = CLAWBACK_EVALUATIONS.labels(mode="single")
+
+
 def calc_gross_credit(
     size: CompanySize,
     region: Region,
@@ -106,6 +232,7 @@ def calc_gross_credit(
       + converted_regular * per_head_conversion
       + returned_from_parental_leave * per_head_return_from_parental
     """
+    _COMPUTED_SINGLE.inc()
     basic_unit = params.per_head_basic[size][region]
     youth_unit = params.per_head_youth[size][region]
 
@@ -118,15 +245,35 @@ def calc_gross_credit(
     return max(0, int(amount))
 
 
+def rate_to_fraction(rate: float) -> Tuple[int, int]:
+    """
+    비율 -> (분자, 분모) 정수 쌍 (정책 파일에 적힌 십진 표기 그대로: 0.07 -> (7, 100))
+    - 정확 모드(exact=True)는 비율을 이 정수 쌍으로 바꿔 정수 연산만으로 계산합니다.
+    """
+    f = Fraction(repr(float(rate)))
+    return f.numerator, f.denominator
+
+
+def div_round_half_even(num: int, den: int) -> int:
+    """num / den을 정수 연산으로 반올림 (round half to even, 내장 round와 같은 규칙, num ≥ 0, den > 0)"""
+    q, r = divmod(num, den)
+    if 2 * r > den or (2 * r == den and q % 2 == 1):
+        q += 1
+    return q
+
+
 def apply_caps_and_min_tax(
     gross_credit: int,
     params: PolicyParameters,
     tax_before_credit: Optional[int] = None,
+    exact: bool = False,
 ) -> int:
     """
     - 총공제한도(max_credit_total) 적용
     - 최저한세(min_tax_limit_rate) 적용: tax_before_credit가 주어진 경우에만 적용
       예) 세전 세액이 1억원, 한도율 7%라면 공제가능 최대는 7백만원
+    - exact=True: 한도율을 정수 분수로 바꿔 floor(tax × 분자 / 분모)를 정수로 계산
+      (부동소수 곱셈 오차로 큰 금액에서 1원 차이가 나는 것을 방지)
     """
     credit = gross_credit
 
@@ -134,7 +281,11 @@ def apply_caps_and_min_tax(
         credit = min(credit, int(params.max_credit_total))
 
     if params.min_tax_limit_rate is not None and tax_before_credit is not None:
-        limit_by_min_tax = math.floor(params.min_tax_limit_rate * tax_before_credit)
+        if exact:
+            num, den = rate_to_fraction(params.min_tax_limit_rate)
+            limit_by_min_tax = int(tax_before_credit) * num // den
+        else:
+            limit_by_min_tax = math.floor(params.min_tax_limit_rate * tax_before_credit)
         credit = min(credit, limit_by_min_tax)
 
     return max(0, int(credit))
@@ -148,6 +299,8 @@ def calc_clawback(
     year_index_from_credit: int,
     method: Literal["proportional", "all_or_nothing", "tiered"] = "proportional",
     tiered_thresholds: Optional[Dict[str, float]] = None,
+    exact: bool = False,
+    tiers: Optional[ClawbackTiers] = None,
 ) -> int:
     """
     사후관리(유지기간 내 인원감소) 추징액 계산
@@ -165,9 +318,14 @@ def calc_clawback(
     - tiered_thresholds (tiered 전용):
         예시 {"none": 0.0, "half": 0.02, "full": 0.05}
         -> 감소율 < 2%: 0%, 2%~5%: 50%, ≥5%: 100%
+    - tiers (tiered 전용): 정책의 N구간 추징표 (params.clawback_tiers). 구간은 이진 탐색으로 찾음
+      (tiered_thresholds를 함께 주면 tiered_thresholds가 우선)
+    - exact: True면 감소율을 (감소 인원 / 기준 인원) 정수 분수로 두고 곱셈·비교·반올림을
+      모두 정수로 계산 (반올림 규칙은 float 모드와 같은 round half to even)
 
     반환: 해당 사후관리 연도별 추징세액 (원단위 정수)
     """
+    _CLAWBACK_SINGLE.inc()
     if year_index_from_credit < 1 or year_index_from_credit > retention_years_for_company:
         return 0
 
@@ -175,6 +333,20 @@ def calc_clawback(
     if base_headcount_at_credit <= 0 or decrease <= 0:
         return 0
 
+    if method == "tiered":
+        table = ClawbackTiers.from_thresholds(tiered_thresholds) if tiered_thresholds or tiers is None else tiers
+        i = table.tier_index(decrease, base_headcount_at_credit, exact)
+        if exact:
+            return div_round_half_even(int(credit_applied) * table.rate_num[i], table.rate_den[i])
+        if table.rates[i] >= 1.0:
+            return int(credit_applied)
+        return int(round(credit_applied * table.rates[i]))
+
+    if exact:
+        if method == "all_or_nothing":
+            return int(credit_applied)
+        return div_round_half_even(int(credit_applied) * decrease, base_headcount_at_credit)
+
     decrease_ratio = decrease / float(base_headcount_at_credit)
 
     if method == "proportional":
@@ -183,40 +355,232 @@ def calc_clawback(
     if method == "all_or_nothing":
         return int(credit_applied) if decrease > 0 else 0
 
-    if method == "tiered":
-        # 기본 임계값
-        thresholds = tiered_thresholds or {"none": 0.0, "half": 0.02, "full": 0.05}
-        if decrease_ratio < thresholds.get("half", 0.02):
-            return 0
-        elif decrease_ratio < thresholds.get("full", 0.05):
-            return int(round(credit_applied * 0.5))
-        else:
-            return int(credit_applied)
-
     # 기본값(안전장치): 비례
     return int(round(credit_applied * decrease_ratio))
 
 
 # -----------------------------
-# 3) 유틸 & CLI
+# 3) 정책 파라미터 스키마 검증
 # -----------------------------
 
-def load_params_from_json(path: str) -> PolicyParameters:
-    with open(path, "r", encoding="utf-8") as f:
-        cfg = json.load(f)
+class PolicyValidationError(ValueError):
+    """정책 파라미터 JSON이 스키마를 위반할 때 발생 (issues에 위반 목록 보관)"""
+
+    def __init__(self, issues: Sequence["PolicyIssue"]):
+        self.issues = tuple(issues)
+        lines = [f"- {i.path}: {i.message}" for i in self.issues]
+        super().__init__("정책 파라미터 검증 실패\n" + "\n".join(lines))
+
+
+@dataclass(frozen=True)
+class PolicyIssue:
+    """스키마 위반 1건 (path 예: "per_head_basic.중소기업.수도권")"""
+    path: str
+    message: str
+
+
+_SIZE_KEYS = tuple(s.value for s in CompanySize)
+_REGION_KEYS = tuple(r.value for r in Region)
+
+# 필드별 규칙 (kind, 필수 여부, 값 범위)
+# - int: 정수 (bool 제외), number: 정수/실수, size_region: 규모×지역 표, size: 규모별 값
+# - code_list: 업종 코드 문자열 리스트 (영문·숫자만, 공백·하이픈·마침표 허용)
+# - tiers: 구간 추징표 {"breakpoints": [...], "rates": [...]}
+_POLICY_SCHEMA = {
+    "per_head_basic": {"kind": "size_region", "required": True, "value": ("int", 0, None)},
+    "per_head_youth": {"kind": "size_region", "required": True, "value": ("int", 0, None)},
+    "per_head_conversion": {"kind": "scalar", "required": False, "value": ("int", 0, None)},
+    "per_head_return_from_parental": {"kind": "scalar", "required": False, "value": ("int", 0, None)},
+    "retention_years": {"kind": "size", "required": True, "value": ("int", 1, None)},
+    "max_credit_total": {"kind": "scalar", "required": False, "nullable": True, "value": ("int", 0, None)},
+    "min_tax_limit_rate": {"kind": "scalar", "required": False, "nullable": True, "value": ("number", 0.0, 1.0)},
+    "excluded_industries": {"kind": "str_list", "required": False, "nullable": True},
+    "excluded_industry_codes": {"kind": "code_list", "required": False, "nullable": True},
+    "clawback_tiers": {"kind": "tiers", "required": False, "nullable": True},
+}
+
+
+def _compile_value_check(spec):
+    kind, lo, hi = spec
+    type_name = "정수" if kind == "int" else "숫자"
+
+    def check(value, path: str, issues: List[PolicyIssue]) -> None:
+        is_num = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if kind == "int" and is_num and isinstance(value, float) and not value.is_integer():
+            is_num = False
+        if not is_num:
+            issues.append(PolicyIssue(path, f"{type_name}여야 합니다 (현재: {value!r})"))
+            return
+        if lo is not None and value < lo:
+            issues.append(PolicyIssue(path, f"{lo} 이상이어야 합니다 (현재: {value!r})"))
+        if hi is not None and value > hi:
+            issues.append(PolicyIssue(path, f"{hi} 이하여야 합니다 (현재: {value!r})"))
+
+    return check
+
+
+def _compile_mapping_check(keys: Tuple[str, ...], inner):
+    def check(value, path: str, issues: List[PolicyIssue]) -> None:
+        if not isinstance(value, dict):
+            issues.append(PolicyIssue(path, "객체(dict)여야 합니다"))
+            return
+        for k in value:
+            if k not in keys:
+                issues.append(PolicyIssue(f"{path}.{k}", f"알 수 없는 키입니다 (허용: {', '.join(keys)})"))
+        for k in keys:
+            if k not in value:
+                issues.append(PolicyIssue(f"{path}.{k}", "누락되었습니다"))
+            else:
+                inner(value[k], f"{path}.{k}", issues)
+
+    return check
+
+
+def _check_str_list(value, path: str, issues: List[PolicyIssue]) -> None:
+    if not isinstance(value, list):
+        issues.append(PolicyIssue(path, "문자열 리스트여야 합니다"))
+        return
+    for i, item in enumerate(value):
+        if not isinstance(item, str):
+            issues.append(PolicyIssue(f"{path}[{i}]", f"문자열이어야 합니다 (현재: {item!r})"))
+
+
+def _check_industry_codes(value, path: str, issues: List[PolicyIssue]) -> None:
+    n_before = len(issues)
+    _check_str_list(value, path, issues)
+    if len(issues) > n_before:
+        return
+    for i, item in enumerate(value):
+        code = normalize_industry_code(item)
+        if not code or not code.isascii() or not code.isalnum():
+            issues.append(PolicyIssue(f"{path}[{i}]", f"업종 코드는 영문·숫자여야 합니다 (현재: {item!r})"))
+
+
+def _check_clawback_tiers(value, path: str, issues: List[PolicyIssue]) -> None:
+    """{"breakpoints": [오름차순 0~1], "rates": [0~1, breakpoints보다 1개 많게]}"""
+    if not isinstance(value, dict):
+        issues.append(PolicyIssue(path, "객체(dict)여야 합니다"))
+        return
+    ratio_check = _compile_value_check(("number", 0.0, 1.0))
+    lists = {}
+    for key in ("breakpoints", "rates"):
+        items = value.get(key)
+        if not isinstance(items, list):
+            issues.append(PolicyIssue(f"{path}.{key}", "숫자 리스트여야 합니다"))
+            continue
+        n_before = len(issues)
+        for i, item in enumerate(items):
+            ratio_check(item, f"{path}.{key}[{i}]", issues)
+        if len(issues) == n_before:
+            lists[key] = items
+    breakpoints, rates = lists.get("breakpoints"), lists.get("rates")
+    if breakpoints is not None and any(a >= b for a, b in zip(breakpoints, breakpoints[1:])):
+        issues.append(PolicyIssue(f"{path}.breakpoints", "오름차순(중복 없이)이어야 합니다"))
+    if breakpoints is not None and rates is not None and len(rates) != len(breakpoints) + 1:
+        issues.append(PolicyIssue(
+            f"{path}.rates", f"breakpoints보다 1개 많아야 합니다 (breakpoints {len(breakpoints)}개, rates {len(rates)}개)"
+        ))
+
+
+def _compile_schema(schema: Dict[str, dict]):
+    """선언형 스키마를 (필드명, 필수, null 허용, 검사함수) 목록으로 변환 (모듈 로드 시 1회)"""
+    compiled = []
+    for name, rule in schema.items():
+        kind = rule["kind"]
+        if kind == "str_list":
+            check = _check_str_list
+        elif kind == "code_list":
+            check = _check_industry_codes
+        elif kind == "tiers":
+            check = _check_clawback_tiers
+        else:
+            check = _compile_value_check(rule["value"])
+            if kind == "size_region":
+                check = _compile_mapping_check(_SIZE_KEYS, _compile_mapping_check(_REGION_KEYS, check))
+            elif kind == "size":
+                check = _compile_mapping_check(_SIZE_KEYS, check)
+        compiled.append((name, rule["required"], rule.get("nullable", False), check))
+    return tuple(compiled)
+
+
+_POLICY_VALIDATORS = _compile_schema(_POLICY_SCHEMA)
+
+
+def validate_policy_config(cfg) -> List[PolicyIssue]:
+    """
+    정책 파라미터(JSON을 읽은 dict)를 스키마로 검증하여 위반 목록을 반환 (없으면 빈 리스트)
+    - 모든 규모×지역 단가가 채워졌는지, 값 범위(음수 금지, 한도율 0~1), retention_years 구조 확인
+    - 스키마에 없는 최상위 키는 무시합니다 (연도별 확장 항목 허용)
+    """
+    if not isinstance(cfg, dict):
+        return [PolicyIssue("$", "최상위 값은 객체(dict)여야 합니다")]
+    issues: List[PolicyIssue] = []
+    for name, required, nullable, check in _POLICY_VALIDATORS:
+        if name not in cfg:
+            if required:
+                issues.append(PolicyIssue(name, "누락되었습니다"))
+            continue
+        value = cfg[name]
+        if value is None:
+            if not nullable:
+                issues.append(PolicyIssue(name, "null일 수 없습니다"))
+            continue
+        check(value, name, issues)
+    return issues
+
+
+# 내용 해시(sha256) -> 검증 결과 캐시: 같은 파일은 한 번만 검증
+_VALIDATION_CACHE: "OrderedDict[str, Tuple[PolicyIssue, ...]]" = OrderedDict()
+_VALIDATION_CACHE_MAX = 256
+_VALIDATION_LOCK = threading.Lock()
+_LOADS_HIT = POLICY_LOADS.labels(cache="hit")
+_LOADS_MISS = POLICY_LOADS.labels(cache="miss")
+
+
+def policy_content_hash(raw: bytes) -> str:
+    """정책 파일 원문 바이트의 sha256 해시 (검증 캐시 키)"""
+    return hashlib.sha256(raw).hexdigest()
+
+
+def validate_policy_bytes(raw: bytes) -> Tuple[PolicyIssue, ...]:
+    """
+    정책 JSON 원문을 검증 (내용 해시 기준 캐시)
+    - 동일 내용의 파일은 경로/업로드 횟수와 관계없이 최초 1회만 파싱·검증합니다.
+    """
+    digest = policy_content_hash(raw)
+    with _VALIDATION_LOCK:
+        cached = _VALIDATION_CACHE.get(digest)
+        if cached is not None:
+            _VALIDATION_CACHE.move_to_end(digest)
+            _LOADS_HIT.inc()
+            return cached
+    _LOADS_MISS.inc()
+    start = time.perf_counter()
+    try:
+        cfg = json.loads(raw.decode("utf-8-sig"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        issues: Tuple[PolicyIssue, ...] = (PolicyIssue("$", f"JSON 파싱 실패: {e}"),)
+    else:
+        issues = tuple(validate_policy_config(cfg))
+    with _VALIDATION_LOCK:
+        _VALIDATION_CACHE[digest] = issues
+        while len(_VALIDATION_CACHE) > _VALIDATION_CACHE_MAX:
+            _VALIDATION_CACHE.popitem(last=False)
+    POLICY_LOAD_SECONDS.observe(time.perf_counter() - start)
+    return issues
+
+
+# -----------------------------
+# 4) 유틸 & CLI
+# -----------------------------
 
-    # JSON -> Enum key 변환
+def _params_from_config(cfg: dict) -> PolicyParameters:
+    """검증을 통과한 dict -> PolicyParameters (JSON 키 -> Enum 키 변환)"""
     def _to_size(k: str) -> CompanySize:
-        mapping = {
-            "중소기업": CompanySize.SME,
-            "중견기업": CompanySize.MIDSIZE,
-            "대기업": CompanySize.LARGE,
-        }
-        return mapping[k]
+        return CompanySize(k)
 
     def _to_region(k: str) -> Region:
-        mapping = {"수도권": Region.SEOUL_METRO, "지방": Region.NON_METRO}
-        return mapping[k]
+        return Region(k)
 
     per_head_basic = {
         _to_size(sk): { _to_region(rk): int(v) for rk, v in sv.items() }
@@ -231,36 +595,126 @@ def load_params_from_json(path: str) -> PolicyParameters:
     return PolicyParameters(
         per_head_basic=per_head_basic,
         per_head_youth=per_head_youth,
-        per_head_conversion=int(cfg.get("per_head_conversion", 0)),
-        per_head_return_from_parental=int(cfg.get("per_head_return_from_parental", 0)),
+        per_head_conversion=int(cfg.get("per_head_conversion") or 0),
+        per_head_return_from_parental=int(cfg.get("per_head_return_from_parental") or 0),
         retention_years=retention_years,
         max_credit_total=(int(cfg["max_credit_total"]) if cfg.get("max_credit_total") is not None else None),
         min_tax_limit_rate=(float(cfg["min_tax_limit_rate"]) if cfg.get("min_tax_limit_rate") is not None else None),
         excluded_industries=cfg.get("excluded_industries"),
+        excluded_industry_codes=cfg.get("excluded_industry_codes"),
+        clawback_tiers=(
+            ClawbackTiers(
+                tuple(float(v) for v in cfg["clawback_tiers"]["breakpoints"]),
+                tuple(float(v) for v in cfg["clawback_tiers"]["rates"]),
+            )
+            if cfg.get("clawback_tiers") is not None else None
+        ),
     )
 
 
-def main():
-    parser = argparse.ArgumentParser(description="통합고용세액공제 계산기 (템플릿)")
-    parser.add_argument("--company-size", choices=[s.value for s in CompanySize], required=True)
-    parser.add_argument("--region", choices=[r.value for r in Region], required=True)
+def params_to_dict(params: PolicyParameters) -> dict:
+    """PolicyParameters -> JSON 직렬화 가능한 dict (정책 JSON과 같은 형식, Enum 키는 한글 값)"""
+    out = {
+        "per_head_basic": {k.value: {kk.value: v for kk, v in d.items()} for k, d in params.per_head_basic.items()},
+        "per_head_youth": {k.value: {kk.value: v for kk, v in d.items()} for k, d in params.per_head_youth.items()},
+        "per_head_conversion": params.per_head_conversion,
+        "per_head_return_from_parental": params.per_head_return_from_parental,
+        "retention_years": {k.value: v for k, v in (params.retention_years or {}).items()},
+        "max_credit_total": params.max_credit_total,
+        "min_tax_limit_rate": params.min_tax_limit_rate,
+        "excluded_industries": params.excluded_industries,
+    }
+    # 선택 항목은 있을 때만 기록 (없는 정책의 지문·결과 캐시 키가 바뀌지 않도록)
+    if params.excluded_industry_codes is not None:
+        out["excluded_industry_codes"] = params.excluded_industry_codes
+    if params.clawback_tiers is not None:
+        out["clawback_tiers"] = {
+            "breakpoints": list(params.clawback_tiers.breakpoints),
+            "rates": list(params.clawback_tiers.rates),
+        }
+    return out
+
+
+@profiled_stage("policy_load")
+def load_params_from_bytes(raw: bytes) -> PolicyParameters:
+    """정책 JSON 원문 바이트 -> PolicyParameters (스키마 위반 시 PolicyValidationError)"""
+    issues = validate_policy_bytes(raw)
+    if issues:
+        raise PolicyValidationError(issues)
+    return _params_from_config(json.loads(raw.decode("utf-8-sig")))
+
+
+def load_params_from_dict(cfg: dict) -> PolicyParameters:
+    """dict 형태의 정책 파라미터 -> PolicyParameters (업로드/데모 설정용, 임시 파일 불필요)"""
+    raw = json.dumps(cfg, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return load_params_from_bytes(raw)
+
+
+def load_params_from_json(path: str) -> PolicyParameters:
+    with open(path, "rb") as f:
+        raw = f.read()
+    return load_params_from_bytes(raw)
+
+
+def build_arg_parser(parser_class=argparse.ArgumentParser) -> argparse.ArgumentParser:
+    """CLI 인자 정의 (데몬은 출력을 가로채는 parser_class로 같은 정의를 재사용)"""
+    parser = parser_class(description="통합고용세액공제 계산기 (템플릿)")
+    parser.add_argument("--company-size", choices=[s.value for s in CompanySize], help="(--ndjson이 아니면 필수, --revenue/--assets로 대체 가능)")
+    parser.add_argument("--revenue", type=float, default=None, help="평균매출액(원) — --assets와 함께 주면 기업규모 자동 판정")
+    parser.add_argument("--assets", type=float, default=None, help="자산총액(원)")
+    parser.add_argument("--region", choices=[r.value for r in Region], help="(--ndjson이 아니면 필수, --district-code/--address로 대체 가능)")
+    parser.add_argument("--district-code", default=None, help="행정구역 코드 (법정동/시군구) — 수도권/지방 자동 판정")
+    parser.add_argument("--address", default=None, help="사업장 주소 — 수도권/지방 자동 판정 (코드가 우선)")
     parser.add_argument("--params-json", required=True, help="법령 단가·기간 설정 JSON 경로")
-    parser.add_argument("--prev-total", type=int, required=True)
-    parser.add_argument("--curr-total", type=int, required=True)
+    parser.add_argument("--prev-total", type=int, help="(--ndjson이 아니면 필수)")
+    parser.add_argument("--curr-total", type=int, help="(--ndjson이 아니면 필수)")
     parser.add_argument("--prev-youth", type=int, default=0)
     parser.add_argument("--curr-youth", type=int, default=0)
     parser.add_argument("--converted-regular", type=int, default=0)
     parser.add_argument("--returned-parental", type=int, default=0)
     parser.add_argument("--tax-before-credit", type=int, default=None, help="최저한세 적용 시 세전세액")
+    parser.add_argument("--industry-code", default=None, help="업종 코드(한국표준산업분류) — 정책의 제외 업종이면 공제 대상에서 제외")
     parser.add_argument("--clawback-followup", type=int, default=None, help="사후관리 연도 말 상시근로자수(예: 공제+1년차)")
     parser.add_argument("--clawback-year-index", type=int, default=1, help="공제연도로부터 n년차(1~유지기간)")
     parser.add_argument("--clawback-method", choices=["proportional", "all_or_nothing", "tiered"], default="proportional")
-
-    args = parser.parse_args()
-
-    size = CompanySize(args.company_size)
-    region = Region(args.region)
-    params = load_params_from_json(args.params_json)
+    parser.add_argument("--exact", action="store_true", help="최저한세·추징액을 정수 연산으로 계산 (부동소수 반올림 오차 없음)")
+    parser.add_argument("--ndjson", action="store_true", help="표준입력의 JSON Lines(기업별 1줄)를 읽어 결과를 표준출력에 1줄씩 기록")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="--ndjson 모드에서 한 번에 모아 계산할 줄 수 (대화형 파이프는 1)")
+    add_metrics_argument(parser)
+    return parser
+
+
+def print_result(args: argparse.Namespace, parser: argparse.ArgumentParser, params: PolicyParameters, out=None) -> None:
+    """단건 계산 결과를 CLI 형식으로 출력 (out 기본값: 표준출력)"""
+    out = out or sys.stdout
+    region_value = args.region
+    if region_value is None and (args.district_code or args.address):
+        from employment_tax_credit_region import load_region_resolver
+
+        resolved = load_region_resolver().resolve(args.district_code, args.address)
+        if resolved is None:
+            parser.error("--district-code/--address로 지역을 판정할 수 없습니다 (--region을 지정하세요)")
+        region_value = resolved.value
+    size_value = args.company_size
+    if size_value is None and args.revenue is not None and args.assets is not None:
+        from employment_tax_credit_size import classify_size
+
+        size_value = classify_size(
+            args.revenue, args.assets, industry_code=args.industry_code, headcount=args.curr_total,
+        ).value
+    missing = [
+        opt for opt, val in (
+            ("--company-size", size_value),
+            ("--region", region_value),
+            ("--prev-total", args.prev_total),
+            ("--curr-total", args.curr_total),
+        ) if val is None
+    ]
+    if missing:
+        parser.error(f"다음 인자가 필요합니다: {', '.join(missing)}")
+
+    size = CompanySize(size_value)
+    region = Region(region_value)
 
     heads = HeadcountInputs(
         prev_total=args.prev_total,
@@ -271,18 +725,25 @@ def main():
         returned_from_parental_leave=args.returned_parental,
     )
 
+    index = industry_index(params)
+    if index is not None and index.excludes(args.industry_code):
+        print("=== 통합고용세액공제 계산 결과 ===", file=out)
+        print(f"- 기업규모 / 지역: {size.value} / {region.value}", file=out)
+        print(f"- 업종 코드 {args.industry_code}: 제외 업종이므로 공제 대상이 아닙니다.", file=out)
+        return
+
     gross = calc_gross_credit(size, region, heads, params)
-    applied = apply_caps_and_min_tax(gross, params, tax_before_credit=args.tax_before_credit)
+    applied = apply_caps_and_min_tax(gross, params, tax_before_credit=args.tax_before_credit, exact=args.exact)
     retention = params.retention_years[size]
 
-    print("=== 통합고용세액공제 계산 결과 ===")
-    print(f"- 기업규모 / 지역: {size.value} / {region.value}")
-    print(f"- 직전/당해 상시근로자수: {heads.prev_total} -> {heads.curr_total} (증가 {heads.increase_total}명)")
-    print(f"- 직전/당해 청년등: {heads.prev_youth} -> {heads.curr_youth} (증가 {heads.increase_youth}명)")
-    print(f"- 정규직 전환: {heads.converted_regular}명, 육아휴직 복귀: {heads.returned_from_parental_leave}명")
-    print(f"- 총공제액(최저한세/한도 적용 전): {gross:,}원")
-    print(f"- 적용 공제액(최저한세/한도 적용 후): {applied:,}원")
-    print(f"- 유지기간(회사규모별): {retention}년")
+    print("=== 통합고용세액공제 계산 결과 ===", file=out)
+    print(f"- 기업규모 / 지역: {size.value} / {region.value}", file=out)
+    print(f"- 직전/당해 상시근로자수: {heads.prev_total} -> {heads.curr_total} (증가 {heads.increase_total}명)", file=out)
+    print(f"- 직전/당해 청년등: {heads.prev_youth} -> {heads.curr_youth} (증가 {heads.increase_youth}명)", file=out)
+    print(f"- 정규직 전환: {heads.converted_regular}명, 육아휴직 복귀: {heads.returned_from_parental_leave}명", file=out)
+    print(f"- 총공제액(최저한세/한도 적용 전): {gross:,}원", file=out)
+    print(f"- 적용 공제액(최저한세/한도 적용 후): {applied:,}원", file=out)
+    print(f"- 유지기간(회사규모별): {retention}년", file=out)
 
     # 사후관리(옵션)
     if args.clawback_followup is not None:
@@ -293,12 +754,41 @@ def main():
             retention_years_for_company=retention,
             year_index_from_credit=args.clawback_year_index,
             method=args.clawback_method,
+            exact=args.exact,
+            tiers=params.clawback_tiers,
+        )
+        print("\n--- 사후관리(추징) 시뮬레이션 ---", file=out)
+        print(f"- 공제연도 말 상시근로자수: {heads.curr_total}명", file=out)
+        print(f"- 사후연도({args.clawback_year_index}년차) 말 상시근로자수: {args.clawback_followup}명", file=out)
+        print(f"- 추징방식: {args.clawback_method}", file=out)
+        print(f"- 추징세액: {clawback:,}원", file=out)
+
+
+def main():
+    parser = build_arg_parser()
+    args = parser.parse_args()
+
+    try:
+        params = load_params_from_json(args.params_json)
+    except PolicyValidationError as e:
+        parser.error(str(e))
+
+    if args.ndjson:
+        from employment_tax_credit_ndjson import iter_results, dumps_line
+
+        out = sys.stdout.buffer
+        records = iter_results(
+            sys.stdin, params, args.clawback_method, chunk_size=max(1, args.chunk_size), exact=args.exact,
         )
-        print("\n--- 사후관리(추징) 시뮬레이션 ---")
-        print(f"- 공제연도 말 상시근로자수: {heads.curr_total}명")
-        print(f"- 사후연도({args.clawback_year_index}년차) 말 상시근로자수: {args.clawback_followup}명")
-        print(f"- 추징방식: {args.clawback_method}")
-        print(f"- 추징세액: {clawback:,}원")
+        for n, rec in enumerate(records, start=1):
+            out.write(dumps_line(rec))
+            if n % max(1, args.chunk_size) == 0:
+                out.flush()
+        out.flush()
+        dump_metrics(args.metrics_out)
+        return
+
+    print_result(args, parser, params)
 
 
 if __name__ == "__main__":
@@ -319,6 +809,7 @@ if __name__ == "__main__":
     #   "retention_years": {"중소기업": 3, "중견기업": 3, "대기업": 2},
     #   "max_credit_total": null,
     #   "min_tax_limit_rate": 0.07,
-    #   "excluded_industries": ["유흥주점업", "기타소비성서비스업"]
+    #   "excluded_industries": ["유흥주점업", "기타소비성서비스업"],
+    #   "excluded_industry_codes": ["56211", "56212", "91291"]
     # }
     main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+통합고용세액공제 CLI 데몬용 얇은 클라이언트 (employment_tax_credit_daemon 참고)
+
+employment_tax_credit_calc.py와 같은 인자를 받아 데몬에 전달하고, 같은 출력·종료 코드를 돌려줍니다.
+호출마다 드는 비용이 인터프리터 시작뿐이 되도록 표준 라이브러리 중 socket/json만 import합니다.
+(`python -S`로 실행하면 site 초기화도 생략)
+
+    python -S employment_tax_credit_client.py --company-size 중소기업 --region 지방 \\
+        --params-json policy_params_example.json --prev-total 50 --curr-total 60
+
+- 소켓 경로: 환경변수 TAX_CREDIT_DAEMON_SOCKET
+  (기본 $XDG_RUNTIME_DIR/employment_tax_credit.sock, 없으면 /tmp/employment_tax_credit-<uid>/employment_tax_credit.sock)
+- --ndjson(표준입력 스트리밍)이거나 데몬이 떠 있지 않으면 새 인터프리터(-S 없이)로 CLI를 직접 실행합니다.
+"""
+
+from __future__ import annotations
+import json
+import os
+import socket
+import sys
+
+
+# 다른 사용자가 미리 만들거나 가로챌 수 없도록 사용자 전용 디렉터리 안에 둠
+# ($XDG_RUNTIME_DIR, 없으면 데몬이 0700으로 만드는 /tmp/employment_tax_credit-<uid>/)
+DEFAULT_SOCKET = os.environ.get("TAX_CREDIT_DAEMON_SOCKET") or os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR")
+    or os.path.join("/tmp", f"employment_tax_credit-{os.getuid() if hasattr(os, 'getuid') else 0}"),
+    "employment_tax_credit.sock",
+)
+CLI_PROG = "employment_tax_credit_calc.py"
+CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), CLI_PROG)
+
+
+class DaemonClient:
+    """데몬 연결 (연결을 열어 둔 채 여러 번 call 가능)"""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float | None = 30.0):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(socket_path)
+        self._file = self._sock.makefile("rwb")
+
+    def call(self, argv: list[str], cwd: str | None = None) -> dict:
+        req = {"argv": list(argv), "cwd": cwd or os.getcwd()}
+        self._file.write(json.dumps(req, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("데몬이 연결을 닫았습니다")
+        return json.loads(line)
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self) -> "DaemonClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _run_local(argv: list[str]) -> int:
+    """
+    데몬을 쓸 수 없을 때: 새 인터프리터로 CLI를 실행 (현재 프로세스를 대체)
+    - `python -S`로 시작한 클라이언트는 site-packages(pandas/numpy)를 못 찾으므로 같은 프로세스에서
+      import하지 않고, -S 없이 CLI 스크립트를 다시 실행합니다. 표준입력·출력과 종료 코드는 그대로 이어짐
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.execv(sys.executable, [sys.executable, CLI_PATH, *argv])
+    return 1  # execv는 돌아오지 않음
+
+
+def client_main(argv: list[str]) -> int:
+    if "--ndjson" in argv:
+        return _run_local(argv)
+    try:
+        with DaemonClient(DEFAULT_SOCKET) as client:
+            resp = client.call(argv)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return _run_local(argv)
+    sys.stdout.write(resp["stdout"])
+    sys.stderr.write(resp["stderr"])
+    return int(resp["exit"])
+
+
+if __name__ == "__main__":
+    sys.exit(client_main(sys.argv[1:]))
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+통합고용세액공제 CLI 상주(데몬) 모드
+
+기업마다 CLI를 한 번씩 호출하는 기존 스크립트는 호출할 때마다 파이썬 시작, argparse 구성,
+정책 JSON 로딩·검증 비용을 치릅니다. 데몬은 이 작업을 한 번만 해 두고 로컬 Unix 소켓으로
+요청을 받아, employment_tax_credit_calc.py와 똑같은 출력을 돌려줍니다.
+
+    # 데몬 시작 (정책 파일을 미리 읽어 검증해 둠)
+    python employment_tax_credit_daemon.py --preload policy_params_example.json &
+
+    # 얇은 클라이언트: 기존 CLI 인자를 그대로 전달하고 같은 출력·종료 코드를 돌려줌
+    python -S employment_tax_credit_client.py --company-size 중소기업 --region 지방 \\
+        --params-json policy_params_example.json --prev-total 50 --curr-total 60
+
+프로토콜 (한 연결에서 여러 요청 가능, 요청·응답 모두 UTF-8 JSON 한 줄)
+    요청: {"argv": ["--company-size", "중소기업", ...], "cwd": "/작업/폴더"}
+    응답: {"exit": 0, "stdout": "...", "stderr": "..."}
+파이썬에서 employment_tax_credit_client.DaemonClient로 연결을 열어 두고 호출하면
+요청 1건은 소켓 왕복(1ms 미만)으로 끝납니다.
+
+- 정책 파일은 (경로, 수정시각, 크기)별로 캐시하므로 파일을 고치면 다음 요청부터 새 내용이 적용됩니다.
+- --ndjson(표준입력 스트리밍)은 데몬에서 처리하지 않고 클라이언트가 CLI를 직접 실행합니다.
+- --metrics-port를 주면 요청 수·지연시간과 계산 지표를 로컬 HTTP GET /metrics로 노출합니다.
+"""
+
+from __future__ import annotations
+import argparse
+import io
+import json
+import os
+import signal
+import stat
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from employment_tax_credit_client import CLI_PROG, DEFAULT_SOCKET
+from employment_tax_credit_metrics import counter, histogram
+
+
+_REQUESTS = counter("tax_credit_daemon_requests_total", "데몬 요청 수 (종료 코드별)", ("exit",))
+_REQUEST_SECONDS = histogram("tax_credit_daemon_request_seconds", "데몬 요청 1건 처리 소요시간(초)")
+
+
+class _ParserExit(Exception):
+    def __init__(self, status: int):
+        self.status = status
+
+
+class _CapturingParser(argparse.ArgumentParser):
+    """도움말·오류 메시지를 요청별 버퍼에 쓰고, 종료 대신 _ParserExit를 던지는 parser"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("prog", CLI_PROG)
+        super().__init__(*args, **kwargs)
+        self.out: io.StringIO = io.StringIO()
+        self.err: io.StringIO = io.StringIO()
+
+    def _print_message(self, message, file=None):
+        if message:
+            (self.err if file is sys.stderr else self.out).write(message)
+
+    def exit(self, status=0, message=None):
+        if message:
+            self.err.write(message)
+        raise _ParserExit(status)
+
+
+class CalcServer:
+    """
+    CLI 요청 처리기 (소켓과 무관한 부분)
+    - preload: 시작 시 미리 읽어 검증해 둘 정책 JSON 경로 목록
+    """
+
+    def __init__(self, preload: Optional[List[str]] = None):
+        self._lock = threading.Lock()
+        self._policies: Dict[str, Tuple[Tuple[int, int], object]] = {}
+        self._local = threading.local()
+        for path in preload or []:
+            self.policy(os.path.abspath(path))
+
+    def policy(self, path: str):
+        """절대 경로 -> PolicyParameters ((수정시각, 크기)가 같으면 캐시 재사용)"""
+        from employment_tax_credit_calc import load_params_from_json
+
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self._policies.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        params = load_params_from_json(path)
+        with self._lock:
+            self._policies[path] = (stamp, params)
+        return params
+
+    def _parser(self) -> _CapturingParser:
+        # 인자 정의는 스레드별로 한 번만 만들고, 요청마다 출력 버퍼만 교체
+        parser = getattr(self._local, "parser", None)
+        if parser is None:
+            from employment_tax_credit_calc import build_arg_parser
+
+            parser = self._local.parser = build_arg_parser(_CapturingParser)
+        parser.out, parser.err = io.StringIO(), io.StringIO()
+        return parser
+
+    def handle(self, argv: List[str], cwd: str) -> dict:
+        """CLI 인자 -> {"exit", "stdout", "stderr"} (employment_tax_credit_calc.main과 같은 출력)"""
+        from employment_tax_credit_calc import PolicyValidationError, print_result
+
+        start = time.perf_counter()
+        parser = self._parser()
+        status = 0
+        try:
+            args = parser.parse_args(argv)
+            if args.ndjson:
+                parser.error("--ndjson은 데몬에서 처리하지 않습니다 (CLI를 직접 실행하세요)")
+            try:
+                params = self.policy(os.path.join(cwd, args.params_json))
+            except PolicyValidationError as e:
+                parser.error(str(e))
+            print_result(args, parser, params, out=parser.out)
+        except _ParserExit as e:
+            status = e.status
+        except Exception as e:  # CLI였다면 traceback과 함께 종료됐을 오류
+            parser.err.write(f"{type(e).__name__}: {e}\n")
+            status = 1
+        _REQUESTS.labels(exit=status).inc()
+        _REQUEST_SECONDS.observe(time.perf_counter() - start)
+        return {"exit": status, "stdout": parser.out.getvalue(), "stderr": parser.err.getvalue()}
+
+    def serve(self, socket_path: str = DEFAULT_SOCKET) -> None:
+        """Unix 소켓에서 요청 대기 (연결마다 스레드 1개)"""
+        import socketserver
+
+        server_self = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        req = json.loads(line)
+                        resp = server_self.handle(list(req["argv"]), req.get("cwd") or os.getcwd())
+                    except (ValueError, KeyError, TypeError) as e:
+                        resp = {"exit": 2, "stdout": "", "stderr": f"잘못된 요청: {e}\n"}
+                    self.wfile.write(json.dumps(resp, ensure_ascii=False).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+
+        _prepare_socket_dir(os.path.dirname(os.path.abspath(socket_path)))
+        if os.path.lexists(socket_path):
+            if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+                raise SystemExit(f"소켓 경로에 다른 파일이 있습니다: {socket_path}")
+            os.unlink(socket_path)
+        # kill(SIGTERM)로 끝낼 때도 finally에서 소켓 파일을 지우도록 정상 종료로 변환
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        # bind 시점부터 소유자만 접근 가능하도록 umask를 먼저 설정 (bind 후 chmod 사이의 틈 제거)
+        old_umask = os.umask(0o177)
+        try:
+            server = socketserver.ThreadingUnixStreamServer(socket_path, _Handler)
+        finally:
+            os.umask(old_umask)
+        with server:
+            server.daemon_threads = True
+            try:
+                server.serve_forever()
+            finally:
+                os.unlink(socket_path)
+
+
+def _prepare_socket_dir(path: str) -> None:
+    """
+    소켓 디렉터리 준비: 없으면 0700으로 만들고, 있으면 현재 사용자 소유이며
+    다른 사용자가 쓸 수 없는 디렉터리인지 확인 (아니면 종료)
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        raise SystemExit(f"소켓 디렉터리가 디렉터리가 아닙니다: {path}")
+    if hasattr(os, "getuid") and st.st_uid != os.getuid():
+        raise SystemExit(f"소켓 디렉터리의 소유자가 현재 사용자가 아닙니다: {path}")
+    if st.st_mode & 0o022:
+        raise SystemExit(f"소켓 디렉터리를 다른 사용자가 쓸 수 있습니다 (chmod 700 필요): {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="통합고용세액공제 CLI 데몬")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix 소켓 경로 (환경변수 TAX_CREDIT_DAEMON_SOCKET)")
+    parser.add_argument("--preload", action="append", default=[], help="미리 읽어 둘 정책 JSON (여러 번 지정 가능)")
+    parser.add_argument("--metrics-port", type=int, default=None, help="지표를 노출할 로컬 HTTP 포트 (GET /metrics)")
+    args = parser.parse_args()
+    if args.metrics_port is not None:
+        from employment_tax_credit_metrics import start_http_server
+
+        start_http_server(args.metrics_port)
+    CalcServer(args.preload).serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
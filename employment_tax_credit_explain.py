@@ -0,0 +1,464 @@
+# -*- coding: utf-8 -*-
+"""
+기업별 계산 결과 -> 고객 안내문용 한국어 설명 (비동기 LLM 호출 + 결과 해시 캐시)
+
+고객 안내문에는 기업마다 총공제액과 적용 공제액의 차이(최저한세·한도), 유지기간, 사후관리 추징표를
+몇 문장으로 풀어 쓴 설명이 들어갑니다. 이 모듈은 계산 결과를 구조화된 사실(facts)로 정리해 OpenAI 호환
+Chat Completions API에 보내고, 돌아온 설명을 기업별로 모읍니다.
+
+- 동시 요청 수 제한: asyncio.Semaphore(concurrency). 결과는 입력 순서대로 나오며, 대기 중인 요청은
+  concurrency × 4개까지만 만들어 두므로 1만 건도 메모리가 일정합니다 (render.RenderPool과 같은 방식).
+- 재시도: 429·5xx·연결 오류·시간 초과는 지수 백오프(+지터)로 max_retries회까지 재시도.
+  서버가 Retry-After를 주면 그 값을 따릅니다.
+- 캐시: (모델, 프롬프트 버전, 사실 JSON)의 해시 -> 설명 (로컬 SQLite). 결과가 같은 기업·재실행은 API를 부르지 않습니다.
+- 오프라인 시험: --serve-mock PORT로 로컬 모의 서버(/v1/chat/completions)를 띄우고 --base-url로 연결합니다.
+  모의 서버는 사실 JSON으로 정해진 문장을 만들며, 지연·실패율을 흉내 낼 수 있습니다.
+
+사용 예)
+    python employment_tax_credit_explain.py --serve-mock 8089 --mock-latency 0.2 &
+    python employment_tax_credit_explain.py results.ndjson --base-url http://127.0.0.1:8089/v1 --out letters.ndjson
+    python employment_tax_credit_explain.py portfolio.csv --params-json policy.json --concurrency 32
+
+API 키는 OPENAI_API_KEY 환경변수 (모의 서버는 아무 값이나 허용), 모델은 --model 또는 TAX_CREDIT_EXPLAIN_MODEL.
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, Iterable, Iterator, List, Optional
+
+from employment_tax_credit_cache import digest_key
+from employment_tax_credit_metrics import add_metrics_argument, counter, dump_metrics, histogram
+
+try:  # 선택 의존성: OpenAI 호환 비동기 클라이언트
+    import openai
+except ImportError:  # pragma: no cover - 설치 환경에 따라 다름
+    openai = None
+
+
+DEFAULT_MODEL = os.environ.get("TAX_CREDIT_EXPLAIN_MODEL", "gpt-4o-mini")
+DEFAULT_CONCURRENCY = 16
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF = 0.5       # 첫 재시도 대기(초), 이후 2배씩
+DEFAULT_MAX_BACKOFF = 30.0
+DEFAULT_TIMEOUT = 60.0
+# 프롬프트를 바꾸면 올려서 이전 설명이 캐시에서 나오지 않도록 함
+PROMPT_VERSION = 1
+
+SYSTEM_PROMPT = (
+    "당신은 세무법인의 고객 안내문 작성을 돕습니다. 사용자가 주는 JSON은 한 기업의 통합고용세액공제"
+    "(조세특례제한법 제29조의8) 계산 결과입니다. JSON에 있는 값만 근거로 3~5문장의 한국어 설명을 쓰세요.\n"
+    "- 총공제액(gross_credit)과 적용 공제액(applied_credit)을 원 단위로 천 단위 구분 기호를 넣어 적습니다.\n"
+    "- min_tax_limited가 true이면 최저한세·공제 한도 때문에 limited_amount만큼 줄었다고 설명합니다.\n"
+    "- retention_years 동안 상시근로자 수를 유지해야 하며, clawback_schedule이 있으면 연차별 추징 예상액과 합계를 설명합니다.\n"
+    "- 계산에 없는 수치를 만들거나 절세 권유를 하지 말고, 존댓말로 쓰세요."
+)
+
+_REQUESTS = counter("tax_credit_explain_requests_total", "설명 생성 요청 수 (결과별)", ("outcome",))
+_REQUEST_SECONDS = histogram("tax_credit_explain_request_seconds", "설명 API 호출 1건 소요시간(초, 재시도 포함)")
+
+
+# -----------------------------
+# 1) 계산 결과 -> 사실(facts)
+# -----------------------------
+
+FACT_INPUT_FIELDS = ("name", "company_size", "region", "prev_total", "curr_total", "prev_youth", "curr_youth")
+
+
+def explanation_facts(record: dict, inputs: Optional[dict] = None) -> dict:
+    """
+    결과 레코드(portfolio_records / --ndjson 출력 형식) [+ 입력 행] -> 설명에 쓰는 사실 dict
+    - min_tax_limited / limited_amount: 적용 공제액이 총공제액보다 작으면 (최저한세·한도)
+    """
+    gross = int(record["gross_credit"])
+    applied = int(record["applied_credit"])
+    schedule = [int(x) for x in (record.get("clawback_schedule") or [])]
+    facts = {
+        "company_id": record.get("company_id"),
+        "gross_credit": gross,
+        "applied_credit": applied,
+        "min_tax_limited": applied < gross,
+        "limited_amount": gross - applied,
+        "retention_years": int(record["retention_years"]),
+        "clawback_schedule": [{"year": i, "amount": amount} for i, amount in enumerate(schedule, start=1)],
+        "clawback_total": int(record.get("clawback_total") or sum(schedule)),
+    }
+    for key in FACT_INPUT_FIELDS:
+        value = (inputs or {}).get(key, record.get(key))
+        if value is not None and value == value:
+            facts[key] = value.item() if hasattr(value, "item") else value
+    return facts
+
+
+def facts_key(facts: dict, model: str) -> str:
+    """(모델, 프롬프트 버전, 사실 JSON) -> 캐시 키"""
+    canonical = json.dumps(facts, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return digest_key(f"{model}|{PROMPT_VERSION}|{canonical}")
+
+
+def _messages(facts: dict) -> List[dict]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": json.dumps(facts, ensure_ascii=False, sort_keys=True)},
+    ]
+
+
+# -----------------------------
+# 2) 설명 캐시 (SQLite)
+# -----------------------------
+
+class ExplanationCache:
+    """사실 해시 -> 설명 문자열 (로컬 SQLite, WAL). path=":memory:"면 실행 중에만 보관"""
+
+    def __init__(self, path: str = "tax_credit_explanations.sqlite3"):
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS explanations ("
+            " key TEXT PRIMARY KEY, model TEXT NOT NULL, text TEXT NOT NULL, created REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM explanations WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, key: str, model: str, text: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO explanations(key, model, text, created) VALUES (?, ?, ?, ?)",
+                (key, model, text, time.time()),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0])
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# -----------------------------
+# 3) 비동기 설명 생성기
+# -----------------------------
+
+def _retryable(exc: Exception) -> bool:
+    if isinstance(exc, (openai.APIConnectionError, openai.APITimeoutError, openai.RateLimitError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class Explainer:
+    """
+    OpenAI 호환 API로 기업별 설명을 만드는 비동기 생성기
+    - base_url: 로컬 모의 서버 등 (기본: OPENAI_BASE_URL 또는 OpenAI)
+    - cache: ExplanationCache (없으면 캐시 없이 매번 호출)
+    - concurrency: 동시에 보내는 요청 수 상한
+    """
+
+    def __init__(
+        self,
+        model: str = DEFAULT_MODEL,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        cache: Optional[ExplanationCache] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        timeout: float = DEFAULT_TIMEOUT,
+        temperature: float = 0.2,
+        max_tokens: int = 500,
+    ):
+        if openai is None:
+            raise RuntimeError("openai 패키지가 필요합니다 (pip install openai)")
+        self.model = model
+        self.cache = cache
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        if api_key is None:
+            api_key = os.environ.get("OPENAI_API_KEY") or ("local" if base_url or os.environ.get("OPENAI_BASE_URL") else None)
+        # 재시도는 여기서 직접 (백오프·지표를 한곳에서 관리)
+        self._client = openai.AsyncOpenAI(base_url=base_url, api_key=api_key, max_retries=0, timeout=timeout)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _complete(self, facts: dict) -> str:
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                response = await self._client.chat.completions.create(
+                    model=self.model, messages=_messages(facts),
+                    temperature=self.temperature, max_tokens=self.max_tokens,
+                )
+                break
+            except Exception as e:
+                if not _retryable(e) or attempt >= self.max_retries:
+                    raise
+                _REQUESTS.labels(outcome="retry").inc()
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+                attempt += 1
+                await asyncio.sleep(delay)
+        _REQUEST_SECONDS.observe(time.perf_counter() - started)
+        return (response.choices[0].message.content or "").strip()
+
+    async def explain(self, facts: dict) -> dict:
+        """사실 dict -> {"company_id", "explanation", "cached"} 또는 {"company_id", "errors": [...]}"""
+        key = facts_key(facts, self.model)
+        if self.cache is not None:
+            text = self.cache.get(key)
+            if text is not None:
+                _REQUESTS.labels(outcome="cache_hit").inc()
+                return {"company_id": facts.get("company_id"), "explanation": text, "cached": True}
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            try:
+                text = await self._complete(facts)
+            except Exception as e:
+                _REQUESTS.labels(outcome="error").inc()
+                return {"company_id": facts.get("company_id"),
+                        "errors": [{"field": None, "rule": f"{type(e).__name__}: {e}"}]}
+        _REQUESTS.labels(outcome="ok").inc()
+        if self.cache is not None and text:
+            self.cache.put(key, self.model, text)
+        return {"company_id": facts.get("company_id"), "explanation": text, "cached": False}
+
+    async def explain_many(self, facts_iter: Iterable[dict]) -> AsyncIterator[dict]:
+        """사실 목록 -> 설명 레코드를 입력 순서대로 생성 (대기 중인 작업은 concurrency × 4개까지)"""
+        window = self.concurrency * 4
+        pending: Deque[asyncio.Task] = deque()
+        try:
+            for facts in facts_iter:
+                if len(pending) >= window:
+                    yield await pending.popleft()
+                pending.append(asyncio.ensure_future(self.explain(facts)))
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def aclose(self) -> None:
+        await self._client.close()
+
+
+# -----------------------------
+# 4) 로컬 모의 서버 (오프라인 시험용)
+# -----------------------------
+
+def mock_explanation(facts: dict) -> str:
+    """모의 서버가 돌려주는 정해진 설명 (사실 JSON만으로 생성)"""
+    name = facts.get("name") or facts.get("company_id") or "귀사"
+    lines = [f"{name}의 통합고용세액공제 총공제액은 {facts['gross_credit']:,}원입니다."]
+    if facts.get("min_tax_limited"):
+        lines.append(
+            f"최저한세·공제 한도가 적용되어 {facts['limited_amount']:,}원이 줄어든 "
+            f"{facts['applied_credit']:,}원을 실제로 공제받습니다."
+        )
+    else:
+        lines.append(f"최저한세·한도 적용 후에도 {facts['applied_credit']:,}원 전액을 공제받습니다.")
+    lines.append(f"공제 후 {facts['retention_years']}년 동안 상시근로자 수를 유지해야 합니다.")
+    if facts.get("clawback_total"):
+        detail = ", ".join(f"{s['year']}년차 {s['amount']:,}원" for s in facts["clawback_schedule"])
+        lines.append(f"입력하신 사후연도 인원 기준 추징 예상액은 {detail}으로 합계 {facts['clawback_total']:,}원입니다.")
+    return " ".join(lines)
+
+
+def serve_mock(
+    port: int,
+    host: str = "127.0.0.1",
+    latency: float = 0.0,
+    fail_rate: float = 0.0,
+):
+    """
+    백그라운드 스레드에서 POST /v1/chat/completions에 응답하는 모의 서버 -> ThreadingHTTPServer
+    - latency: 응답마다 기다리는 시간(초)
+    - fail_rate: 이 비율로 429(Retry-After: 0) 또는 503을 돌려줌 (재시도 시험용)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 연결 재사용
+
+        def _send(self, status: int, payload: dict, headers: Optional[Dict[str, str]] = None) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {"error": {"message": "not found"}})
+                return
+            if latency:
+                time.sleep(latency)
+            if fail_rate and random.random() < fail_rate:
+                if random.random() < 0.5:
+                    self._send(429, {"error": {"message": "rate limited"}}, {"Retry-After": "0"})
+                else:
+                    self._send(503, {"error": {"message": "unavailable"}})
+                return
+            try:
+                request = json.loads(body)
+                facts = json.loads(request["messages"][-1]["content"])
+                text = mock_explanation(facts)
+            except (KeyError, ValueError, TypeError) as e:
+                self._send(400, {"error": {"message": f"bad request: {e}"}})
+                return
+            self._send(200, {
+                "id": f"mock-{digest_key(text)}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": text}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+
+        def log_message(self, format, *args):  # 요청마다 표준오류에 찍지 않음
+            pass
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="explain-mock", daemon=True).start()
+    return server
+
+
+# -----------------------------
+# 5) CLI
+# -----------------------------
+
+def _read_facts(args: argparse.Namespace, parser: argparse.ArgumentParser) -> Iterator[dict]:
+    """입력 파일 -> 사실 dict (계산 오류·제외 레코드는 건너뜀)"""
+    path = args.input
+    if path.lower().endswith((".csv", ".xlsx")):
+        # 포트폴리오 입력이면 먼저 일괄 계산
+        if not args.params_json:
+            parser.error("포트폴리오 입력(.csv/.xlsx)은 --params-json이 필요합니다")
+        from employment_tax_credit_batch import calc_portfolio
+        from employment_tax_credit_calc import PolicyValidationError, load_params_from_json
+        from employment_tax_credit_jobs import read_portfolio_upload
+        from employment_tax_credit_ndjson import portfolio_records
+
+        try:
+            params = load_params_from_json(args.params_json)
+            with open(path, "rb") as f:
+                df = read_portfolio_upload(path, f.read())
+        except (PolicyValidationError, ValueError) as e:
+            parser.error(str(e))
+        result = calc_portfolio(df, params, clawback_method=args.clawback_method)
+        rows = df.to_dict("records")
+        for inputs, rec in zip(rows, portfolio_records(df, result)):
+            if "errors" not in rec:
+                yield explanation_facts(rec, inputs)
+        return
+    # --ndjson / 엑셀 가져오기 결과 (JSON Lines)
+    with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as f:
+        for line in f:
+            if line.strip():
+                rec = json.loads(line)
+                if "errors" not in rec:
+                    yield explanation_facts(rec)
+
+
+async def _run(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    cache = None if args.no_cache else ExplanationCache(args.cache)
+    explainer = Explainer(
+        model=args.model, base_url=args.base_url, cache=cache,
+        concurrency=args.concurrency, max_retries=args.max_retries,
+    )
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    started = time.perf_counter()
+    n = hits = failed = 0
+    try:
+        async for rec in explainer.explain_many(_read_facts(args, parser)):
+            out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            n += 1
+            hits += bool(rec.get("cached"))
+            failed += "errors" in rec
+    finally:
+        await explainer.aclose()
+        if out is not sys.stdout:
+            out.close()
+        if cache is not None:
+            cache.close()
+    print(
+        f"설명 {n:,}건 ({time.perf_counter() - started:.1f}초): 캐시 {hits:,} / 생성 {n - hits - failed:,} / 실패 {failed:,}",
+        file=sys.stderr,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="기업별 계산 결과 -> 고객 안내문용 한국어 설명 (비동기 LLM)")
+    parser.add_argument("input", nargs="?", help='결과 JSON Lines(--ndjson 출력, "-" = 표준입력) 또는 포트폴리오 .csv/.xlsx')
+    parser.add_argument("--params-json", default=None, help="포트폴리오 입력일 때 정책 파라미터 JSON")
+    parser.add_argument("--clawback-method", choices=["proportional", "all_or_nothing", "tiered"], default="proportional")
+    parser.add_argument("--out", default="-", help="설명 JSON Lines 경로 (기본: 표준출력)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="모델 이름 (기본: TAX_CREDIT_EXPLAIN_MODEL 또는 gpt-4o-mini)")
+    parser.add_argument("--base-url", default=None, help="OpenAI 호환 API 주소 (예: 모의 서버 http://127.0.0.1:8089/v1)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="동시 요청 수 상한")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES, help="429·5xx·연결 오류 재시도 횟수")
+    parser.add_argument("--cache", default="tax_credit_explanations.sqlite3", help="설명 캐시 DB 경로")
+    parser.add_argument("--no-cache", action="store_true", help="캐시를 쓰지 않음")
+    parser.add_argument("--serve-mock", type=int, default=None, metavar="PORT", help="로컬 모의 서버만 실행 (오프라인 시험용)")
+    parser.add_argument("--mock-latency", type=float, default=0.0, help="모의 서버 응답 지연(초)")
+    parser.add_argument("--mock-fail-rate", type=float, default=0.0, help="모의 서버가 429/503을 돌려줄 비율 (0~1)")
+    add_metrics_argument(parser)
+    args = parser.parse_args()
+
+    if args.serve_mock is not None:
+        server = serve_mock(args.serve_mock, latency=args.mock_latency, fail_rate=args.mock_fail_rate)
+        print(f"모의 서버: http://127.0.0.1:{args.serve_mock}/v1 (Ctrl+C로 종료)", file=sys.stderr)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+    if not args.input:
+        parser.error("입력 파일이 필요합니다 (또는 --serve-mock PORT)")
+    if openai is None:
+        parser.error("openai 패키지가 필요합니다 (pip install openai)")
+    if not (args.base_url or os.environ.get("OPENAI_BASE_URL") or os.environ.get("OPENAI_API_KEY")):
+        parser.error("OPENAI_API_KEY 환경변수가 필요합니다 (오프라인 시험은 --base-url로 모의 서버 지정)")
+
+    asyncio.run(_run(args, parser))
+    dump_metrics(args.metrics_out)
+
+
+if __name__ == "__main__":
+    main()
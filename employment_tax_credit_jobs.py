@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+백그라운드 일괄 작업 실행기 (포트폴리오 계산·보고서 생성)
+
+Streamlit 스크립트 안에서 포트폴리오 계산이나 보고서 일괄 생성을 돌리면 그동안 세션이 멈추고,
+사용자가 위젯을 건드려 재실행되면 계산이 처음부터 다시 시작됩니다. 이 모듈은 스크립트 스레드 밖의
+작업자 스레드에서 작업을 실행하고, 진행 상황과 결과물(다운로드 파일)을 JobRunner에 보관합니다.
+화면은 작업 ID로 상태를 조회만 하므로 재실행되어도 작업은 계속되고, 결과물은 만료 전까지 남습니다.
+
+- JobRunner: 작업자 스레드 풀 + 작업 목록 (앱에서는 st.cache_resource로 서버 프로세스당 1개)
+- 작업 함수는 첫 인자로 JobProgress를 받아 단계·진행률·결과물을 기록합니다.
+  취소 요청은 progress.check()에서 JobCancelled로 올라와 작업을 멈춥니다.
+- 끝난 작업(완료·실패·취소)은 ttl_seconds가 지나거나 보관 개수(max_finished)를 넘으면 정리됩니다.
+- 계산(pandas/numpy)은 작업자 스레드에서, 엑셀 생성은 RenderPool 작업자 프로세스(spawn)에서 실행합니다.
+
+사용 예)
+    runner = JobRunner(workers=1)
+    job_id = runner.submit(portfolio_job, raw, "clients.xlsx", params, label="clients.xlsx", owner=session_id)
+    job = runner.get(job_id)     # 상태 스냅샷 (status, stage, done/total, artifacts)
+"""
+
+from __future__ import annotations
+import io
+import json
+import multiprocessing
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from employment_tax_credit_calc import PolicyParameters, params_to_dict
+from employment_tax_credit_batch import CSV_DTYPES, PortfolioResult, calc_portfolio, compile_policy
+from employment_tax_credit_metrics import BATCH_ROWS, BATCH_SECONDS
+from employment_tax_credit_ndjson import portfolio_records, write_ndjson
+from employment_tax_credit_region import fill_regions
+from employment_tax_credit_size import fill_company_sizes
+
+
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_FINISHED = 32
+DEFAULT_CHUNK_ROWS = 5000
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+NDJSON_MIME = "application/x-ndjson"
+ZIP_MIME = "application/zip"
+
+
+class JobCancelled(Exception):
+    """취소 요청된 작업이 progress.check()에서 멈출 때 발생"""
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """작업 결과물 (다운로드 파일 1개)"""
+    name: str
+    data: bytes
+    mime: str
+
+
+@dataclass
+class Job:
+    """
+    작업 상태
+    - stage / done / total: 현재 단계 이름과 그 단계의 진행 수 (total=0이면 진행률 미정)
+    - summary: 화면에 보여줄 요약 값 (계산 완료 수 등)
+    """
+    id: str
+    label: str
+    owner: Optional[str]
+    created: float
+    status: str = JOB_QUEUED
+    stage: str = "대기 중"
+    done: int = 0
+    total: int = 0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    error: Optional[str] = None
+    summary: Dict[str, object] = field(default_factory=dict)
+    artifacts: List[Artifact] = field(default_factory=list)
+
+    @property
+    def fraction(self) -> float:
+        if self.status == JOB_DONE:
+            return 1.0
+        return min(1.0, self.done / self.total) if self.total else 0.0
+
+    @property
+    def active(self) -> bool:
+        return self.status not in FINISHED_STATES
+
+
+class JobProgress:
+    """작업 함수가 진행 상황을 기록하는 창구 (실행기 잠금 아래에서 Job을 갱신)"""
+
+    def __init__(self, job: Job, lock: threading.Lock, cancel: threading.Event):
+        self._job = job
+        self._lock = lock
+        self._cancel = cancel
+
+    def stage(self, name: str, total: int = 0) -> None:
+        self.check()
+        with self._lock:
+            self._job.stage, self._job.done, self._job.total = name, 0, total
+
+    def advance(self, n: int = 1) -> None:
+        with self._lock:
+            self._job.done += n
+        self.check()
+
+    def summary(self, **values) -> None:
+        with self._lock:
+            self._job.summary.update(values)
+
+    def artifact(self, name: str, data: bytes, mime: str) -> None:
+        with self._lock:
+            self._job.artifacts.append(Artifact(name, data, mime))
+
+    def check(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+
+class JobRunner:
+    """
+    백그라운드 작업 실행기
+    - workers: 동시에 실행하는 작업 수 (나머지는 대기열)
+    - ttl_seconds: 끝난 작업·결과물을 보관하는 시간
+    - max_finished: 보관하는 끝난 작업 수 상한 (넘으면 오래된 것부터 정리)
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_finished: int = DEFAULT_MAX_FINISHED,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="tax-credit-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._cancel: Dict[str, threading.Event] = {}
+
+    def submit(self, fn: Callable[..., None], *args, label: str = "", owner: Optional[str] = None, **kwargs) -> str:
+        """fn(progress, *args, **kwargs)를 백그라운드에서 실행하고 작업 ID를 반환"""
+        self.purge_expired()
+        job = Job(id=uuid.uuid4().hex, label=label, owner=owner, created=time.time())
+        cancel = threading.Event()
+        with self._lock:
+            self._jobs[job.id] = job
+            self._cancel[job.id] = cancel
+        self._executor.submit(self._run, job, cancel, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job: Job, cancel: threading.Event, fn, args, kwargs) -> None:
+        progress = JobProgress(job, self._lock, cancel)
+        with self._lock:
+            if cancel.is_set():  # 대기 중에 취소됨
+                job.status, job.stage, job.finished = JOB_CANCELLED, "취소됨", time.time()
+                return
+            job.status, job.stage, job.started = JOB_RUNNING, "시작", time.time()
+        try:
+            fn(progress, *args, **kwargs)
+        except JobCancelled:
+            status, stage, error = JOB_CANCELLED, "취소됨", None
+        except Exception as e:  # 작업 실패는 화면에 표시하고 실행기는 계속 동작
+            status, stage, error = JOB_FAILED, "실패", f"{type(e).__name__}: {e}"
+        else:
+            status, stage, error = JOB_DONE, "완료", None
+        with self._lock:
+            job.status, job.stage, job.error, job.finished = status, stage, error, time.time()
+            if status != JOB_DONE:
+                job.artifacts = []
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """작업 상태 스냅샷 (없거나 만료되었으면 None)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else replace(job, summary=dict(job.summary), artifacts=list(job.artifacts))
+
+    def jobs(self, owner: Optional[str] = None) -> List[Job]:
+        """작업 스냅샷 목록 (최근 것부터, owner를 주면 그 소유자 것만)"""
+        with self._lock:
+            ids = [j.id for j in self._jobs.values() if owner is None or j.owner == owner]
+        snapshots = [self.get(i) for i in ids]
+        return sorted((j for j in snapshots if j is not None), key=lambda j: j.created, reverse=True)
+
+    def cancel(self, job_id: str) -> None:
+        with self._lock:
+            event = self._cancel.get(job_id)
+        if event is not None:
+            event.set()
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """만료되었거나 보관 개수를 넘은 끝난 작업을 정리하고 정리한 수를 반환"""
+        now = time.time() if now is None else now
+        with self._lock:
+            finished = sorted(
+                (j for j in self._jobs.values() if not j.active), key=lambda j: j.finished or 0, reverse=True,
+            )
+            drop = [j.id for k, j in enumerate(finished) if k >= self.max_finished or now - (j.finished or now) > self.ttl_seconds]
+            for job_id in drop:
+                del self._jobs[job_id]
+                del self._cancel[job_id]
+        return len(drop)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            events = list(self._cancel.values())
+        for event in events:
+            event.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+# -----------------------------
+# 포트폴리오 업로드 -> 계산 -> 결과물
+# -----------------------------
+
+def read_portfolio_upload(file_name: str, raw: bytes, progress: Optional[JobProgress] = None) -> pd.DataFrame:
+    """
+    업로드 파일(CSV / JSON Lines / .xlsx) -> 지역·기업규모를 채운 포트폴리오 DataFrame
+    - "returned_parental"는 앱 JSON과의 호환을 위한 별칭
+    - 머리글을 찾지 못한 엑셀 등 구조 오류는 ValueError
+    - progress: 엑셀은 행을 읽는 동안 읽은 행 수를 기록하고 취소를 확인 (큰 통합문서는 읽기가 가장 오래 걸림)
+    """
+    name = file_name.lower()
+    if name.endswith(".csv"):
+        df = pd.read_csv(io.BytesIO(raw), dtype=CSV_DTYPES)
+    elif name.endswith(".xlsx"):
+        from employment_tax_credit_xlsx import iter_xlsx_chunks
+
+        chunks = []  # index = 엑셀 행 번호
+        for chunk in iter_xlsx_chunks(raw, chunk_size=DEFAULT_CHUNK_ROWS):
+            chunks.append(chunk)
+            if progress is not None:
+                progress.advance(len(chunk))
+        df = pd.concat(chunks) if chunks else pd.DataFrame(columns=["prev_total", "curr_total"])
+    else:
+        df = pd.DataFrame([json.loads(line) for line in raw.decode("utf-8").splitlines() if line.strip()])
+    if "returned_parental" in df.columns and "returned_from_parental_leave" not in df.columns:
+        df = df.rename(columns={"returned_parental": "returned_from_parental_leave"})
+    df = fill_regions(df)  # region이 빈 행은 district_code / address로 수도권/지방 판정
+    return fill_company_sizes(df)  # company_size가 빈 행은 revenue / assets 등으로 규모 판정
+
+
+def iter_portfolio_upload(
+    file_name: str,
+    raw: bytes,
+    params: PolicyParameters,
+    clawback_method: str = "proportional",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    progress: Optional[JobProgress] = None,
+) -> Iterator[Tuple[pd.DataFrame, PortfolioResult]]:
+    """
+    업로드 파일 -> chunk_rows 행 묶음별 (입력 DataFrame, PortfolioResult) (묶음마다 진행률 기록·취소 확인)
+    - 엑셀: 읽는 대로 묶음마다 계산 (통합문서 전체를 DataFrame 하나로 모으지 않음, index = 엑셀 행 번호)
+    - CSV / JSON Lines: 한 번에 읽은 뒤 묶음으로 나누어 계산
+    """
+    compiled = compile_policy(params)
+    if file_name.lower().endswith(".xlsx"):
+        from employment_tax_credit_xlsx import iter_xlsx_results
+
+        if progress is not None:
+            progress.stage("파일 읽기·공제액 계산")
+        for df, part in iter_xlsx_results(
+            raw, params, clawback_method, chunk_size=max(1, chunk_rows), compiled=compiled,
+        ):
+            if progress is not None:
+                progress.advance(len(df))
+            yield df, part
+        return
+
+    if progress is not None:
+        progress.stage("파일 읽기")
+    df = read_portfolio_upload(file_name, raw, progress)
+    if progress is not None:
+        progress.stage("공제액 계산", total=len(df))
+    if not len(df):
+        yield df, calc_portfolio(df, params, compiled, clawback_method)
+        return
+    for start in range(0, len(df), max(1, chunk_rows)):
+        chunk = df.iloc[start:start + chunk_rows]
+        part = calc_portfolio(chunk, params, compiled, clawback_method)
+        if progress is not None:
+            progress.advance(len(chunk))
+        yield chunk, part
+
+
+def portfolio_job(
+    progress: JobProgress,
+    raw: bytes,
+    file_name: str,
+    params: PolicyParameters,
+    clawback_method: str = "proportional",
+    render_reports: bool = False,
+    logo_png: Optional[bytes] = None,
+    render_workers: Optional[int] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> None:
+    """
+    백그라운드 포트폴리오 작업: 묶음별 읽기·계산 -> 결과 JSON Lines [-> 기업별 엑셀 보고서 zip]
+    - 결과는 묶음마다 JSON Lines로 바로 기록하고, 보고서용으로는 계산된 기업의 작은 결과 레코드만 모음
+    - 결과물: tax_credit_results.ndjson, (render_reports) tax_credit_reports.zip
+    """
+    started = time.perf_counter()
+    if render_reports:
+        from employment_tax_credit_render import RenderPool, _safe_file_name, _unique_names, portfolio_report_jobs
+
+    buffer = io.BytesIO()
+    report_jobs = []
+    rows = calculated = failed = applied_total = 0
+    for df, part in iter_portfolio_upload(file_name, raw, params, clawback_method, chunk_rows, progress):
+        write_ndjson(portfolio_records(df, part), buffer)
+        rows += len(df)
+        calculated += len(part.results)
+        failed += int(part.errors["row"].nunique())
+        applied_total += int(part.results["applied_credit"].sum())
+        if render_reports:
+            report_jobs.extend(portfolio_report_jobs(df, part, clawback_method))
+    progress.summary(rows=rows, calculated=calculated, errors=failed, applied_total=applied_total)
+    progress.artifact("tax_credit_results.ndjson", buffer.getvalue(), NDJSON_MIME)
+
+    if report_jobs:
+        progress.stage("엑셀 보고서 생성", total=len(report_jobs))
+        names = _unique_names([_safe_file_name(name) for _, name in report_jobs])
+        archive = io.BytesIO()
+        # 서버의 다른 스레드와 함께 fork되지 않도록 spawn으로 작업자 시작
+        pool = RenderPool(params_to_dict(params), logo_png, workers=render_workers,
+                          mp_context=multiprocessing.get_context("spawn"))
+        with pool, zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, xlsx in zip(names, pool.render_many(report_jobs)):
+                zf.writestr(f"{name}.xlsx", xlsx)
+                progress.advance()
+        progress.artifact("tax_credit_reports.zip", archive.getvalue(), ZIP_MIME)
+
+    BATCH_ROWS.labels(job="portfolio_job", outcome="ok").inc(calculated)
+    BATCH_ROWS.labels(job="portfolio_job", outcome="error").inc(failed)
+    BATCH_SECONDS.labels(job="portfolio_job").observe(time.perf_counter() - started)
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+사후관리(추징) 대상 관리용 고객 원장 (로컬 SQLite)
+
+공제받은 연도의 상시근로자 수(base_headcount_at_credit)·적용 공제액과 이후 연도 말 인원을
+기업·연도별로 보관하여, 사후관리 계산 때마다 다시 입력하지 않도록 합니다.
+
+기능 개요
+- 테이블: companies(기업), credits(공제연도별 적용 공제액·기준 인원·유지기간), headcounts(연도 말 인원)
+- (company_id, 연도) 기본키 + 연도 인덱스로 "N년에 유지기간이 열려 있는 기업" 조회를 인덱스 범위 검색으로 처리
+- clawbacks_for_year: 해당 연도의 추징액을 전 기업에 대해 배열 연산으로 일괄 계산
+
+사용 예)
+    ledger = ClientLedger("client_ledger.sqlite3")
+    ledger.upsert_companies(companies_df)
+    ledger.add_credits(credits_df)
+    ledger.add_headcounts(headcounts_df)
+    ledger.clawbacks_for_year(2025, method="proportional")
+"""
+
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from employment_tax_credit_calc import ClawbackTiers
+from employment_tax_credit_batch import _int_column, calc_clawback_array
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    company_id   TEXT PRIMARY KEY,
+    name         TEXT,
+    company_size TEXT,
+    region       TEXT
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS credits (
+    company_id               TEXT NOT NULL,
+    credit_year              INTEGER NOT NULL,
+    applied_credit           INTEGER NOT NULL,
+    base_headcount_at_credit INTEGER NOT NULL,
+    retention_years          INTEGER NOT NULL,
+    PRIMARY KEY (company_id, credit_year)
+) WITHOUT ROWID;
+-- 연도 범위 조회가 본 테이블을 거치지 않도록 조회 열을 모두 담은 커버링 인덱스
+CREATE INDEX IF NOT EXISTS idx_credits_year ON credits(
+    credit_year, company_id, retention_years, applied_credit, base_headcount_at_credit
+);
+-- 열린 유지기간 조회의 credit_year 하한(MAX(retention_years))을 전체 스캔 없이 구하기 위한 인덱스
+CREATE INDEX IF NOT EXISTS idx_credits_retention ON credits(retention_years);
+
+CREATE TABLE IF NOT EXISTS headcounts (
+    company_id  TEXT NOT NULL,
+    year        INTEGER NOT NULL,
+    total       INTEGER NOT NULL,
+    youth       INTEGER,
+    PRIMARY KEY (company_id, year)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_headcounts_year ON headcounts(year, company_id);
+"""
+
+CREDIT_COLUMNS = ["company_id", "credit_year", "applied_credit", "base_headcount_at_credit", "retention_years"]
+HEADCOUNT_COLUMNS = ["company_id", "year", "total", "youth"]
+COMPANY_COLUMNS = ["company_id", "name", "company_size", "region"]
+
+
+def _records(df: pd.DataFrame, columns, optional=(), int_columns=()) -> list:
+    """
+    DataFrame -> executemany용 튜플 목록 (선택 열은 없으면 NULL)
+    - 필수 열의 빈 값, 정수 열의 비정수 값은 입력 전에 ValueError (문제 행 번호 포함)
+    """
+    missing = [c for c in columns if c not in df.columns and c not in optional]
+    if missing:
+        raise ValueError(f"필수 열이 없습니다: {', '.join(missing)}")
+    frame = df.reindex(columns=columns).astype(object)
+    frame = frame.where(frame.notna(), None)
+    for col in columns:
+        if col not in df.columns:
+            continue
+        if col in int_columns:
+            as_int, blank, bad = _int_column(df[col])
+            frame[col] = [None if b else int(v) for v, b in zip(as_int, blank)]
+        else:
+            blank = df[col].isna().to_numpy()
+            bad = np.zeros(len(df), dtype=bool)
+        if col not in optional:
+            bad = bad | blank
+        if bad.any():
+            rows = ", ".join(str(r) for r in df.index[bad][:5])
+            more = " 외" if bad.sum() > 5 else ""
+            raise ValueError(f"{col} 열에 비어 있거나 정수가 아닌 값이 있습니다 (행: {rows}{more})")
+    return list(frame.itertuples(index=False, name=None))
+
+
+class ClientLedger:
+    """
+    고객 다년 원장
+    - path: DB 파일 경로 (":memory:" 가능)
+    """
+
+    def __init__(self, path: str = "client_ledger.sqlite3"):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # --- 일괄 입력 ---
+
+    def _write(self, sql: str, rows: list) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(sql, rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                # 실패한 트랜잭션을 남기면 공유 연결의 이후 쓰기가 모두 막히므로 되돌린 뒤 전달
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def upsert_companies(self, df: pd.DataFrame) -> int:
+        """기업 기본정보 입력/갱신 (열: company_id, name, company_size, region)"""
+        return self._write(
+            "INSERT OR REPLACE INTO companies(company_id, name, company_size, region) VALUES (?, ?, ?, ?)",
+            _records(df, COMPANY_COLUMNS, optional=("name", "company_size", "region")),
+        )
+
+    def add_credits(self, df: pd.DataFrame) -> int:
+        """
+        공제연도별 적용 공제액 입력/갱신
+        열: company_id, credit_year, applied_credit, base_headcount_at_credit, retention_years
+        """
+        return self._write(
+            "INSERT OR REPLACE INTO credits"
+            "(company_id, credit_year, applied_credit, base_headcount_at_credit, retention_years)"
+            " VALUES (?, ?, ?, ?, ?)",
+            _records(df, CREDIT_COLUMNS, int_columns=CREDIT_COLUMNS[1:]),
+        )
+
+    def add_headcounts(self, df: pd.DataFrame) -> int:
+        """연도 말 상시근로자 수 입력/갱신 (열: company_id, year, total, youth(선택))"""
+        return self._write(
+            "INSERT OR REPLACE INTO headcounts(company_id, year, total, youth) VALUES (?, ?, ?, ?)",
+            _records(df, HEADCOUNT_COLUMNS, optional=("youth",), int_columns=HEADCOUNT_COLUMNS[1:]),
+        )
+
+    # --- 조회 ---
+
+    def _query(self, sql: str, params=()) -> pd.DataFrame:
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+            cols = [d[0] for d in cur.description]
+            return pd.DataFrame(cur.fetchall(), columns=cols)
+
+    def headcount_history(self, first_year: int, last_year: int) -> pd.DataFrame:
+        """
+        first_year~last_year 연도 말 인원 이력 (경정청구 탐색 입력 형식)
+        열: company_id, year, total, youth, company_size, region (기업 기본정보가 없으면 NaN)
+        """
+        return self._query(
+            "SELECT h.company_id, h.year, h.total, h.youth, c.company_size, c.region"
+            "  FROM headcounts h"
+            "  LEFT JOIN companies c ON c.company_id = h.company_id"
+            " WHERE h.year >= ? AND h.year <= ?"
+            " ORDER BY h.company_id, h.year",
+            (int(first_year), int(last_year)),
+        )
+
+    def credits_between(self, first_year: int, last_year: int) -> pd.DataFrame:
+        """first_year~last_year에 공제받은 내역 (열: CREDIT_COLUMNS)"""
+        return self._query(
+            f"SELECT {', '.join(CREDIT_COLUMNS)} FROM credits"
+            " WHERE credit_year >= ? AND credit_year <= ?"
+            " ORDER BY company_id, credit_year",
+            (int(first_year), int(last_year)),
+        )
+
+    def open_windows(self, year: int) -> pd.DataFrame:
+        """
+        year에 유지기간이 열려 있는 공제 건 목록
+        (credit_year < year <= credit_year + retention_years)
+        - year_index: 공제연도로부터 몇 번째 연도인지
+        - followup_total: 해당 연도 말 인원 (원장에 없으면 NaN)
+        - credit_year 하한은 조회 시점의 MAX(retention_years)로 매번 계산
+          (다른 연결이 나중에 기록한 긴 유지기간도 빠뜨리지 않도록)
+        """
+        df = self._query(
+            "SELECT c.company_id, c.credit_year, c.applied_credit, c.base_headcount_at_credit,"
+            "       c.retention_years, h.total AS followup_total"
+            "  FROM credits c"
+            "  LEFT JOIN headcounts h ON h.company_id = c.company_id AND h.year = ?"
+            " WHERE c.credit_year >= ? - (SELECT COALESCE(MAX(retention_years), 0) FROM credits)"
+            "   AND c.credit_year < ?"
+            "   AND c.credit_year + c.retention_years >= ?"
+            " ORDER BY c.company_id, c.credit_year",
+            (int(year), int(year), int(year), int(year)),
+        )
+        df.insert(2, "year_index", (int(year) - df["credit_year"]).astype("int64"))
+        return df
+
+    def clawbacks_for_year(
+        self,
+        year: int,
+        method: str = "proportional",
+        tiered_thresholds: Optional[Dict[str, float]] = None,
+        exact: bool = False,
+        tiers: Optional[ClawbackTiers] = None,
+    ) -> pd.DataFrame:
+        """
+        year의 사후관리 추징액을 열린 유지기간 전체에 대해 일괄 계산
+        - 연도 말 인원이 원장에 없는 건은 clawback을 계산하지 않고 NaN으로 남깁니다.
+        - exact=True: 정수 연산 모드, tiers: 정책의 구간 추징표 (calc_clawback_array 참고)
+        """
+        df = self.open_windows(year)
+        known = df["followup_total"].notna().to_numpy()
+        clawback = pd.Series(pd.NA, index=df.index, dtype="Int64")
+        if known.any():
+            sub = df[known]
+            clawback[known] = calc_clawback_array(
+                sub["applied_credit"].to_numpy(),
+                sub["base_headcount_at_credit"].to_numpy(),
+                sub["followup_total"].to_numpy().astype(np.int64),
+                sub["retention_years"].to_numpy(),
+                sub["year_index"].to_numpy(),
+                method,
+                tiered_thresholds,
+                exact,
+                tiers,
+            )
+        df["clawback"] = clawback
+        return df
+
+    def followup_schedule(self, company_id: str, credit_year: int) -> pd.DataFrame:
+        """
+        공제 1건의 사후관리 연차별 인원표 (앱의 다년 추징표 입력값으로 사용)
+        열: 연차, 사후연도 인원 (원장에 없는 연도는 NaN)
+        """
+        credit = self._query(
+            "SELECT retention_years FROM credits WHERE company_id = ? AND credit_year = ?",
+            (company_id, int(credit_year)),
+        )
+        if credit.empty:
+            raise KeyError(f"원장에 공제 내역이 없습니다: {company_id} / {credit_year}")
+        retention = int(credit.iloc[0, 0])
+        heads = self._query(
+            "SELECT year, total FROM headcounts WHERE company_id = ? AND year > ? AND year <= ?",
+            (company_id, int(credit_year), int(credit_year) + retention),
+        ).set_index("year")["total"]
+        years = range(int(credit_year) + 1, int(credit_year) + retention + 1)
+        return pd.DataFrame({
+            "연차": list(range(1, retention + 1)),
+            "사후연도 인원": pd.array([heads.get(y) for y in years], dtype="Int64"),
+        })
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "ClientLedger":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
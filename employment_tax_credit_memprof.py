@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+메모리 진단 모드 (tracemalloc 단계별 스냅샷)
+
+엑셀 내보내기 중 앱 파드가 가끔 OOM으로 죽지만, openpyxl 셀 객체·삽입한 로고·pandas 프레임 중 무엇이
+원인인지 알 수 없었습니다. 이 모듈은 정책 로딩, 추징표·포트폴리오 계산, 통합문서 구성, 로고 삽입,
+wb.save(buffer) 같은 단계마다 tracemalloc 스냅샷을 떠서 단계별 최대 메모리와 할당 위치 상위 N개를 보고합니다.
+
+- 진단 모드가 아닐 때 각 단계는 ContextVar 조회 한 번 후 그대로 실행됩니다 (스냅샷·추적 없음).
+- 단계는 중첩할 수 있습니다 (예: workbook_build 안의 logo). 바깥 단계의 최대값에는 안쪽 단계의 최대값이 포함됩니다.
+- 같은 이름의 단계가 여러 번 실행되면 (보고서 수백 건 등) 호출 수·누적 시간·최대 peak를 합치고,
+  할당 위치는 peak가 가장 컸던 호출의 것을 남깁니다.
+- tracemalloc은 프로세스 전체를 추적하므로 Streamlit에서 여러 세션이 동시에 내보내면 서로의 할당이 섞입니다.
+  진단은 트래픽이 적은 파드에서 켜세요. 추적 중에는 할당마다 비용이 붙어 눈에 띄게 느려집니다.
+
+켜는 방법
+- CLI: employment_tax_credit_render.py --memprof [보고서 경로]  (보고서 생성을 현재 프로세스에서 실행)
+- Streamlit: 환경변수 TAX_CREDIT_MEMPROF=1 로 서버를 띄우면 Pro 보고서·포트폴리오 페이지에 진단표가 나옵니다.
+
+사용 예)
+    with profiling(top=10) as prof:
+        params = load_params_from_json(path)          # 단계 "policy_load"
+        xlsx = render_workbook(record, params_dict)    # "workbook_build" / "logo" / "wb_save"
+    print(prof.render_text())
+"""
+
+from __future__ import annotations
+import functools
+import linecache
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+ENV_FLAG = "TAX_CREDIT_MEMPROF"
+DEFAULT_TOP = 10
+
+# 스냅샷에서 뺄 할당 위치 (추적 도구 자신)
+_IGNORED_FILES = (tracemalloc.__file__, linecache.__file__, __file__)
+
+# tracemalloc은 프로세스 전역이므로 진단 세션 수를 세어 마지막 세션이 끝날 때만 추적을 끔
+# (Streamlit처럼 여러 세션이 겹쳐 돌 때 먼저 끝난 세션이 남의 단계 측정 중에 끄지 않도록)
+_TRACING_LOCK = threading.Lock()
+_sessions = 0
+_owns_tracing = False  # 세션이 추적을 켰는지 (밖에서 켠 추적은 끄지 않음)
+
+
+def enabled_from_env() -> bool:
+    """환경변수 TAX_CREDIT_MEMPROF가 켜져 있는지 ("1"/"true"/"yes"/"on")"""
+    return os.environ.get(ENV_FLAG, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class AllocationSite:
+    """단계 시작 대비 늘어난 할당 위치 1곳"""
+    location: str
+    size_diff: int
+    count_diff: int
+
+
+@dataclass
+class StageReport:
+    """
+    단계별 집계
+    - peak: 단계 시작 시점 대비 최대 추가 메모리(바이트, 호출 중 최대)
+    - allocated: 단계가 끝난 뒤에도 남은 순증가(바이트, peak가 가장 컸던 호출 기준)
+    """
+    name: str
+    calls: int = 0
+    seconds: float = 0.0
+    peak: int = 0
+    allocated: int = 0
+    top: List[AllocationSite] = field(default_factory=list)
+
+
+class _Frame:
+    __slots__ = ("name", "base", "peak", "snapshot", "started")
+
+    def __init__(self, name: str, base: int, snapshot, started: float):
+        self.name = name
+        self.base = base          # 시작 시 추적 중인 메모리
+        self.peak = base          # 안쪽 단계가 reset_peak 하기 전까지의 최대값
+        self.snapshot = snapshot
+        self.started = started
+
+
+class MemoryProfiler:
+    """
+    tracemalloc 단계 측정기
+    - top: 단계별로 보고할 할당 위치 수
+    - frames: 할당 위치 추적 깊이 (1 = 할당한 줄만, 늘리면 호출 경로까지 보이지만 더 느려짐)
+    """
+
+    def __init__(self, top: int = DEFAULT_TOP, frames: int = 1):
+        self.top = top
+        self.frames = frames
+        self.stages: Dict[str, StageReport] = {}
+        self._stack: List[_Frame] = []
+        self._started_tracing = False
+
+    def start(self) -> None:
+        global _sessions, _owns_tracing
+        if self._started_tracing:
+            return
+        with _TRACING_LOCK:
+            if _sessions == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                _owns_tracing = True
+            _sessions += 1
+        self._started_tracing = True
+
+    def stop(self) -> None:
+        global _sessions, _owns_tracing
+        if not self._started_tracing:
+            return
+        self._started_tracing = False
+        with _TRACING_LOCK:
+            _sessions -= 1
+            # 마지막 세션이 끝날 때만 끔 (다른 세션이 단계 측정 중일 수 있으므로)
+            if _sessions == 0 and _owns_tracing:
+                tracemalloc.stop()
+                _owns_tracing = False
+
+    def _snapshot(self):
+        """현재 할당 스냅샷 (추적이 꺼져 있으면 None)"""
+        try:
+            snapshot = tracemalloc.take_snapshot()
+        except RuntimeError:  # 이 세션 밖에서 추적을 끈 경우 (tracemalloc은 프로세스 전역)
+            return None
+        return snapshot.filter_traces([tracemalloc.Filter(False, f) for f in _IGNORED_FILES])
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """이름 붙은 단계 측정 (추적 중이 아니면 측정 없이 실행)"""
+        if not tracemalloc.is_tracing():
+            yield
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:  # 바깥 단계의 지금까지 최대값을 보관한 뒤 reset
+            parent = self._stack[-1]
+            parent.peak = max(parent.peak, peak)
+        snapshot = self._snapshot()
+        if snapshot is None:
+            yield
+            return
+        frame = _Frame(name, current, snapshot, time.perf_counter())
+        self._stack.append(frame)
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            if tracemalloc.is_tracing():
+                self._finish(frame)
+
+    def _finish(self, frame: _Frame) -> None:
+        end_current, end_peak = tracemalloc.get_traced_memory()
+        frame.peak = max(frame.peak, end_peak)
+        if self._stack:
+            parent = self._stack[-1]
+            parent.peak = max(parent.peak, frame.peak)
+        self._record(frame, end_current)
+
+    def _record(self, frame: _Frame, end_current: int) -> None:
+        seconds = time.perf_counter() - frame.started
+        peak = frame.peak - frame.base
+        report = self.stages.setdefault(frame.name, StageReport(frame.name))
+        report.calls += 1
+        report.seconds += seconds
+        if report.calls > 1 and peak <= report.peak:
+            return
+        report.peak = peak
+        report.allocated = end_current - frame.base
+        snapshot = self._snapshot()
+        if snapshot is None:
+            report.top = []
+            return
+        diff = snapshot.compare_to(frame.snapshot, "lineno")
+        report.top = [
+            AllocationSite(str(stat.traceback), stat.size_diff, stat.count_diff)
+            for stat in diff[: self.top] if stat.size_diff > 0
+        ]
+
+    def records(self) -> List[dict]:
+        """단계·할당 위치별 행 목록 (DataFrame·CSV용)"""
+        rows: List[dict] = []
+        for report in self.stages.values():
+            base = {
+                "stage": report.name, "calls": report.calls, "seconds": round(report.seconds, 4),
+                "peak_bytes": report.peak, "allocated_bytes": report.allocated,
+            }
+            if not report.top:
+                rows.append({**base, "rank": None, "location": None, "size_diff": None, "count_diff": None})
+            for rank, site in enumerate(report.top, start=1):
+                rows.append({**base, "rank": rank, "location": site.location,
+                             "size_diff": site.size_diff, "count_diff": site.count_diff})
+        return rows
+
+    def render_text(self) -> str:
+        """사람이 읽는 보고서 (단계별 peak와 상위 할당 위치)"""
+        lines = ["[메모리 진단] 단계별 최대 추가 메모리 (tracemalloc)"]
+        for report in self.stages.values():
+            lines.append(
+                f"- {report.name}: peak {_mib(report.peak)} / 잔여 {_mib(report.allocated)} "
+                f"({report.calls:,}회, {report.seconds:.3f}초)"
+            )
+            for site in report.top:
+                lines.append(f"    {_mib(site.size_diff):>10}  {site.count_diff:>+8,}개  {site.location}")
+        return "\n".join(lines)
+
+
+def _mib(n: int) -> str:
+    return f"{n / 1_048_576:,.2f} MiB"
+
+
+# -----------------------------
+# 현재 진단 세션 (스레드·Streamlit 실행별 ContextVar)
+# -----------------------------
+
+_ACTIVE: ContextVar[Optional[MemoryProfiler]] = ContextVar("tax_credit_memprof", default=None)
+
+
+@contextmanager
+def profiling(top: int = DEFAULT_TOP, frames: int = 1) -> Iterator[MemoryProfiler]:
+    """이 블록 안의 memory_stage / profiled_stage를 측정하는 진단 세션"""
+    prof = MemoryProfiler(top, frames)
+    token = _ACTIVE.set(prof)
+    prof.start()
+    try:
+        yield prof
+    finally:
+        prof.stop()
+        _ACTIVE.reset(token)
+
+
+def memory_stage(name: str):
+    """진단 세션이 있으면 단계 측정, 없으면 아무것도 하지 않는 context manager"""
+    prof = _ACTIVE.get()
+    return nullcontext() if prof is None else prof.stage(name)
+
+
+def profiled_stage(name: str):
+    """함수 전체를 한 단계로 측정하는 decorator (진단 세션이 없으면 그대로 호출)"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            prof = _ACTIVE.get()
+            if prof is None:
+                return fn(*args, **kwargs)
+            with prof.stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# -----------------------------
+# CLI 공통 옵션 / 보고서 저장
+# -----------------------------
+
+def add_memprof_arguments(parser) -> None:
+    """--memprof [경로] / --memprof-top (경로 생략 시 표준오류, .csv면 단계·할당 위치 표)"""
+    parser.add_argument(
+        "--memprof", nargs="?", const="-", default=None,
+        help='메모리 진단 모드 (tracemalloc). 보고서 경로, 생략하면 표준오류 (".csv"로 끝나면 표 형식)',
+    )
+    parser.add_argument("--memprof-top", type=int, default=DEFAULT_TOP, help="단계별로 보고할 할당 위치 수")
+
+
+def write_memprof_report(prof: MemoryProfiler, path: str = "-") -> None:
+    if path == "-":
+        sys.stderr.write(prof.render_text() + "\n")
+        return
+    if path.lower().endswith(".csv"):
+        import csv
+
+        rows = prof.records()
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["stage"])
+            writer.writeheader()
+            writer.writerows(rows)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(prof.render_text() + "\n")
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+통합고용세액공제 JSON Lines(NDJSON) 입출력
+
+한 줄에 기업 1건(JSON 객체)을 읽어 한 줄에 결과 1건을 쓰는 스트리밍 인터페이스입니다.
+ERP ETL 등에서 전체 결과를 메모리에 모으지 않고 파이프로 연결할 수 있습니다.
+
+    cat companies.ndjson | python employment_tax_credit_calc.py --ndjson --params-json policy.json
+
+입력 줄 (HeadcountInputs 필드명, 없으면 0 / 미적용)
+    {"company_id": "A001", "company_size": "중소기업", "region": "지방",
+     "prev_total": 50, "curr_total": 60, "prev_youth": 10, "curr_youth": 14,
+     "converted_regular": 2, "returned_from_parental_leave": 1,
+     "tax_before_credit": 120000000, "followup_totals": [59, 58, 57], "industry_code": "25111"}
+    ("returned_parental"는 앱 JSON과의 호환을 위한 별칭)
+    region 대신 "district_code"(행정구역 코드)나 "address"(사업장 주소)를 주면 수도권/지방을 자동 판정
+    company_size 대신 "revenue"·"assets"(+ "industry_code", "tax_year" 등)를 주면 기업규모를 자동 판정
+
+출력 줄
+    성공: {"line": 1, "company_id": "A001", "gross_credit": ..., "applied_credit": ...,
+           "retention_years": 3, "clawback_schedule": [...], "clawback_total": ...}
+    실패: {"line": 2, "company_id": "A002", "errors": [{"field": "curr_youth", "rule": "youth_exceeds_total"}]}
+
+orjson이 설치되어 있으면 빠른 인코더를 사용하고, 없으면 표준 json 모듈을 사용합니다.
+"""
+
+from __future__ import annotations
+import json
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from employment_tax_credit_calc import PolicyParameters
+from employment_tax_credit_batch import CompiledPolicy, PortfolioResult, calc_portfolio, compile_policy
+from employment_tax_credit_region import fill_regions
+from employment_tax_credit_size import fill_company_sizes
+
+try:  # 선택 의존성: 빠른 JSON 인코더
+    import orjson
+except ImportError:  # pragma: no cover - 설치 환경에 따라 다름
+    orjson = None
+
+
+DEFAULT_CHUNK_SIZE = 1000
+_FIELD_ALIASES = {"returned_parental": "returned_from_parental_leave"}
+
+
+def dumps_line(obj: dict) -> bytes:
+    """dict -> 줄바꿈으로 끝나는 UTF-8 JSON 한 줄"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def portfolio_records(df: pd.DataFrame, result: PortfolioResult, id_column: str = "company_id") -> Iterator[dict]:
+    """
+    포트폴리오 계산 결과 -> 입력 행 순서대로 기업별 결과 dict를 하나씩 생성
+    - 검증 오류 행은 {"errors": [...]} 레코드로 나옵니다.
+    """
+    ids = df[id_column].tolist() if id_column in df.columns else [None] * len(df)
+    ids = [None if v is None or (isinstance(v, float) and v != v) else v for v in ids]
+    errors: Dict[object, List[dict]] = {}
+    for row, field, rule in result.errors.itertuples(index=False, name=None):
+        errors.setdefault(row, []).append({"field": field, "rule": rule})
+
+    res = result.results
+    values = dict(zip(res.index.tolist(), zip(
+        res["gross_credit"].tolist(),
+        res["applied_credit"].tolist(),
+        res["retention_years"].tolist(),
+        res["clawback_schedule"].tolist(),
+        res["clawback_total"].tolist(),
+    )))
+    for label, company_id in zip(df.index.tolist(), ids):
+        rec = {"company_id": company_id}
+        if label in errors:
+            rec["errors"] = errors[label]
+        else:
+            g, a, r, sched, total = values[label]
+            rec.update(
+                gross_credit=g,
+                applied_credit=a,
+                retention_years=r,
+                clawback_schedule=sched,
+                clawback_total=total,
+            )
+        yield rec
+
+
+def write_ndjson(records: Iterable[dict], fp: BinaryIO) -> int:
+    """레코드를 한 줄씩 fp에 기록하고 기록한 줄 수를 반환"""
+    n = 0
+    for rec in records:
+        fp.write(dumps_line(rec))
+        n += 1
+    return n
+
+
+def _parse_lines(lines: Iterable[Union[str, bytes]]) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """(줄 번호, 레코드 또는 None, 파싱 오류 메시지 또는 None) — 빈 줄은 건너뜀"""
+    for lineno, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield lineno, None, f"JSON 파싱 실패: {e}"
+            continue
+        if not isinstance(rec, dict):
+            yield lineno, None, "JSON 객체가 아닙니다"
+            continue
+        for alias, field in _FIELD_ALIASES.items():
+            if alias in rec and field not in rec:
+                rec[field] = rec.pop(alias)
+        yield lineno, rec, None
+
+
+def iter_results(
+    lines: Iterable[Union[str, bytes]],
+    params: PolicyParameters,
+    clawback_method: str = "proportional",
+    tiered_thresholds: Optional[Dict[str, float]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    cache=None,
+    compiled: Optional[CompiledPolicy] = None,
+    exact: bool = False,
+) -> Iterator[dict]:
+    """
+    NDJSON 입력 줄 -> 결과 레코드 (입력 순서 유지)
+    - chunk_size 줄씩 모아 배치 계산(calc_portfolio)한 뒤 바로 내보내므로,
+      메모리 사용량은 입력 크기와 무관하게 chunk_size에 비례합니다. (대화형 파이프라면 1)
+    """
+    compiled = compiled or compile_policy(params)
+    pending: List[Tuple[int, Optional[dict], Optional[str]]] = []
+
+    def _flush() -> Iterator[dict]:
+        good = [(lineno, rec) for lineno, rec, err in pending if rec is not None]
+        out: Dict[int, dict] = {}
+        if good:
+            df = pd.DataFrame([rec for _, rec in good], index=[lineno for lineno, _ in good])
+            try:
+                df = fill_company_sizes(fill_regions(df))
+                result = calc_portfolio(
+                    df, params, compiled, clawback_method, tiered_thresholds, cache=cache, exact=exact,
+                )
+            except Exception as e:  # 필수 열 누락 등 묶음 단위 실패는 해당 묶음 전체에 기록하고 다음 묶음 계속
+                rule = str(e) if isinstance(e, ValueError) else f"{type(e).__name__}: {e}"
+                for lineno, rec in good:
+                    out[lineno] = {"company_id": rec.get("company_id"), "errors": [{"field": None, "rule": rule}]}
+            else:
+                for lineno, rec in zip(df.index.tolist(), portfolio_records(df, result)):
+                    out[lineno] = rec
+        for lineno, rec, err in pending:
+            if rec is None:
+                yield {"line": lineno, "errors": [{"field": None, "rule": err}]}
+            else:
+                yield {"line": lineno, **out[lineno]}
+        pending.clear()
+
+    for item in _parse_lines(lines):
+        pending.append(item)
+        if len(pending) >= chunk_size:
+            yield from _flush()
+    if pending:
+        yield from _flush()
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+사업장 주소 / 행정구역 코드 -> 수도권·지방 판정
+
+고객 기초자료에는 지역 구분 대신 사업장 주소나 행정구역 코드(법정동·행정동·시군구 코드)만 있는 경우가
+많습니다. 이 모듈은 동봉한 region_districts.json으로 조회 색인을 한 번 만들어 두고, 포트폴리오 전체의
+지역을 열 연산 한 번으로 채웁니다.
+
+조회 규칙
+- 행정구역 코드: 숫자만 남긴 뒤 가장 긴 접두어부터 조회 (시도 2자리 기본 + district_overrides의 긴 코드 우선)
+  예) "11680" / "1168010100" / "11-680" -> 서울(11) -> 수도권
+- 주소: 앞부분의 시도명(정식 명칭·약칭)을 가장 긴 것부터 일치시켜 시도 코드로 변환
+  예) "경기도 성남시 분당구 ..." / "서울강남구 ..." -> 수도권, "부산 해운대구 ..." -> 지방
+  "광주"만으로는 판정하지 않음 (경기도 광주시 주소가 "광주시 ..."로 시작하는 경우가 있어 광주광역시는
+  "광주광역시" 또는 "광주 광산구"처럼 자치구까지 적힌 주소만 일치)
+- 코드가 있으면 코드를, 없거나 판정되지 않으면 주소를 사용합니다. 둘 다 실패하면 빈 값(NaN)
+- 수도권 = 서울(11)·인천(28)·경기(41) (데이터 파일의 metro_sido)
+
+데이터 파일 형식 (region_districts.json)
+    {"version": "...", "metro_sido": ["11", "28", "41"],
+     "sido": {"11": ["서울특별시", "서울시", "서울"], ...},
+     "district_overrides": {"28710": "지방"}}   # 선택: 시도 판정과 다르게 볼 하위 구역 코드
+
+사용 예)
+    resolver = load_region_resolver()
+    resolver.resolve(address="서울특별시 강남구 테헤란로 1")     # Region.SEOUL_METRO
+    df = fill_regions(df)   # region이 빈 행을 district_code / address 열로 채움
+"""
+
+from __future__ import annotations
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from employment_tax_credit_calc import Region
+
+
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "region_districts.json")
+
+# 포트폴리오 입력 열 이름
+CODE_COLUMN = "district_code"
+ADDRESS_COLUMN = "address"
+
+
+class _PrefixTable:
+    """길이가 같은 접두어 -> 지역 값 (정렬된 키 배열 + 값 배열, searchsorted로 일괄 조회)"""
+
+    def __init__(self, length: int, mapping: Dict[str, str]):
+        self.length = length
+        self.mapping = dict(mapping)
+        self.keys = np.array(sorted(mapping), dtype=f"U{length}")
+        self.values = np.array([mapping[k] for k in self.keys], dtype=object)
+
+    def get(self, value: str) -> Optional[str]:
+        return self.mapping.get(value[:self.length]) if len(value) >= self.length else None
+
+    def lookup(self, values: np.ndarray) -> np.ndarray:
+        """문자열 배열 -> 앞 length글자가 키와 같으면 지역 값, 아니면 None"""
+        prefixes = values.astype(f"U{self.length}")
+        pos = np.minimum(np.searchsorted(self.keys, prefixes), len(self.keys) - 1)
+        hit = (self.keys[pos] == prefixes) & (np.char.str_len(values) >= self.length)
+        return np.where(hit, self.values[pos], None)
+
+
+def _lookup_longest(values: np.ndarray, tables: List[_PrefixTable]) -> np.ndarray:
+    """긴 접두어 표부터 조회하여 아직 판정되지 않은 값만 다음 표로 넘김"""
+    out = np.full(len(values), None, dtype=object)
+    todo = np.ones(len(values), dtype=bool)
+    for table in tables:
+        if not todo.any():
+            break
+        found = table.lookup(values[todo])
+        out[todo] = found
+        todo[todo] = found == None  # noqa: E711 (object 배열 원소별 비교)
+    return out
+
+
+class RegionResolver:
+    """
+    행정구역 코드 접두어 / 주소 시도명 -> Region 조회 색인
+    - code_tables: 코드 길이별 접두어 표 (긴 길이부터; 시도 2자리 + district_overrides)
+    - alias_tables: 시도명 별칭 길이별 표 (긴 별칭부터; "서울특별시"가 "서울"보다 먼저 일치)
+    """
+
+    def __init__(self, data: dict):
+        self.version: Optional[str] = data.get("version")
+        metro = set(data["metro_sido"])
+        codes: Dict[int, Dict[str, str]] = {}
+        aliases: Dict[int, Dict[str, str]] = {}
+        for code, names in data["sido"].items():
+            value = (Region.SEOUL_METRO if code in metro else Region.NON_METRO).value
+            codes.setdefault(len(code), {})[code] = value
+            for name in names:
+                aliases.setdefault(len(name), {})[name] = value
+        for code, value in (data.get("district_overrides") or {}).items():
+            codes.setdefault(len(code), {})[code] = Region(value).value
+        self.code_tables = [_PrefixTable(n, m) for n, m in sorted(codes.items(), reverse=True)]
+        self.alias_tables = [_PrefixTable(n, m) for n, m in sorted(aliases.items(), reverse=True)]
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_DATA_PATH) -> "RegionResolver":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    # -- 단건 --
+
+    def resolve(self, district_code: Optional[str] = None, address: Optional[str] = None) -> Optional[Region]:
+        """코드 우선, 실패하면 주소로 판정 (둘 다 실패하면 None)"""
+        candidates = []
+        if district_code is not None:
+            candidates.append((re.sub(r"\D", "", str(district_code)), self.code_tables))
+        if address is not None:
+            candidates.append((str(address).lstrip(), self.alias_tables))
+        for value, tables in candidates:
+            for table in tables:
+                found = table.get(value)
+                if found is not None:
+                    return Region(found)
+        return None
+
+    # -- 포트폴리오 (열 연산) --
+
+    def resolve_codes(self, codes: pd.Series) -> pd.Series:
+        """행정구역 코드 열 -> 지역 값 열 (판정 불가는 NaN)"""
+        present = codes.notna().to_numpy()
+        values = codes[present].astype(str).to_numpy(dtype=str)
+        odd = ~np.char.isdigit(values)
+        if odd.any():  # 하이픈·공백 등이 섞인 코드만 숫자로 정리
+            values = values.astype(object)
+            values[odd] = [re.sub(r"\D", "", v) for v in values[odd]]
+            values = values.astype(str)
+        return self._series(codes.index, present, _lookup_longest(values, self.code_tables))
+
+    def resolve_addresses(self, addresses: pd.Series) -> pd.Series:
+        """주소 열 -> 지역 값 열 (판정 불가는 NaN)"""
+        present = addresses.notna().to_numpy()
+        values = np.char.lstrip(addresses[present].astype(str).to_numpy(dtype=str))
+        return self._series(addresses.index, present, _lookup_longest(values, self.alias_tables))
+
+    @staticmethod
+    def _series(index: pd.Index, present: np.ndarray, found: np.ndarray) -> pd.Series:
+        out = np.full(len(index), np.nan, dtype=object)
+        out[present] = np.where(found == None, np.nan, found)  # noqa: E711
+        return pd.Series(out, index=index, dtype=object)
+
+    def resolve_frame(self, df: pd.DataFrame) -> pd.Series:
+        """district_code → address 순으로 판정한 지역 값 열 (열이 없으면 해당 단계 생략)"""
+        out = pd.Series(np.nan, index=df.index, dtype=object)
+        if CODE_COLUMN in df.columns:
+            out = self.resolve_codes(df[CODE_COLUMN])
+        if ADDRESS_COLUMN in df.columns and out.isna().any():
+            todo = out.isna()
+            out[todo] = self.resolve_addresses(df.loc[todo, ADDRESS_COLUMN])
+        return out
+
+
+@lru_cache(maxsize=8)
+def load_region_resolver(path: str = DEFAULT_DATA_PATH) -> RegionResolver:
+    """데이터 파일 -> RegionResolver (경로별로 1회만 읽음)"""
+    return RegionResolver.from_file(path)
+
+
+def fill_regions(df: pd.DataFrame, resolver: Optional[RegionResolver] = None) -> pd.DataFrame:
+    """
+    region 열이 없거나 빈 행을 district_code / address 열로 채운 DataFrame을 반환 (입력은 변경하지 않음)
+    - 이미 입력된 region 값은 그대로 둡니다.
+    - 판정되지 않은 행은 빈 값으로 남아 validate_portfolio에서 region 누락 오류가 됩니다.
+    """
+    if CODE_COLUMN not in df.columns and ADDRESS_COLUMN not in df.columns:
+        return df
+    current = df["region"] if "region" in df.columns else pd.Series(np.nan, index=df.index, dtype=object)
+    todo = current.isna().to_numpy()
+    if not todo.any():
+        return df
+    resolver = resolver or load_region_resolver()
+    filled = current.astype(object).copy()
+    filled[todo] = resolver.resolve_frame(df.loc[todo]).to_numpy()
+    return df.assign(region=filled)
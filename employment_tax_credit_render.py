@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+통합고용세액공제 엑셀 보고서 병렬 생성 (작업자 프로세스 풀)
+
+openpyxl 통합문서 생성은 순수 파이썬 CPU 작업이라 한 프로세스에서 고객 수백 곳의 보고서를
+차례로 만들면 오래 걸립니다. 이 모듈은 작업자 프로세스 여러 개에 나누어 생성합니다.
+
+- 작업자에게는 openpyxl 객체가 아니라 작은 결과 레코드(build_result_record 형식 dict)와
+  회사명만 보내고, 작업자는 완성된 xlsx 바이트를 돌려줍니다.
+- 정책 파라미터·로고 PNG는 작업자 시작 시 한 번만 전달하고, 셀 서식(report_styles)도
+  작업자 프로세스마다 한 번만 만들어 재사용합니다.
+- 동시에 대기하는 작업 수를 max_pending으로 제한하므로, 입력이 많아도 메모리에 쌓이는
+  레코드·결과 바이트는 대기 중인 작업 수만큼입니다. 결과는 입력 순서대로 나옵니다.
+
+사용 예)
+    with RenderPool(params_to_dict(params), logo_png=logo) as pool:
+        for name, xlsx in zip(names, pool.render_many(zip(records, names))):
+            ...
+
+    python employment_tax_credit_render.py portfolio.csv --params-json policy.json --out-dir reports/
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from employment_tax_credit_calc import (
+    CompanySize, Region, HeadcountInputs, PolicyValidationError, load_params_from_json, params_to_dict,
+)
+from employment_tax_credit_batch import CSV_DTYPES, HEADCOUNT_FIELDS, PortfolioResult, calc_portfolio
+from employment_tax_credit_region import fill_regions
+from employment_tax_credit_size import fill_company_sizes
+from employment_tax_credit_report import build_result_record, render_workbook, report_styles
+from employment_tax_credit_memprof import add_memprof_arguments, memory_stage, profiling, write_memprof_report
+from employment_tax_credit_metrics import (
+    BATCH_ROWS, BATCH_SECONDS, add_metrics_argument, dump_metrics, record_workbook_render,
+)
+
+
+# (결과 레코드, 회사명)
+RenderJob = Tuple[dict, str]
+
+
+# -----------------------------
+# 1) 작업자 프로세스
+# -----------------------------
+
+# 작업자 프로세스 전역 상태 (_init_worker에서 1회 설정)
+_worker_params: Optional[dict] = None
+_worker_logo: Optional[bytes] = None
+_worker_created: Optional[datetime] = None
+
+
+def _init_worker(params_dict: dict, logo_png: Optional[bytes], created: datetime) -> None:
+    global _worker_params, _worker_logo, _worker_created
+    _worker_params = params_dict
+    _worker_logo = logo_png
+    _worker_created = created
+    report_styles()  # 서식 객체를 미리 만들어 첫 작업부터 재사용
+
+
+def _render_job(job: RenderJob) -> Tuple[bytes, float]:
+    # 작업자 쪽 지표는 부모로 합쳐지지 않으므로 소요시간을 함께 돌려주고 부모에서 기록
+    record, company_name = job
+    start = time.perf_counter()
+    xlsx = render_workbook(record, _worker_params, company_name, _worker_logo, _worker_created)
+    return xlsx, time.perf_counter() - start
+
+
+def _collect(future: Future) -> bytes:
+    xlsx, seconds = future.result()
+    record_workbook_render(seconds, len(xlsx))
+    return xlsx
+
+
+# -----------------------------
+# 2) 렌더 풀
+# -----------------------------
+
+class RenderPool:
+    """
+    엑셀 보고서 작업자 프로세스 풀
+    - params_dict: params_to_dict(params) 결과 (모든 보고서의 Parameters 시트에 공통)
+    - logo_png: normalize_logo로 변환한 PNG 바이트 (모든 보고서에 공통, 없으면 생략)
+    - workers: 작업자 수 (기본: CPU 수)
+    - max_pending: 동시에 대기시키는 작업 수 상한 (기본: 작업자 수 × 2)
+    - mp_context: 작업자 시작 방식 (기본: 플랫폼 기본값). 스레드가 여럿 도는 서버(Streamlit 등)에서는
+      fork 시점에 다른 스레드가 잡고 있던 잠금이 복사되지 않도록 multiprocessing.get_context("spawn")을 권장
+    """
+
+    def __init__(
+        self,
+        params_dict: dict,
+        logo_png: Optional[bytes] = None,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        created: Optional[datetime] = None,
+        mp_context=None,
+    ):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_pending = max(1, max_pending or self.workers * 2)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(params_dict, logo_png, created or datetime.now()),
+        )
+
+    def render_many(self, jobs: Iterable[RenderJob]) -> Iterator[bytes]:
+        """(결과 레코드, 회사명) 목록 -> xlsx 바이트를 입력 순서대로 생성"""
+        pending: Deque[Future] = deque()
+        for job in jobs:
+            if len(pending) >= self.max_pending:
+                yield _collect(pending.popleft())
+            pending.append(self._executor.submit(_render_job, job))
+        while pending:
+            yield _collect(pending.popleft())
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "RenderPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# -----------------------------
+# 3) 포트폴리오 결과 -> 결과 레코드
+# -----------------------------
+
+def portfolio_report_jobs(
+    df: pd.DataFrame,
+    result: PortfolioResult,
+    clawback_method: str = "proportional",
+    name_column: str = "name",
+    id_column: str = "company_id",
+) -> Iterator[RenderJob]:
+    """
+    calc_portfolio 결과 중 계산된 기업마다 (결과 레코드, 회사명)을 생성 (검증 오류 행은 제외)
+    - 회사명: name_column → id_column → 행 번호 순으로 사용
+    """
+    res = result.results
+    rows = df.loc[res.index]
+    names = _company_names(rows, name_column, id_column)
+    heads = np.column_stack([
+        pd.to_numeric(rows[f], errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+        if f in rows.columns else np.zeros(len(rows), dtype=np.int64)
+        for f in HEADCOUNT_FIELDS
+    ]).tolist() if len(rows) else []
+    taxes = (
+        pd.to_numeric(rows["tax_before_credit"], errors="coerce").tolist()
+        if "tax_before_credit" in rows.columns else [None] * len(rows)
+    )
+    followups = rows["followup_totals"].tolist() if "followup_totals" in rows.columns else [None] * len(rows)
+
+    for size, region, h, tax, fu, name, g, a, r, sched in zip(
+        rows["company_size"].tolist(), rows["region"].tolist(), heads, taxes,
+        followups, names, res["gross_credit"].tolist(), res["applied_credit"].tolist(),
+        res["retention_years"].tolist(), res["clawback_schedule"].tolist(),
+    ):
+        fu = list(fu) if isinstance(fu, (list, tuple, np.ndarray)) else []
+        schedule = [
+            {"연차": i, "사후연도 인원": int(n), "추징세액": int(amount)}
+            for i, (n, amount) in enumerate(zip(fu, sched), start=1)
+        ]
+        record = build_result_record(
+            CompanySize(size), Region(region), HeadcountInputs(*h),
+            None if tax is None or tax != tax else int(tax),
+            clawback_method, g, a, r, schedule,
+        )
+        yield record, name
+
+
+def _company_names(rows: pd.DataFrame, name_column: str = "name", id_column: str = "company_id") -> List[str]:
+    """행별 회사명: name_column → id_column → 행 번호 순으로 빈 값(NaN·공백)이 아닌 첫 값"""
+    names = pd.Series(rows.index.astype(str), index=rows.index)
+    for column in (id_column, name_column):
+        if column in rows.columns:
+            values = rows[column].astype("string").str.strip()
+            names = values.where(values.notna() & (values != ""), names)
+    return names.astype(str).tolist()
+
+
+def _safe_file_name(name: str) -> str:
+    return "".join("_" if ch in '\\/:*?"<>|' else ch for ch in name).strip() or "report"
+
+
+def _unique_names(names: List[str]) -> List[str]:
+    """
+    파일명 중복 제거: 같은 이름의 두 번째부터 "이름 (2)", "이름 (3)" ...
+    - 붙이는 번호는 목록 전체의 원래 이름과도 겹치지 않게 고름 (실제 "A (2)"가 뒤에 있어도 덮어쓰지 않도록)
+    - 대소문자만 다른 이름도 같은 파일로 취급 (대소문자를 구분하지 않는 파일 시스템·zip 해제 대비)
+    """
+    taken = {name.casefold() for name in names}
+    used = set()
+    out = []
+    for name in names:
+        key = name.casefold()
+        if key in used:
+            n = 2
+            while f"{name} ({n})".casefold() in taken:
+                n += 1
+            name = f"{name} ({n})"
+            key = name.casefold()
+            taken.add(key)
+        used.add(key)
+        out.append(name)
+    return out
+
+
+def _run(args: argparse.Namespace, parser: argparse.ArgumentParser, in_process: bool = False) -> None:
+    start = time.perf_counter()
+    try:
+        params = load_params_from_json(args.params_json)
+    except PolicyValidationError as e:
+        parser.error(str(e))
+
+    logo_png = None
+    if args.logo:
+        from employment_tax_credit_report import normalize_logo
+        with memory_stage("logo_load"), open(args.logo, "rb") as f:
+            logo_png = normalize_logo(f.read())
+
+    with memory_stage("read_portfolio"):
+        df = fill_company_sizes(fill_regions(pd.read_csv(args.portfolio_csv, dtype=CSV_DTYPES)))
+    result = calc_portfolio(df, params, clawback_method=args.clawback_method)
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    # 결과는 입력 순서대로 나오므로 파일명을 미리 정해 같은 순서로 사용 (중복·빈 이름끼리 덮어쓰지 않도록)
+    file_names = iter(_unique_names([_safe_file_name(name) for name in _company_names(df.loc[result.results.index])]))
+
+    def _jobs() -> Iterator[RenderJob]:
+        return portfolio_report_jobs(df, result, args.clawback_method)
+
+    def _write(xlsx: bytes) -> None:
+        with open(os.path.join(args.out_dir, f"{next(file_names)}.xlsx"), "wb") as f:
+            f.write(xlsx)
+
+    n = 0
+    if in_process:
+        # 메모리 진단: 작업자 프로세스의 할당은 추적되지 않으므로 현재 프로세스에서 차례로 생성
+        params_dict, created = params_to_dict(params), datetime.now()
+        for record, company_name in _jobs():
+            _write(render_workbook(record, params_dict, company_name, logo_png, created))
+            n += 1
+    else:
+        with RenderPool(params_to_dict(params), logo_png, workers=args.workers) as pool:
+            for xlsx in pool.render_many(_jobs()):
+                _write(xlsx)
+                n += 1
+
+    BATCH_ROWS.labels(job="render", outcome="ok").inc(n)
+    BATCH_ROWS.labels(job="render", outcome="error").inc(result.errors["row"].nunique())
+    BATCH_SECONDS.labels(job="render").observe(time.perf_counter() - start)
+    print(f"보고서 {n:,}건 생성: {args.out_dir}")
+    if len(result.errors):
+        print(f"입력 오류로 제외: {result.errors['row'].nunique():,}개사")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="포트폴리오 엑셀 보고서 병렬 생성")
+    parser.add_argument("portfolio_csv", help="기업 목록 CSV (company_id, name, company_size, region, prev_total, ...)")
+    parser.add_argument("--params-json", required=True, help="법령 단가·기간 설정 JSON 경로")
+    parser.add_argument("--out-dir", default="reports", help="보고서 저장 폴더")
+    parser.add_argument("--logo", default=None, help="회사 로고 이미지(PNG/JPG)")
+    parser.add_argument("--clawback-method", choices=["proportional", "all_or_nothing", "tiered"], default="proportional")
+    parser.add_argument("--workers", type=int, default=None, help="작업자 프로세스 수 (기본: CPU 수)")
+    add_metrics_argument(parser)
+    add_memprof_arguments(parser)
+    args = parser.parse_args()
+
+    if args.memprof is None:
+        _run(args, parser)
+    else:
+        with profiling(top=args.memprof_top) as prof:
+            _run(args, parser, in_process=True)
+        write_memprof_report(prof, args.memprof)
+    dump_metrics(args.metrics_out)
+
+
+if __name__ == "__main__":
+    main()
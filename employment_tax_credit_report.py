@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+통합고용세액공제 결과 보고서(JSON / 엑셀) 생성 모듈
+
+Pro 앱들이 각자 복사해 두었던 결과 payload·엑셀 서식 코드를 한곳에 모은 것입니다.
+Streamlit에 의존하지 않으므로 앱, CLI, 작업자 프로세스 어디서든 같은 보고서를 만들 수 있습니다.
+
+기능 개요
+- build_result_record: 입력값·계산 결과를 JSON 직렬화 가능한 dict(결과 레코드)로 정리
+- render_workbook: 결과 레코드 -> Pro 포맷 엑셀(.xlsx) 바이트 (Summary / Clawback Schedule / Parameters)
+- normalize_logo: 업로드한 로고(PNG/JPG)를 엑셀 삽입용 PNG 바이트로 1회 변환
+"""
+
+from __future__ import annotations
+import io
+import json
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional
+
+from openpyxl import Workbook
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+from openpyxl.drawing.image import Image as XLImage
+
+from employment_tax_credit_calc import CompanySize, Region, HeadcountInputs
+from employment_tax_credit_memprof import memory_stage
+from employment_tax_credit_metrics import record_workbook_render
+
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+SCHEDULE_HEADERS = ["연차", "사후연도 인원", "추징세액"]
+
+
+# -----------------------------
+# 1) 결과 레코드
+# -----------------------------
+
+def build_result_record(
+    size: CompanySize,
+    region: Region,
+    heads: HeadcountInputs,
+    tax_before_credit: Optional[int],
+    clawback_method: str,
+    gross: int,
+    applied: int,
+    retention_years: int,
+    schedule: List[dict],
+) -> dict:
+    """
+    앱의 JSON 다운로드와 같은 형식의 결과 레코드
+    - schedule: [{"연차": 1, "사후연도 인원": 59, "추징세액": 140000}, ...]
+    """
+    return {
+        "inputs": {
+            "company_size": size.value,
+            "region": region.value,
+            "prev_total": int(heads.prev_total),
+            "curr_total": int(heads.curr_total),
+            "prev_youth": int(heads.prev_youth),
+            "curr_youth": int(heads.curr_youth),
+            "converted_regular": int(heads.converted_regular),
+            "returned_parental": int(heads.returned_from_parental_leave),
+            "tax_before_credit": int(tax_before_credit) if tax_before_credit else None,
+            "clawback_method": clawback_method,
+        },
+        "results": {
+            "gross_credit": int(gross),
+            "applied_credit": int(applied),
+            "retention_years": int(retention_years),
+            "schedule": schedule,
+            "clawback_total": int(sum(int(row["추징세액"]) for row in schedule)),
+        },
+    }
+
+
+def result_json_bytes(record: dict) -> bytes:
+    return json.dumps(record, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+# -----------------------------
+# 2) 엑셀 서식 (프로세스당 1회 생성)
+# -----------------------------
+
+class _ReportStyles:
+    """셀 서식 객체 묶음 (openpyxl 서식 객체는 불변이라 여러 통합문서에서 공유 가능)"""
+
+    def __init__(self):
+        self.title_font = Font(name="맑은 고딕", size=14, bold=True)
+        self.bold = Font(bold=True)
+        self.header_fill = PatternFill("solid", fgColor="F2F2F2")
+        thin = Side(style="thin", color="CCCCCC")
+        self.border_all = Border(top=thin, bottom=thin, left=thin, right=thin)
+        self.center = Alignment(horizontal="center", vertical="center")
+        self.right = Alignment(horizontal="right", vertical="center")
+
+    def currency_style(self) -> NamedStyle:
+        # NamedStyle은 등록 시 통합문서에 묶이므로 통합문서마다 새로 만듦
+        style = NamedStyle(name="KRW")
+        style.number_format = '#,##0"원"'
+        style.alignment = self.right
+        return style
+
+
+@lru_cache(maxsize=1)
+def report_styles() -> _ReportStyles:
+    return _ReportStyles()
+
+
+def normalize_logo(raw: bytes) -> bytes:
+    """업로드 로고(PNG/JPG 등) -> PNG 바이트 (PNG는 그대로, 그 외 형식만 재인코딩)"""
+    from PIL import Image as PILImage
+
+    with PILImage.open(io.BytesIO(raw)) as img:
+        if img.format == "PNG":
+            return raw
+        out = io.BytesIO()
+        img.save(out, format="PNG")
+        return out.getvalue()
+
+
+# -----------------------------
+# 3) 엑셀 보고서
+# -----------------------------
+
+def render_workbook(
+    record: dict,
+    params_dict: dict,
+    company_name: str = "(기관명)",
+    logo_png: Optional[bytes] = None,
+    created: Optional[datetime] = None,
+) -> bytes:
+    """
+    결과 레코드 -> Pro 포맷 엑셀 바이트
+    - params_dict: params_to_dict(params) 결과 (Parameters 시트에 원문 보존)
+    - logo_png: normalize_logo로 변환한 PNG 바이트 (없으면 로고 생략)
+    - 메모리 진단 단계: workbook_build(안에 logo) / wb_save (employment_tax_credit_memprof)
+    """
+    started = time.perf_counter()
+    with memory_stage("workbook_build"):
+        wb = _build_workbook(record, params_dict, company_name, logo_png, created or datetime.now())
+    with memory_stage("wb_save"):
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        data = buffer.getvalue()
+    record_workbook_render(time.perf_counter() - started, len(data))
+    return data
+
+
+def _build_workbook(
+    record: dict,
+    params_dict: dict,
+    company_name: str,
+    logo_png: Optional[bytes],
+    created: datetime,
+) -> Workbook:
+    s = report_styles()
+    inputs, results = record["inputs"], record["results"]
+    schedule = results["schedule"]
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Summary"
+    if "KRW" not in wb.named_styles:
+        wb.add_named_style(s.currency_style())
+
+    # 로고 삽입 & 타이틀
+    row_cursor = 1
+    if logo_png is not None:
+        with memory_stage("logo"):
+            img = XLImage(io.BytesIO(logo_png))
+            img.width = 140
+            img.height = 40
+            ws.add_image(img, "A1")
+        row_cursor = 4
+
+    title_cell = ws.cell(row=row_cursor, column=1, value="통합고용세액공제 계산 결과")
+    title_cell.font = s.title_font
+    ws.merge_cells(start_row=row_cursor, start_column=1, end_row=row_cursor, end_column=6)
+    ws.cell(row=row_cursor, column=7, value=f"작성일자: {created.strftime('%Y-%m-%d')}").alignment = s.right
+    ws.cell(row=row_cursor+1, column=1, value=f"기관명: {company_name}")
+    ws.cell(row=row_cursor+1, column=4, value=f"기업규모/지역: {inputs['company_size']}/{inputs['region']}")
+
+    # 요약 테이블
+    start = row_cursor + 3
+    data = [
+        ["항목", "값"],
+        ["총공제액 (최저한세/한도 전)", int(results["gross_credit"])],
+        ["적용 공제액 (최저한세/한도 후)", int(results["applied_credit"])],
+        ["유지기간(년)", int(results["retention_years"])],
+        ["추징방식", inputs["clawback_method"]],
+        ["추징세액 합계", int(results["clawback_total"])],
+    ]
+    for r_idx, row in enumerate(data, start=start):
+        for c_idx, val in enumerate(row, start=1):
+            ws.cell(row=r_idx, column=c_idx, value=val)
+
+    # 통화 서식 적용
+    ws.cell(row=start+1, column=2).style = "KRW"  # 총공제액
+    ws.cell(row=start+2, column=2).style = "KRW"  # 적용공제액
+    ws.cell(row=start+5, column=2).style = "KRW"  # 추징합계
+
+    # 테이블 스타일링
+    for r in ws.iter_rows(min_row=start, max_row=start+len(data)-1, min_col=1, max_col=2):
+        for cell in r:
+            cell.border = s.border_all
+            if cell.row == start:
+                cell.fill = s.header_fill
+                cell.alignment = s.center
+            elif cell.column == 1:
+                cell.alignment = s.center
+            elif cell.style != "KRW":
+                cell.alignment = s.right
+
+    # 다년 추징표 시트
+    ws2 = wb.create_sheet("Clawback Schedule")
+    ws2.append(SCHEDULE_HEADERS)
+    for row in schedule:
+        ws2.append([row["연차"], row["사후연도 인원"], row["추징세액"]])
+
+    for cell in ws2[1]:
+        cell.fill = s.header_fill
+        cell.border = s.border_all
+        cell.alignment = s.center
+        cell.font = s.bold
+
+    for r in range(2, 2 + len(schedule)):
+        ws2.cell(row=r, column=1).alignment = s.center
+        ws2.cell(row=r, column=2).alignment = s.right
+        ws2.cell(row=r, column=3).style = "KRW"
+        for c in range(1, 4):
+            ws2.cell(row=r, column=c).border = s.border_all
+
+    # 열 너비
+    ws.column_dimensions["A"].width = 22
+    ws.column_dimensions["B"].width = 26
+    for col, w in zip(["A", "B", "C"], [10, 18, 18]):
+        ws2.column_dimensions[col].width = w
+
+    # 머리글 (인쇄용, "&"는 머리글 제어문자라 "&&"로 이스케이프)
+    header_name = company_name.replace("&", "&&")
+    ws.oddHeader.left.text = header_name
+    ws.oddHeader.right.text = "통합고용세액공제 계산 결과"
+    ws2.oddHeader.left.text = header_name
+    ws2.oddHeader.right.text = "Clawback Schedule"
+
+    # 파라미터 시트 (원문 JSON 보존)
+    ws3 = wb.create_sheet("Parameters")
+    ws3.cell(row=1, column=1, value="Parameters (JSON)")
+    ws3.cell(row=2, column=1, value=json.dumps(params_dict, ensure_ascii=False, indent=2))
+    return wb
+
+
+def workbook_file_name(created: Optional[datetime] = None) -> str:
+    created = created or datetime.now()
+    return f"tax_credit_result_pro_{created.strftime('%Y%m%d_%H%M%S')}.xlsx"
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+정책 파라미터 변경 시 포트폴리오 재산정 (구·신 단가 비교표)
+
+시행령 개정으로 1인당 공제액 등이 바뀌면 포트폴리오 전체를 새 PolicyParameters로 다시 계산해
+차이를 보여 주어야 합니다. 이 모듈은 기업별 파생 수량(증가 인원, 청년 증가, 전환·복귀 인원, 세전세액)을
+한 번만 구해 두고, 후보 정책 여러 개를 행렬 곱 한 번으로 적용합니다.
+
+- 계수 행렬(design, 기업 × 단가 항목): 규모×지역 칸마다 기본 증가 인원 / 청년 증가 인원 열,
+  그리고 정규직 전환·육아휴직 복귀 열. 기업마다 자기 규모·지역 칸에만 값이 들어갑니다.
+- 단가 행렬(단가 항목 × 후보 정책): 후보 정책마다 compile_policy 결과를 한 열로 펼친 것
+- 총공제액 = design @ 단가 행렬, 이후 총한도·최저한세·제외 업종을 후보별 열 연산으로 적용
+  (calc_portfolio의 gross_credit / applied_credit / retention_years와 같은 결과)
+
+사용 예)
+    inputs = derive_inputs(df)                       # 입력 검증·수량 계산은 1회
+    priced = reprice(inputs, {"2024": old, "2025안": new})
+    diff = diff_table(inputs, priced, base="2024")
+
+    python employment_tax_credit_reprice.py portfolio.csv --base 2024=policy_2024.json \\
+        --candidate 2025안=policy_2025.json --out reprice_diff.csv
+"""
+
+from __future__ import annotations
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from employment_tax_credit_calc import PolicyParameters, PolicyValidationError, load_params_from_json
+from employment_tax_credit_batch import (
+    CSV_DTYPES, REGION_VALUES, SIZE_VALUES, CompiledPolicy, compile_policy, excluded_industry_mask,
+    floor_mul_div, validate_portfolio,
+)
+from employment_tax_credit_metrics import BATCH_ROWS, BATCH_SECONDS, add_metrics_argument, dump_metrics
+from employment_tax_credit_region import fill_regions
+from employment_tax_credit_size import fill_company_sizes
+
+
+_N_CELLS = len(SIZE_VALUES) * len(REGION_VALUES)
+# 기업 × 후보 정책 칸 수
+_REPRICED = BATCH_ROWS.labels(job="reprice", outcome="ok")
+
+
+@dataclass
+class PricingInputs:
+    """
+    정책과 무관한 기업별 파생 수량 (유효 행만)
+    - index / company_ids: 입력 DataFrame의 index 라벨과 company_id (없으면 index 라벨)
+    - design: 계수 행렬 (행 = 기업, 열 = 규모×지역 기본 칸 + 규모×지역 청년 칸 + 전환 + 복귀)
+    - size_idx: 규모 번호 (유지기간 조회), tax_before_credit: 세전세액 (-1 = 최저한세 미적용)
+    - industry_codes: 업종 코드 열 (후보 정책별 제외 업종 선별용, 없으면 None)
+    - errors: 입력 검증 오류표 (정책과 무관한 규칙만)
+    """
+    index: pd.Index
+    company_ids: np.ndarray
+    design: np.ndarray
+    size_idx: np.ndarray
+    tax_before_credit: np.ndarray
+    industry_codes: Optional[pd.Series]
+    errors: pd.DataFrame
+
+
+@dataclass
+class RepriceResult:
+    """후보 정책별 결과 (행 = PricingInputs.index, 열 = 후보 이름)"""
+    gross_credit: pd.DataFrame
+    applied_credit: pd.DataFrame
+    retention_years: pd.DataFrame
+    excluded: pd.DataFrame
+
+
+def derive_inputs(df: pd.DataFrame, id_column: str = "company_id") -> PricingInputs:
+    """포트폴리오 DataFrame -> PricingInputs (검증·수량 계산은 여기서 한 번만)"""
+    report = validate_portfolio(df)
+    mask = report.valid_mask
+    cols = {k: v[mask] for k, v in report.columns.items() if k not in ("followup_flat", "followup_lengths")}
+    size_idx = pd.Categorical(df["company_size"], categories=SIZE_VALUES).codes.astype(np.int64)[mask]
+    region_idx = pd.Categorical(df["region"], categories=REGION_VALUES).codes.astype(np.int64)[mask]
+
+    n = int(mask.sum())
+    rows = np.arange(n)
+    cell = size_idx * len(REGION_VALUES) + region_idx
+    design = np.zeros((n, 2 * _N_CELLS + 2), dtype=np.int64)
+    design[rows, cell] = np.maximum(0, cols["curr_total"] - cols["prev_total"])
+    design[rows, _N_CELLS + cell] = np.maximum(0, cols["curr_youth"] - cols["prev_youth"])
+    design[:, 2 * _N_CELLS] = cols["converted_regular"]
+    design[:, 2 * _N_CELLS + 1] = cols["returned_from_parental_leave"]
+
+    index = df.index[mask]
+    ids = df.loc[index, id_column].to_numpy() if id_column in df.columns else index.to_numpy()
+    return PricingInputs(
+        index=index,
+        company_ids=ids,
+        design=design,
+        size_idx=size_idx,
+        tax_before_credit=cols["tax_before_credit"],
+        industry_codes=df.loc[index, "industry_code"] if "industry_code" in df.columns else None,
+        errors=report.errors,
+    )
+
+
+def price_vector(compiled: CompiledPolicy) -> np.ndarray:
+    """CompiledPolicy -> 단가 열 (design 열 순서와 같음)"""
+    return np.concatenate([
+        compiled.basic.ravel(), compiled.youth.ravel(), [compiled.conversion, compiled.parental],
+    ]).astype(np.int64)
+
+
+def reprice(
+    inputs: PricingInputs,
+    candidates: Mapping[str, PolicyParameters],
+    exact: bool = False,
+) -> RepriceResult:
+    """
+    후보 정책들을 한 번에 적용 (입력 재검증·수량 재계산 없음)
+    - candidates: {이름: PolicyParameters} (순서대로 결과 열이 됨)
+    - exact=True: 최저한세 한도를 정수 연산으로 계산 (calc_portfolio의 exact와 같음)
+    """
+    start = time.perf_counter()
+    names = list(candidates)
+    compiled = [compile_policy(candidates[name]) for name in names]
+    prices = np.column_stack([price_vector(c) for c in compiled]) if names else np.zeros((2 * _N_CELLS + 2, 0), np.int64)
+    gross = np.maximum(0, inputs.design @ prices)  # (기업 × 후보)
+
+    applied = gross.copy()
+    tax = inputs.tax_before_credit
+    has_tax = tax >= 0
+    excluded = np.zeros_like(applied, dtype=bool)
+    retention = np.zeros_like(applied)
+    for k, c in enumerate(compiled):
+        col = applied[:, k]
+        if c.max_credit_total is not None:
+            col = np.minimum(col, c.max_credit_total)
+        if c.min_tax_limit_rate is not None:
+            if exact:
+                limit = floor_mul_div(tax, c.min_tax_rate_num, c.min_tax_rate_den)
+            else:
+                limit = np.floor(c.min_tax_limit_rate * tax.astype(np.float64)).astype(np.int64)
+            col = np.where(has_tax, np.minimum(col, limit), col)
+        if inputs.industry_codes is not None and c.industry_index is not None:
+            excluded[:, k] = excluded_industry_mask(inputs.industry_codes, c.industry_index)
+        applied[:, k] = np.where(excluded[:, k], 0, np.maximum(0, col))
+        retention[:, k] = c.retention[inputs.size_idx]
+    gross = np.where(excluded, 0, gross)
+
+    def _frame(values: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(values, index=inputs.index, columns=names)
+
+    _REPRICED.inc(applied.size)
+    BATCH_SECONDS.labels(job="reprice").observe(time.perf_counter() - start)
+    return RepriceResult(_frame(gross), _frame(applied), _frame(retention), _frame(excluded))
+
+
+def diff_table(inputs: PricingInputs, result: RepriceResult, base: Optional[str] = None) -> pd.DataFrame:
+    """
+    구·신 비교표: company_id, applied_<후보>..., diff_<후보> (= 후보 - 기준), 기준 대비 변동이 큰 순
+    - base: 기준 후보 이름 (기본: 첫 후보)
+    - 제외 업종 판정이 바뀐 기업은 excluded_<후보> 열로 표시
+    """
+    names = list(result.applied_credit.columns)
+    base = base or names[0]
+    out = pd.DataFrame({"company_id": inputs.company_ids}, index=inputs.index)
+    for name in names:
+        out[f"applied_{name}"] = result.applied_credit[name]
+    for name in names:
+        if name != base:
+            out[f"diff_{name}"] = result.applied_credit[name] - result.applied_credit[base]
+    if result.excluded.to_numpy().any():
+        for name in names:
+            out[f"excluded_{name}"] = result.excluded[name]
+    diffs = [f"diff_{n}" for n in names if n != base]
+    if diffs:
+        order = np.argsort(-out[diffs].abs().max(axis=1).to_numpy(), kind="stable")
+        out = out.iloc[order]
+    return out
+
+
+def _named_path(value: str) -> tuple:
+    name, sep, path = value.partition("=")
+    return (name, path) if sep else (value, value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="정책 변경 시 포트폴리오 재산정 (구·신 비교표)")
+    parser.add_argument("portfolio_csv", help="기업 목록 CSV (calc_portfolio 입력 형식)")
+    parser.add_argument("--base", required=True, help="기준 정책 JSON ([이름=]경로)")
+    parser.add_argument("--candidate", action="append", required=True, help="후보 정책 JSON ([이름=]경로, 여러 번 지정 가능)")
+    parser.add_argument("--exact", action="store_true", help="최저한세 한도를 정수 연산으로 계산")
+    parser.add_argument("--out", default="reprice_diff.csv", help="비교표 CSV 경로")
+    add_metrics_argument(parser)
+    args = parser.parse_args()
+
+    candidates: Dict[str, PolicyParameters] = {}
+    for value in [args.base] + args.candidate:
+        name, path = _named_path(value)
+        if name in candidates:
+            parser.error(f"후보 이름이 중복되었습니다: {name}")
+        try:
+            candidates[name] = load_params_from_json(path)
+        except PolicyValidationError as e:
+            parser.error(f"{path}: {e}")
+
+    df = fill_company_sizes(fill_regions(pd.read_csv(args.portfolio_csv, dtype=CSV_DTYPES)))
+    inputs = derive_inputs(df)
+    result = reprice(inputs, candidates, exact=args.exact)
+    base = next(iter(candidates))
+    table = diff_table(inputs, result, base)
+    table.to_csv(args.out, index=False, encoding="utf-8-sig")
+
+    totals: List[str] = [f"{name} {int(result.applied_credit[name].sum()):,}원" for name in candidates]
+    print(f"재산정: {len(inputs.index):,}개사 (입력 오류 {inputs.errors['row'].nunique():,}개사 제외)")
+    print("적용 공제액 합계: " + " / ".join(totals))
+    print(f"비교표: {args.out}")
+    dump_metrics(args.metrics_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+다년 인원 시계열(기업 × 연도 2차원 배열)로 모든 연속 연도의 공제액을 한 번에 계산
+
+HeadcountInputs는 직전·당해 인원 한 쌍만 담으므로 10년 이력이면 앞 연도를 되풀이하는 객체 9개를
+손으로 만들어야 했습니다. 이 모듈은 기업 × 연도 배열을 그대로 받아 한 칸 민 배열끼리의 차로
+연도별 증가 인원을 구하고, 열(연도)마다 그 해의 정책을 적용해 공제액·유지기간을 한 번에 돌려줍니다.
+
+- 증가 인원: max(0, totals[:, 1:] - totals[:, :-1]) (청년등도 같은 방식)
+- 연도별 정책: 연도 j 열에는 policies에서 j 이하 가장 최근 연도의 정책을 적용
+  (정책별로 컴파일한 단가표를 (연도, 규모, 지역) 배열로 쌓아 인덱싱 한 번으로 조회)
+- 빈 값(NaN): 직전·당해 중 하나라도 전체 인원 또는 청년등 인원이 비어 있으면 그 연도는 계산하지 않음(valid=False)
+  (청년등 빈 값을 0으로 채우면 없던 청년 증가가 생기므로)
+- 결과는 calc_gross_credit → apply_caps_and_min_tax를 연도별로 부른 것과 같습니다.
+
+사용 예)
+    totals = np.array([[50, 60, 58, 70], [10, 12, 15, 15]])
+    youth  = np.array([[10, 14, 14, 20], [ 2,  2,  4,  5]])
+    res = calc_series(totals, youth, [2021, 2022, 2023, 2024], policies, sizes=["중소기업", "중견기업"],
+                      regions=["지방", "수도권"])
+    res.applied_credit   # (2, 3) — 2022, 2023, 2024년 적용 공제액
+    res.to_frame(["A001", "A002"])
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from employment_tax_credit_calc import PolicyParameters
+from employment_tax_credit_batch import (
+    REGION_VALUES, SIZE_VALUES, CompiledPolicy, compile_policy, excluded_industry_mask, floor_mul_div,
+)
+
+
+@dataclass
+class SeriesResult:
+    """
+    연도별 결과 (행 = 기업, 열 = years; 모두 (기업 수, 연도 수 - 1) 배열)
+    - years: 계산한 연도 (입력 연도의 두 번째부터)
+    - policy_years: 열마다 적용한 정책 연도
+    - valid: 직전·당해 전체 인원이 모두 있어 계산한 칸 (False인 칸의 금액은 0)
+    - retention_end: 유지기간 마지막 연도 (= 연도 + 유지기간)
+    """
+    years: np.ndarray
+    policy_years: np.ndarray
+    increase_total: np.ndarray
+    increase_youth: np.ndarray
+    gross_credit: np.ndarray
+    applied_credit: np.ndarray
+    retention_years: np.ndarray
+    retention_end: np.ndarray
+    valid: np.ndarray
+
+    def to_frame(self, company_ids: Optional[Sequence] = None) -> pd.DataFrame:
+        """계산한 칸만 (company_id, year, ...) 긴 형식 DataFrame으로 펼침"""
+        n, y = self.valid.shape
+        ids = np.asarray(company_ids if company_ids is not None else np.arange(n), dtype=object)
+        rows, cols = np.nonzero(self.valid)
+        return pd.DataFrame({
+            "company_id": ids[rows],
+            "year": self.years[cols],
+            "policy_year": self.policy_years[cols],
+            "increase_total": self.increase_total[rows, cols],
+            "increase_youth": self.increase_youth[rows, cols],
+            "gross_credit": self.gross_credit[rows, cols],
+            "applied_credit": self.applied_credit[rows, cols],
+            "retention_years": self.retention_years[rows, cols],
+            "retention_end": self.retention_end[rows, cols],
+        })
+
+
+def policy_for_years(years: Sequence[int], policies: Mapping[int, PolicyParameters]) -> np.ndarray:
+    """연도 목록 -> 연도별로 적용할 정책 연도 (해당 연도 이하에서 가장 최근, 없으면 ValueError)"""
+    available = np.array(sorted(int(y) for y in policies), dtype=np.int64)
+    years = np.asarray(years, dtype=np.int64)
+    pos = np.searchsorted(available, years, side="right") - 1
+    if (pos < 0).any():
+        first = int(years[pos < 0][0])
+        raise ValueError(f"{first}년에 적용할 정책이 없습니다 (가장 이른 정책: {available[0] if len(available) else '없음'})")
+    return available[pos]
+
+
+def _per_company_or_year(values, shape: Tuple[int, int], categories: Sequence[str]) -> np.ndarray:
+    """기업별(1차원) 또는 기업×연도별(2차원) 범주 값 -> (기업, 연도) 코드 배열 (알 수 없는 값은 -1)"""
+    arr = np.asarray(values, dtype=object)
+    arr = np.vectorize(lambda v: getattr(v, "value", v), otypes=[object])(arr) if arr.size else arr
+    codes = pd.Categorical(arr.ravel(), categories=list(categories)).codes.astype(np.int64).reshape(arr.shape)
+    if codes.ndim == 1:
+        codes = np.broadcast_to(codes[:, None], shape)
+    if codes.shape != shape:
+        raise ValueError(f"배열 크기가 맞지 않습니다: {codes.shape} (기대: {shape})")
+    return codes
+
+
+def _matrix(values, shape: Tuple[int, int], default: float) -> np.ndarray:
+    if values is None:
+        return np.full(shape, default, dtype="float64")
+    arr = np.asarray(values, dtype="float64")
+    if arr.shape != shape:
+        raise ValueError(f"배열 크기가 맞지 않습니다: {arr.shape} (기대: {shape})")
+    return np.where(np.isnan(arr), default, arr)
+
+
+def calc_series(
+    totals,
+    youth,
+    years: Sequence[int],
+    policies: Mapping[int, PolicyParameters],
+    sizes,
+    regions,
+    converted_regular=None,
+    returned_from_parental_leave=None,
+    tax_before_credit=None,
+    industry_codes=None,
+    exact: bool = False,
+) -> SeriesResult:
+    """
+    기업 × 연도 인원 시계열 -> 두 번째 연도부터 모든 연도의 공제액·유지기간
+    - totals / youth: (기업, 연도) 배열 (youth는 None이면 0, 빈 값 NaN이 있는 연도 쌍은 계산하지 않음)
+    - years: 열 연도 (연속 연도여야 함, 1개 이하면 모든 결과가 (기업 수, 0) 빈 배열)
+    - sizes / regions: 기업별 1차원 또는 (기업, 연도) 2차원 — "중소기업"/CompanySize 등
+    - converted_regular / returned_from_parental_leave / tax_before_credit: (기업, 연도) 배열 (선택)
+      tax_before_credit의 빈 값은 최저한세 미적용
+    - industry_codes: 기업별 업종 코드 (선택) — 그 해 정책의 제외 업종이면 공제액 0
+    - exact=True: 최저한세 한도를 정수 연산으로 계산
+    """
+    years = np.asarray(years, dtype=np.int64)
+    totals = np.asarray(totals, dtype="float64")
+    if totals.ndim != 2 or totals.shape[1] != len(years):
+        raise ValueError(f"totals는 (기업 수, {len(years)}) 배열이어야 합니다 (현재: {totals.shape})")
+    if len(years) > 1 and (np.diff(years) != 1).any():
+        raise ValueError("years는 1년 간격의 연속 연도여야 합니다")
+    shape = totals.shape
+    if shape[1] < 2:  # 연도 쌍이 없으면 (기업 수, 0) 빈 결과
+        empty = np.zeros((shape[0], 0), dtype=np.int64)
+        return SeriesResult(
+            years=years[1:], policy_years=np.zeros(0, dtype=np.int64),
+            increase_total=empty, increase_youth=empty.copy(), gross_credit=empty.copy(),
+            applied_credit=empty.copy(), retention_years=empty.copy(), retention_end=empty.copy(),
+            valid=np.zeros((shape[0], 0), dtype=bool),
+        )
+    youth = _matrix(youth, shape, np.nan) if youth is not None else np.zeros(shape)
+
+    # 당해 열 기준 (기업, 연도-1) 배열
+    cur = (slice(None), slice(1, None))
+    step = (shape[0], shape[1] - 1)
+    valid = ~np.isnan(totals[:, 1:]) & ~np.isnan(totals[:, :-1])
+    valid &= ~np.isnan(youth[:, 1:]) & ~np.isnan(youth[:, :-1])
+    filled = np.where(np.isnan(totals), 0, totals).astype(np.int64)
+    youth = np.where(np.isnan(youth), 0, youth).astype(np.int64)
+    increase_total = np.where(valid, np.maximum(0, filled[:, 1:] - filled[:, :-1]), 0)
+    increase_youth = np.where(valid, np.maximum(0, youth[:, 1:] - youth[:, :-1]), 0)
+    converted = _matrix(converted_regular, shape, 0.0).astype(np.int64)[cur]
+    returned = _matrix(returned_from_parental_leave, shape, 0.0).astype(np.int64)[cur]
+    tax = _matrix(tax_before_credit, shape, -1.0).astype(np.int64)[cur]
+
+    size_idx = _per_company_or_year(sizes, shape, SIZE_VALUES)[cur]
+    region_idx = _per_company_or_year(regions, shape, REGION_VALUES)[cur]
+    valid &= (size_idx >= 0) & (region_idx >= 0)
+    size_idx = np.maximum(size_idx, 0)
+    region_idx = np.maximum(region_idx, 0)
+
+    # 정책 연도별로 한 번씩 컴파일해 (열, 규모, 지역) 단가표로 쌓음
+    policy_years = policy_for_years(years[1:], policies)
+    compiled: Dict[int, CompiledPolicy] = {int(y): compile_policy(policies[int(y)]) for y in np.unique(policy_years)}
+    per_col = [compiled[int(y)] for y in policy_years]
+    col = np.broadcast_to(np.arange(step[1])[None, :], step)
+    basic = np.stack([c.basic for c in per_col])[col, size_idx, region_idx]
+    youth_unit = np.stack([c.youth for c in per_col])[col, size_idx, region_idx]
+    conversion = np.array([c.conversion for c in per_col], dtype=np.int64)
+    parental = np.array([c.parental for c in per_col], dtype=np.int64)
+
+    gross = np.maximum(0, increase_total * basic + increase_youth * youth_unit + converted * conversion + returned * parental)
+    gross = np.where(valid, gross, 0)
+
+    applied = gross.copy()
+    cap = np.array([c.max_credit_total if c.max_credit_total is not None else -1 for c in per_col], dtype=np.int64)
+    applied = np.where(cap >= 0, np.minimum(applied, cap), applied)
+    has_rate = np.array([c.min_tax_limit_rate is not None for c in per_col])
+    if has_rate.any():
+        if exact:
+            num = np.array([c.min_tax_rate_num or 0 for c in per_col], dtype=np.int64)
+            den = np.array([c.min_tax_rate_den or 1 for c in per_col], dtype=np.int64)
+            limit = floor_mul_div(tax, num, den)
+        else:
+            rate = np.array([c.min_tax_limit_rate or 0.0 for c in per_col], dtype="float64")
+            limit = np.floor(rate * tax.astype(np.float64)).astype(np.int64)
+        applied = np.where(has_rate & (tax >= 0), np.minimum(applied, limit), applied)
+    applied = np.maximum(0, applied)
+
+    if industry_codes is not None:
+        codes = pd.Series(np.asarray(industry_codes, dtype=object))
+        for y, c in compiled.items():
+            if c.industry_index is None:
+                continue
+            excluded = excluded_industry_mask(codes, c.industry_index)[:, None] & (policy_years == y)[None, :]
+            gross = np.where(excluded, 0, gross)
+            applied = np.where(excluded, 0, applied)
+
+    retention = np.where(valid, np.stack([c.retention for c in per_col])[col, size_idx], 0)
+    return SeriesResult(
+        years=years[1:],
+        policy_years=policy_years,
+        increase_total=increase_total,
+        increase_youth=increase_youth,
+        gross_credit=gross,
+        applied_credit=applied,
+        retention_years=retention,
+        retention_end=np.where(valid, years[1:][None, :] + retention, 0),
+        valid=valid,
+    )
+
+
+def series_from_history(
+    history: pd.DataFrame,
+    years: Optional[Sequence[int]] = None,
+) -> Tuple[np.ndarray, Dict[str, np.ndarray], np.ndarray]:
+    """
+    연도별 긴 형식 이력(company_id, year, total, youth, ...) -> (기업 ID, {열: (기업, 연도) 배열}, 연도)
+    - 없는 기업·연도 칸은 NaN, years를 주지 않으면 최소~최대 연도 전체
+    - 숫자 열(total, youth, converted_regular, returned_from_parental_leave, tax_before_credit)만 펼침
+    """
+    if years is None:
+        years = np.arange(int(history["year"].min()), int(history["year"].max()) + 1)
+    years = np.asarray(years, dtype=np.int64)
+    columns = [
+        c for c in ("total", "youth", "converted_regular", "returned_from_parental_leave", "tax_before_credit")
+        if c in history.columns
+    ]
+    wide = history.pivot_table(index="company_id", columns="year", values=columns, aggfunc="last")
+    ids = wide.index.to_numpy()
+    arrays = {c: wide[c].reindex(columns=years).to_numpy(dtype="float64") for c in columns}
+    return ids, arrays, years
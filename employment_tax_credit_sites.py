@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+사업장이 여러 곳인 기업: 사업장별 지역 단가로 증가 인원 공제액 계산
+
+calc_gross_credit은 회사 전체 증가 인원에 Region 하나의 단가를 적용하지만, 수도권과 지방에 사업장이 함께 있는
+기업은 증가 인원을 사업장에 나누어 각 사업장 지역의 per_head_basic / per_head_youth 단가로 계산해야 합니다.
+이 모듈은 (기업, 사업장, 연도) 긴 형식 표를 받아 그룹 집계로 전체를 한 번에 계산합니다.
+
+계산 순서 (기업·연도마다, 전체 인원과 청년등 인원 각각)
+1. 사업장별 증감 = 당해 - 직전 (사업장이 새로 생기거나 없어진 연도는 없는 쪽을 0명으로 봄)
+2. 회사 전체 증가 인원 = max(0, 당해 합계 - 직전 합계)  — 공제 대상 인원의 상한
+3. 전체 증가 인원을 증가한 사업장(증감 > 0)에 배분
+   - non_capital_first(기본): 지방 사업장의 증가분부터 채우고 남은 인원을 수도권 사업장에 배분
+     (수도권 밖 증가 인원은 회사 전체 증가 인원을 한도로 인정)
+   - proportional: 사업장별 증가분 비율로 배분 (누적 정수 배분이라 합계가 전체 증가 인원과 정확히 같음)
+4. 사업장 공제액 = 배분 인원 × 그 사업장 지역 단가, 기업 공제액 = 사업장 합계
+   (정규직 전환·육아휴직 복귀, 총한도·최저한세는 회사 단위이므로 여기서 다루지 않음)
+
+입력 열: company_id, site_id, year, total, youth(선택), company_size,
+         region(없거나 빈 값이면 district_code / address로 판정)
+직전 연도 자료가 하나도 없는 기업·연도는 계산하지 않습니다.
+youth 열은 있는데 값이 비었거나 정수가 아닌 사업장 행은 errors에 보고하고, 그 행의 연도를 당해 또는 직전으로
+쓰는 기업·연도는 계산하지 않습니다 (0명으로 보면 없던 청년 증가가 생기므로).
+
+사용 예)
+    result = calc_sites(sites_df, {2023: params_2023, 2024: params_2024})
+    result.companies   # 기업·연도별 증가 인원과 headcount_credit
+    result.sites       # 사업장별 배분 인원과 공제액
+    result.errors      # 청년등 인원이 비었거나 잘못된 사업장 행
+
+    python employment_tax_credit_sites.py sites.csv --policy policy.json --out site_credits.csv
+"""
+
+from __future__ import annotations
+import argparse
+from dataclasses import dataclass
+from typing import Mapping, Union
+
+import numpy as np
+import pandas as pd
+
+from employment_tax_credit_calc import PolicyParameters, PolicyValidationError, Region, load_params_from_json
+from employment_tax_credit_batch import (
+    CSV_DTYPES, REGION_VALUES, RULE_MISSING, RULE_NOT_INTEGER, SIZE_VALUES, _int_column, compile_policy,
+)
+from employment_tax_credit_region import fill_regions
+from employment_tax_credit_series import policy_for_years
+
+
+ALLOCATIONS = ("non_capital_first", "proportional")
+SITE_KEYS = ["company_id", "site_id", "year"]
+_GROUP = ["company_id", "year"]
+REQUIRED_COLUMNS = ("company_id", "site_id", "year", "total", "company_size", "region")
+
+
+@dataclass
+class SiteResult:
+    """
+    - companies: company_id, year, policy_year, company_size, prev_total, curr_total, prev_youth, curr_youth,
+                 increase_total, increase_youth, headcount_credit
+    - sites: company_id, site_id, year, region, prev_total, curr_total, prev_youth, curr_youth,
+             allocated_total, allocated_youth, site_credit
+    - errors: company_id, site_id, year, field, rule — 청년등 인원이 비었거나(missing) 정수가 아닌(not_integer)
+              사업장 행 (해당 기업의 그 연도·다음 연도는 companies / sites에서 제외)
+    """
+    companies: pd.DataFrame
+    sites: pd.DataFrame
+    errors: pd.DataFrame
+
+
+def _pairs(sites: pd.DataFrame) -> pd.DataFrame:
+    """사업장·연도 행 -> 직전 연도 값을 붙인 행 (한쪽만 있는 사업장은 0명, 직전 자료가 없는 기업·연도는 제외)"""
+    cols = ["total", "youth"]
+    agg = sites.groupby(SITE_KEYS, sort=False).agg(
+        total=("total", "sum"), youth=("youth", "sum"), region=("region", "last"), company_size=("company_size", "last"),
+    ).reset_index()
+    prev = agg.assign(year=agg["year"] + 1)
+    merged = agg.merge(prev, on=SITE_KEYS, how="outer", suffixes=("", "_prev"), indicator=True)
+    for c in cols:
+        merged[f"curr_{c}"] = merged.pop(c).fillna(0).astype(np.int64)
+        merged[f"prev_{c}"] = merged.pop(f"{c}_prev").fillna(0).astype(np.int64)
+    merged["region"] = merged["region"].fillna(merged.pop("region_prev"))
+    merged["company_size"] = merged["company_size"].fillna(merged.pop("company_size_prev"))
+
+    # 기업 단위로 당해·직전 자료가 모두 있는 연도만
+    has_curr = merged["_merge"].ne("right_only")
+    has_prev = merged["_merge"].ne("left_only")
+    keys = [merged[k] for k in _GROUP]
+    keep = has_curr.groupby(keys).transform("any") & has_prev.groupby(keys).transform("any")
+    return merged.loc[keep.to_numpy()].drop(columns="_merge").reset_index(drop=True)
+
+
+def _allocate(df: pd.DataFrame, curr: str, prev: str, method: str) -> np.ndarray:
+    """
+    기업·연도별 전체 증가 인원을 사업장에 정수로 배분 (df는 기업·연도·배분 순서로 정렬되어 있어야 함)
+    - 증가한 사업장만 받고, 사업장 배분은 그 사업장 증가분을 넘지 않음
+    """
+    keys = [df[k] for k in _GROUP]
+    gain = np.maximum(0, df[curr].to_numpy() - df[prev].to_numpy())
+    net = df[curr].groupby(keys).transform("sum").to_numpy() - df[prev].groupby(keys).transform("sum").to_numpy()
+    increase = np.maximum(0, net)
+    cum = pd.Series(gain, index=df.index).groupby(keys).cumsum().to_numpy()
+    if method == "non_capital_first":
+        return np.clip(increase - (cum - gain), 0, gain)
+    # proportional: floor(I * 누적증가 / 전체증가)의 차 — 합계가 정확히 I
+    total_gain = pd.Series(gain, index=df.index).groupby(keys).transform("sum").to_numpy()
+    denom = np.maximum(total_gain, 1)
+    return increase * cum // denom - increase * (cum - gain) // denom
+
+
+def calc_sites(
+    sites: pd.DataFrame,
+    policies: Union[PolicyParameters, Mapping[int, PolicyParameters]],
+    allocation: str = "non_capital_first",
+) -> SiteResult:
+    """
+    (기업, 사업장, 연도) 표 -> 사업장별 지역 단가를 적용한 기업·연도별 증가 인원 공제액
+    - policies: 정책 하나 또는 {연도: 정책} (연도별로 그 연도 이하 가장 최근 정책 적용)
+    - allocation: "non_capital_first"(기본) / "proportional"
+    - 필수 열이 없거나 규모·지역 값이 잘못되면 ValueError
+    """
+    if allocation not in ALLOCATIONS:
+        raise ValueError(f"allocation은 {ALLOCATIONS} 중 하나여야 합니다: {allocation!r}")
+    df = fill_regions(sites)
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"사업장 표에 필요한 열이 없습니다: {missing}")
+    if "youth" not in df.columns:
+        df = df.assign(youth=0)
+    youth, blank_youth, bad_youth = _int_column(df["youth"])
+    df = df.assign(
+        year=pd.to_numeric(df["year"], errors="raise").astype(np.int64),
+        total=pd.to_numeric(df["total"], errors="raise").astype(np.int64),
+        youth=youth,
+        company_size=df["company_size"].map(lambda v: getattr(v, "value", v)),
+        region=df["region"].map(lambda v: getattr(v, "value", v)),
+    )
+
+    # 청년등 인원이 빈(잘못된) 사업장 행 -> 오류표, 그 기업·연도를 당해나 직전으로 쓰는 쌍은 계산에서 제외
+    invalid = blank_youth | bad_youth
+    errors = pd.DataFrame({
+        "company_id": df.loc[invalid, "company_id"].to_numpy(),
+        "site_id": df.loc[invalid, "site_id"].to_numpy(),
+        "year": df.loc[invalid, "year"].to_numpy(),
+        "field": "youth",
+        "rule": np.where(blank_youth[invalid], RULE_MISSING, RULE_NOT_INTEGER),
+    })
+    pairs = _pairs(df)
+    if invalid.any():
+        bad_keys = pd.MultiIndex.from_frame(errors[_GROUP].drop_duplicates())
+        hit = (
+            pd.MultiIndex.from_arrays([pairs["company_id"], pairs["year"]]).isin(bad_keys)
+            | pd.MultiIndex.from_arrays([pairs["company_id"], pairs["year"] - 1]).isin(bad_keys)
+        )
+        pairs = pairs.loc[~hit].reset_index(drop=True)
+    size_idx = pd.Categorical(pairs["company_size"], categories=SIZE_VALUES).codes.astype(np.int64)
+    region_idx = pd.Categorical(pairs["region"], categories=REGION_VALUES).codes.astype(np.int64)
+    bad = (size_idx < 0) | (region_idx < 0)
+    if bad.any():
+        row = pairs.loc[bad].iloc[0]
+        raise ValueError(
+            f"기업규모·지역 값을 확인하세요: company_id={row['company_id']}, site_id={row['site_id']}, "
+            f"year={row['year']} ({row['company_size']!r}, {row['region']!r})"
+        )
+
+    # 배분 순서: 기업·연도 안에서 지방 사업장 먼저 (proportional은 순서와 무관하게 합계가 같음)
+    non_capital = (region_idx == REGION_VALUES.index(Region.NON_METRO.value)).astype(np.int64)
+    order = np.lexsort((pairs["site_id"].astype(str).to_numpy(), -non_capital, pairs["year"].to_numpy(),
+                        pairs["company_id"].astype(str).to_numpy()))
+    pairs = pairs.iloc[order].reset_index(drop=True)
+    size_idx, region_idx = size_idx[order], region_idx[order]
+    pairs["allocated_total"] = _allocate(pairs, "curr_total", "prev_total", allocation)
+    pairs["allocated_youth"] = _allocate(pairs, "curr_youth", "prev_youth", allocation)
+
+    # 연도별 정책 단가표를 (정책, 규모, 지역)으로 쌓아 한 번에 조회
+    if isinstance(policies, PolicyParameters):
+        policies = {int(pairs["year"].min()) if len(pairs) else 0: policies}
+    years = pairs["year"].to_numpy()
+    policy_year = policy_for_years(years, policies) if len(pairs) else np.zeros(0, dtype=np.int64)
+    unique_years, policy_pos = np.unique(policy_year, return_inverse=True)
+    compiled = [compile_policy(policies[int(y)]) for y in unique_years]
+    basic = np.stack([c.basic for c in compiled])[policy_pos, size_idx, region_idx] if compiled else np.zeros(0, np.int64)
+    youth = np.stack([c.youth for c in compiled])[policy_pos, size_idx, region_idx] if compiled else np.zeros(0, np.int64)
+    pairs["site_credit"] = pairs["allocated_total"] * basic + pairs["allocated_youth"] * youth
+    pairs["policy_year"] = policy_year
+
+    companies = pairs.groupby(_GROUP, sort=True).agg(
+        policy_year=("policy_year", "first"),
+        company_size=("company_size", "first"),
+        prev_total=("prev_total", "sum"), curr_total=("curr_total", "sum"),
+        prev_youth=("prev_youth", "sum"), curr_youth=("curr_youth", "sum"),
+        increase_total=("allocated_total", "sum"), increase_youth=("allocated_youth", "sum"),
+        headcount_credit=("site_credit", "sum"),
+    ).reset_index()
+    site_columns = [
+        "company_id", "site_id", "year", "region", "prev_total", "curr_total", "prev_youth", "curr_youth",
+        "allocated_total", "allocated_youth", "site_credit",
+    ]
+    return SiteResult(companies=companies, sites=pairs[site_columns], errors=errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="사업장별 지역 단가로 증가 인원 공제액 계산")
+    parser.add_argument("sites_csv", help="(company_id, site_id, year, total, youth, company_size, region) CSV")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--policy", help="정책 JSON (모든 연도에 적용)")
+    source.add_argument("--policy-dir", help="연도별 정책 JSON 폴더 (파일명에 연도 4자리)")
+    parser.add_argument("--allocation", choices=ALLOCATIONS, default="non_capital_first", help="증가 인원 배분 방식")
+    parser.add_argument("--out", default="site_credits.csv", help="기업·연도별 결과 CSV 경로")
+    parser.add_argument("--sites-out", help="사업장별 배분 결과 CSV 경로 (선택)")
+    args = parser.parse_args()
+
+    try:
+        if args.policy:
+            policies = load_params_from_json(args.policy)
+        else:
+            from employment_tax_credit_backfill import load_policy_dir
+            policies = load_policy_dir(args.policy_dir)
+    except PolicyValidationError as e:
+        parser.error(str(e))
+
+    sites = pd.read_csv(args.sites_csv, dtype={**CSV_DTYPES, "site_id": str})
+    try:
+        result = calc_sites(sites, policies, allocation=args.allocation)
+    except ValueError as e:
+        parser.error(str(e))
+    result.companies.to_csv(args.out, index=False, encoding="utf-8-sig")
+    if args.sites_out:
+        result.sites.to_csv(args.sites_out, index=False, encoding="utf-8-sig")
+    print(f"계산: {result.companies['company_id'].nunique():,}개사 · {len(result.companies):,}개 기업·연도 "
+          f"(사업장 {len(result.sites[['company_id', 'site_id']].drop_duplicates()):,}곳)")
+    print(f"증가 인원 공제액 합계: {int(result.companies['headcount_credit'].sum()):,}원")
+    if len(result.errors):
+        print(f"청년등 인원 오류로 제외: 사업장 행 {len(result.errors):,}건 "
+              f"(기업·연도 {len(result.errors[_GROUP].drop_duplicates()):,}개)")
+    print(f"결과: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
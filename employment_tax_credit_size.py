@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+재무·인원 자료 -> 기업규모(중소기업/중견기업/대기업) 판정
+
+기업규모는 1인당 공제액(per_head_basic/per_head_youth)과 유지기간을 모두 좌우하지만, 지금까지는 사용자가
+직접 골랐습니다. 이 모듈은 정책 JSON 옆에 두는 기준표(company_size_thresholds.json)로 매출액·자산총액·
+상시근로자 수·관계기업 자료에서 규모를 판정합니다.
+
+판정 규칙 (기준표 1개 버전 기준, 금액은 원)
+- 상호출자제한기업집단 소속(large_group=True) -> 대기업
+  (large_group 값은 parse_flags로 해석: true/1/y/예 등 -> True, false/0/n/아니오·빈 값 -> False,
+   그 밖의 값은 판정하지 않음(NaN) — 검증 단계에서 company_size 누락 오류)
+- 판정 금액 = 자기 금액 + 관계기업 합산분(affiliate_revenue / affiliate_assets, 없으면 0)
+  (상시근로자 수도 affiliate_headcount를 더함 — employment_tax_credit_affiliates.fill_affiliates가 채움)
+- 중소기업: 매출액 ≤ 업종(표준산업분류 중분류 2자리)별 상한 그리고 자산총액 < sme.assets_below
+            (sme.headcount_below가 있으면 상시근로자 수도 미만이어야 함)
+- 중견기업: 중소기업이 아니고 매출액 < midsize.revenue_below 그리고 자산총액 < midsize.assets_below
+- 그 밖에는 대기업. 매출액·자산총액이 비어 있으면 판정하지 않음(NaN)
+
+기준표 파일 형식: {"적용 시작 연도": {"sme": {...}, "midsize": {...}}, ...}
+- 연도 y의 기준은 y 이하에서 가장 최근 버전을 사용하고, 버전별로 컴파일한 표를 캐시합니다.
+  (법령 개정 시 새 연도 항목만 추가하면 이전 연도 판정은 그대로 유지)
+- 가장 이른 버전보다 앞선 연도의 행은 판정하지 않음(NaN)
+
+포트폴리오 입력 열
+- revenue, assets (필수: 둘 중 하나라도 없으면 판정 생략), industry_code, headcount(없으면 curr_total),
+  affiliate_revenue, affiliate_assets, affiliate_headcount, large_group, tax_year(행별 기준 연도, 없으면 year 인자)
+
+사용 예)
+    df = fill_company_sizes(df, year=2024)   # company_size가 빈 행만 채움
+"""
+
+from __future__ import annotations
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from employment_tax_credit_calc import CompanySize
+
+
+DEFAULT_THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "company_size_thresholds.json")
+
+FINANCIAL_COLUMNS = ("revenue", "assets")
+
+# 예/아니오 열(large_group 등)로 인식하는 값 (소문자·앞뒤 공백 제거 후 비교, 빈 값은 False)
+FLAG_TRUE_VALUES = frozenset({"true", "t", "1", "1.0", "y", "yes", "o", "예", "네", "해당"})
+FLAG_FALSE_VALUES = frozenset({"false", "f", "0", "0.0", "n", "no", "x", "아니오", "아니요", "해당없음", ""})
+
+
+def parse_flags(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    예/아니오 열 -> (bool 배열, 알 수 없는 값 mask)
+    - bool·0/1 숫자·문자열(FLAG_TRUE_VALUES / FLAG_FALSE_VALUES)만 인식하고, 빈 값은 False
+    - "False"·"N" 같은 문자열을 astype(bool)로 바꾸면 모두 True가 되므로 값을 직접 대조
+    """
+    text = values.astype("string").str.strip().str.lower()
+    present = text.notna().to_numpy()
+    flag = text.isin(FLAG_TRUE_VALUES).to_numpy(dtype=bool)
+    unknown = present & ~flag & ~text.isin(FLAG_FALSE_VALUES).to_numpy(dtype=bool)
+    return flag, unknown
+
+
+@dataclass(frozen=True)
+class SizeThresholds:
+    """
+    기준표 1개 버전을 배열로 펼친 것
+    - version: 적용 시작 연도
+    - sme_revenue_max[division]: 중분류(00~99)별 중소기업 매출액 상한 (이하)
+    """
+    version: int
+    sme_revenue_max: np.ndarray
+    sme_assets_below: int
+    sme_headcount_below: Optional[int]
+    midsize_revenue_below: int
+    midsize_assets_below: int
+
+    @classmethod
+    def from_config(cls, version: int, cfg: dict) -> "SizeThresholds":
+        try:
+            sme, mid = cfg["sme"], cfg["midsize"]
+            revenue_max = np.full(100, int(sme["revenue_max_default"]), dtype=np.int64)
+            for division, limit in (sme.get("revenue_max_by_division") or {}).items():
+                revenue_max[int(division)] = int(limit)
+            return cls(
+                version=version,
+                sme_revenue_max=revenue_max,
+                sme_assets_below=int(sme["assets_below"]),
+                sme_headcount_below=(int(sme["headcount_below"]) if sme.get("headcount_below") is not None else None),
+                midsize_revenue_below=int(mid["revenue_below"]),
+                midsize_assets_below=int(mid["assets_below"]),
+            )
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            raise ValueError(f"기업규모 기준표({version}년) 형식 오류: {e!r}") from None
+
+
+@lru_cache(maxsize=8)
+def _read_versions(path: str, stamp: Tuple[int, int]) -> Dict[int, dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    return {int(year): cfg for year, cfg in raw.items()}
+
+
+@lru_cache(maxsize=64)
+def _compiled(path: str, stamp: Tuple[int, int], version: int) -> SizeThresholds:
+    return SizeThresholds.from_config(version, _read_versions(path, stamp)[version])
+
+
+def _find_thresholds(year: Optional[int], path: str) -> Tuple[Optional[SizeThresholds], list]:
+    """연도 -> (적용할 기준표 또는 None, 전체 버전 목록). 파일 (수정시각, 크기)와 버전별로 캐시"""
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    versions = sorted(_read_versions(path, stamp))
+    eligible = [v for v in versions if year is None or v <= int(year)]
+    return (_compiled(path, stamp, eligible[-1]) if eligible else None), versions
+
+
+def first_threshold_year(path: str = DEFAULT_THRESHOLDS_PATH) -> Optional[int]:
+    """기준표의 가장 이른 적용 시작 연도 (버전이 없으면 None) — 이보다 앞선 연도는 규모를 판정하지 않음"""
+    _, versions = _find_thresholds(None, path)
+    return versions[0] if versions else None
+
+
+def load_size_thresholds(year: Optional[int] = None, path: str = DEFAULT_THRESHOLDS_PATH) -> SizeThresholds:
+    """
+    연도 -> 그 연도에 적용할 기준표 (year 이하에서 가장 최근 버전, year가 없으면 최신 버전)
+    - 파일 (수정시각, 크기)와 버전별로 캐시하므로 파일을 고치면 다음 호출부터 반영됩니다.
+    - 가장 이른 버전보다 앞선 연도는 ValueError (여러 행을 판정하는 classify_sizes는 해당 행만 NaN)
+    """
+    table, versions = _find_thresholds(year, path)
+    if table is None:
+        raise ValueError(f"{year}년에 적용할 기업규모 기준표가 없습니다 (가장 이른 버전: {versions[0] if versions else '없음'})")
+    return table
+
+
+def _divisions(codes: pd.Series) -> np.ndarray:
+    """업종 코드 -> 중분류 번호 (영문 대분류 문자는 무시, 알 수 없으면 -1)"""
+    digits = (
+        codes.astype("string").str.replace(r"[\s.\-]", "", regex=True)
+        .str.upper().str.lstrip("ABCDEFGHIJKLMNOPQRSTU")
+    )
+    division = pd.to_numeric(digits.str[:2].where(digits.str.len() >= 2), errors="coerce")
+    return division.fillna(-1).to_numpy(dtype=np.int64)
+
+
+def _amount(df: pd.DataFrame, column: str, default: Optional[float] = None) -> np.ndarray:
+    if column not in df.columns:
+        return np.full(len(df), np.nan if default is None else default, dtype="float64")
+    values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    return values if default is None else np.where(np.isnan(values), default, values)
+
+
+def classify_with(df: pd.DataFrame, table: SizeThresholds) -> np.ndarray:
+    """기준표 1개로 전체 행을 판정 -> 규모 값("중소기업"/"중견기업"/"대기업") 또는 NaN (object 배열)"""
+    n = len(df)
+    revenue = _amount(df, "revenue") + _amount(df, "affiliate_revenue", 0.0)
+    assets = _amount(df, "assets") + _amount(df, "affiliate_assets", 0.0)
+    headcount = _amount(df, "headcount") if "headcount" in df.columns else _amount(df, "curr_total")
+    headcount = headcount + _amount(df, "affiliate_headcount", 0.0)
+    large_group, unknown_flag = (
+        parse_flags(df["large_group"]) if "large_group" in df.columns
+        else (np.zeros(n, dtype=bool), np.zeros(n, dtype=bool))
+    )
+    division = _divisions(df["industry_code"]) if "industry_code" in df.columns else np.full(n, -1, dtype=np.int64)
+    # 업종을 모르면 가장 엄격한 상한을 적용 (중소기업으로 과대 판정하지 않도록)
+    revenue_max = np.where(
+        division >= 0, table.sme_revenue_max[np.clip(division, 0, 99)], table.sme_revenue_max.min()
+    )
+
+    known = ~np.isnan(revenue) & ~np.isnan(assets)
+    sme = known & (revenue <= revenue_max) & (assets < table.sme_assets_below)
+    if table.sme_headcount_below is not None:
+        sme &= ~(headcount >= table.sme_headcount_below)
+    midsize = known & ~sme & (revenue < table.midsize_revenue_below) & (assets < table.midsize_assets_below)
+    sme &= ~large_group
+    midsize &= ~large_group
+
+    out = np.full(n, np.nan, dtype=object)
+    out[known | large_group] = CompanySize.LARGE.value
+    out[midsize] = CompanySize.MIDSIZE.value
+    out[sme] = CompanySize.SME.value
+    out[unknown_flag] = np.nan  # large_group 값을 알 수 없으면 판정하지 않음
+    return out
+
+
+def classify_sizes(
+    df: pd.DataFrame,
+    year: Optional[int] = None,
+    path: str = DEFAULT_THRESHOLDS_PATH,
+) -> pd.Series:
+    """
+    포트폴리오 -> 행별 기업규모 값 열 (판정 불가는 NaN)
+    - tax_year 열이 있으면 행마다 해당 연도의 기준표를 쓰고(빈 값은 year), 연도별로 한 번에 판정합니다.
+    - 적용할 기준표가 없는 연도(가장 이른 버전 이전)의 행은 NaN -> 검증 단계의 행별 company_size 누락 오류
+      (한 행 때문에 전체 판정이 실패하지 않도록)
+    """
+    def _classify(rows: pd.DataFrame, y: Optional[int]) -> np.ndarray:
+        table, _ = _find_thresholds(y, path)
+        return classify_with(rows, table) if table is not None else np.full(len(rows), np.nan, dtype=object)
+
+    if "tax_year" not in df.columns:
+        return pd.Series(_classify(df, year), index=df.index, dtype=object)
+    years = pd.to_numeric(df["tax_year"], errors="coerce")
+    if year is not None:
+        years = years.fillna(year)
+    out = np.full(len(df), np.nan, dtype=object)
+    keys = years.fillna(-1).to_numpy(dtype=np.int64)
+    for y in np.unique(keys).tolist():
+        rows = keys == y
+        out[rows] = _classify(df[rows], None if y < 0 else y)
+    return pd.Series(out, index=df.index, dtype=object)
+
+
+def classify_size(
+    revenue: float,
+    assets: float,
+    industry_code: Optional[str] = None,
+    headcount: Optional[int] = None,
+    affiliate_revenue: float = 0,
+    affiliate_assets: float = 0,
+    large_group: bool = False,
+    year: Optional[int] = None,
+) -> CompanySize:
+    """단건 판정 (classify_sizes와 같은 규칙)"""
+    row = pd.DataFrame([{
+        "revenue": revenue, "assets": assets, "industry_code": industry_code, "headcount": headcount,
+        "affiliate_revenue": affiliate_revenue, "affiliate_assets": affiliate_assets, "large_group": large_group,
+    }])
+    return CompanySize(classify_with(row, load_size_thresholds(year))[0])
+
+
+def fill_company_sizes(
+    df: pd.DataFrame,
+    year: Optional[int] = None,
+    path: str = DEFAULT_THRESHOLDS_PATH,
+) -> pd.DataFrame:
+    """
+    company_size 열이 없거나 빈 행을 재무 자료로 판정해 채운 DataFrame을 반환 (입력은 변경하지 않음)
+    - revenue / assets 열이 없으면 그대로 반환, 판정되지 않은 행은 빈 값(검증 단계에서 누락 오류)
+    """
+    if not all(c in df.columns for c in FINANCIAL_COLUMNS):
+        return df
+    current = (
+        df["company_size"] if "company_size" in df.columns
+        else pd.Series(np.nan, index=df.index, dtype=object)
+    )
+    todo = current.isna().to_numpy()
+    if not todo.any():
+        return df
+    filled = current.astype(object).copy()
+    filled[todo] = classify_sizes(df.loc[todo], year, path).to_numpy()
+    return df.assign(company_size=filled)
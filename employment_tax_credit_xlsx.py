@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+고객 인원 엑셀(.xlsx) 스트리밍 가져오기 -> 묶음별 포트폴리오 계산
+
+고객사는 인원 자료를 엑셀 통합문서로 보내오지만, 지금까지 앱은 손으로 입력한 값만 받았습니다.
+이 모듈은 openpyxl 읽기 전용 모드(read_only=True)로 시트를 한 행씩 읽어 머리글을 HeadcountInputs 필드명에
+맞추고, chunk_size 행씩 DataFrame으로 묶어 일괄 계산(calc_portfolio)에 넘깁니다.
+셀 객체 전체를 메모리에 올리지 않으므로 수십만 행 통합문서도 메모리 사용량이 chunk_size에 비례합니다.
+
+- 머리글 찾기: 첫 header_scan행 안에서 prev_total·curr_total 열이 모두 보이는 첫 행을 머리글로 봅니다
+  (제목·작성일 같은 윗줄이 있어도 됨). 한글 머리글은 COLUMN_ALIASES로 필드명에 대응시키고,
+  공백·괄호 안 단위("(명)")·끝의 "수"는 무시합니다. 대응되지 않는 열은 읽지 않습니다.
+- 사후관리 인원: "사후1년차", "사후2년차" ... (또는 followup_1 ...) 열을 순서대로 모아 followup_totals 리스트로 만듭니다.
+- 행 번호: DataFrame index와 오류표의 row는 엑셀 행 번호(1부터)입니다. 빈 행은 건너뜁니다.
+- 문자열 열(company_id, industry_code 등)은 숫자 셀이어도 문자열로 바꿉니다 (엑셀이 앞자리 0을 지운 코드는 복구 불가).
+- 시트 크기 정보(dimension)가 틀린 파일이 많아 reset_dimensions() 후 실제 셀 끝까지 읽습니다.
+
+사용 예)
+    for df, result in iter_xlsx_results("clients.xlsx", params):
+        ...                                              # 묶음별 결과 (입력 행 순서)
+
+    python employment_tax_credit_xlsx.py clients.xlsx --params-json policy.json --out results.ndjson
+"""
+
+from __future__ import annotations
+import argparse
+import io
+import re
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from employment_tax_credit_calc import PolicyParameters, PolicyValidationError, load_params_from_json
+from employment_tax_credit_batch import CompiledPolicy, PortfolioResult, calc_portfolio, compile_policy
+from employment_tax_credit_ndjson import DEFAULT_CHUNK_SIZE, dumps_line, portfolio_records
+from employment_tax_credit_region import fill_regions
+from employment_tax_credit_size import fill_company_sizes
+from employment_tax_credit_metrics import BATCH_ROWS, BATCH_SECONDS, add_metrics_argument, dump_metrics
+
+
+DEFAULT_HEADER_SCAN = 20
+HEADER_REQUIRED = ("prev_total", "curr_total")
+# 숫자 셀이어도 문자열로 읽을 열 (CSV_DTYPES와 같은 이유 + 범주형 열)
+TEXT_COLUMNS = ("company_id", "name", "company_size", "region", "district_code", "address", "industry_code")
+
+# 정규화한 머리글 -> 필드명 (필드명 자체도 정규화해서 함께 등록)
+COLUMN_ALIASES: Dict[str, str] = {
+    "기업코드": "company_id", "회사코드": "company_id", "고객코드": "company_id",
+    "사업자번호": "company_id", "사업자등록번호": "company_id",
+    "기업명": "name", "회사명": "name", "법인명": "name", "상호": "name",
+    "기업규모": "company_size", "규모": "company_size",
+    "지역": "region", "소재지역": "region", "수도권지방": "region",
+    "행정구역코드": "district_code", "법정동코드": "district_code",
+    "주소": "address", "사업장주소": "address", "소재지": "address",
+    "직전연도상시근로자": "prev_total", "직전상시근로자": "prev_total", "전년도상시근로자": "prev_total",
+    "직전연도인원": "prev_total",
+    "당해연도상시근로자": "curr_total", "당해상시근로자": "curr_total", "당년도상시근로자": "curr_total",
+    "당해연도인원": "curr_total",
+    "직전연도청년": "prev_youth", "직전연도청년등": "prev_youth", "직전연도청년등상시근로자": "prev_youth",
+    "당해연도청년": "curr_youth", "당해연도청년등": "curr_youth", "당해연도청년등상시근로자": "curr_youth",
+    "정규직전환": "converted_regular", "정규직전환인원": "converted_regular",
+    "육아휴직복귀": "returned_from_parental_leave", "육아휴직복귀인원": "returned_from_parental_leave",
+    "returnedparental": "returned_from_parental_leave",
+    "산출세액": "tax_before_credit", "공제전세액": "tax_before_credit", "세액공제전세액": "tax_before_credit",
+    "업종코드": "industry_code", "표준산업분류코드": "industry_code", "산업분류코드": "industry_code",
+    "매출액": "revenue", "평균매출액": "revenue", "자산총액": "assets",
+    "과세연도": "tax_year", "사업연도": "tax_year",
+}
+for _field in (
+    "company_id", "name", "company_size", "region", "district_code", "address",
+    "prev_total", "curr_total", "prev_youth", "curr_youth", "converted_regular", "returned_from_parental_leave",
+    "tax_before_credit", "industry_code", "revenue", "assets", "tax_year", "headcount", "large_group",
+):
+    COLUMN_ALIASES.setdefault(_field.replace("_", ""), _field)
+
+_FOLLOWUP = re.compile(r"^(?:followup|사후)(\d+)(?:년차|년)?(?:상시근로자|인원)?$")
+
+
+def _normalize_header(value) -> str:
+    text = re.sub(r"\(.*?\)|\[.*?\]", "", str(value))
+    text = re.sub(r"[\s_·./\-]", "", text).lower()
+    return text[:-1] if text.endswith("수") and len(text) > 1 else text
+
+
+def map_header(cells) -> Tuple[Dict[int, str], List[Tuple[int, int]]]:
+    """
+    머리글 행 -> ({열 위치: 필드명}, [(사후 연차, 열 위치), ...])
+    - 같은 필드로 대응되는 열이 여럿이면 앞의 열을 사용
+    """
+    fields: Dict[int, str] = {}
+    followup: List[Tuple[int, int]] = []
+    seen = set()
+    for pos, cell in enumerate(cells):
+        if cell is None:
+            continue
+        key = _normalize_header(cell)
+        m = _FOLLOWUP.match(key)
+        if m:
+            followup.append((int(m.group(1)), pos))
+            continue
+        field = COLUMN_ALIASES.get(key)
+        if field is not None and field not in seen:
+            fields[pos] = field
+            seen.add(field)
+    return fields, sorted(followup)
+
+
+def _text(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+
+def _number(value):
+    if isinstance(value, str):  # "1,200" 같은 텍스트 숫자 셀
+        value = value.replace(",", "").strip()
+        return value or None
+    return value
+
+
+def _open_workbook(source: Union[str, bytes, io.IOBase]):
+    from openpyxl import load_workbook
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return load_workbook(source, read_only=True, data_only=True)
+
+
+def iter_xlsx_chunks(
+    source: Union[str, bytes, io.IOBase],
+    sheet: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    header_scan: int = DEFAULT_HEADER_SCAN,
+) -> Iterator[pd.DataFrame]:
+    """
+    .xlsx (경로 / 바이트 / 파일 객체) -> chunk_size 행씩 DataFrame (index = 엑셀 행 번호)
+    - sheet: 시트 이름 (기본: 활성 시트)
+    - 머리글을 찾지 못하면 ValueError
+    """
+    wb = _open_workbook(source)
+    try:
+        if sheet is not None and sheet not in wb.sheetnames:
+            raise ValueError(f"시트를 찾을 수 없습니다: {sheet} (있는 시트: {', '.join(wb.sheetnames)})")
+        ws = wb[sheet] if sheet is not None else wb.active
+        ws.reset_dimensions()
+        rows = ws.iter_rows(values_only=True)
+
+        fields: Dict[int, str] = {}
+        followup: List[Tuple[int, int]] = []
+        rowno = 0
+        for cells in rows:
+            rowno += 1
+            fields, followup = map_header(cells)
+            if all(f in fields.values() for f in HEADER_REQUIRED):
+                break
+            if rowno >= header_scan:
+                break
+        if not all(f in fields.values() for f in HEADER_REQUIRED):
+            raise ValueError(
+                f"첫 {header_scan}행에서 머리글을 찾지 못했습니다 "
+                f"(직전연도·당해연도 상시근로자 수 열이 필요합니다: {', '.join(HEADER_REQUIRED)})"
+            )
+
+        positions = list(fields)
+        names = [fields[p] for p in positions]
+        follow_pos = [p for _, p in followup]
+        width = max(positions + follow_pos) + 1
+        index: List[int] = []
+        records: List[list] = []
+
+        def _frame() -> pd.DataFrame:
+            df = pd.DataFrame.from_records(records, columns=names + (["followup_totals"] if follow_pos else []))
+            df.index = pd.Index(index, name="row")
+            for column in names:
+                if column in TEXT_COLUMNS:
+                    df[column] = df[column].map(_text).astype(object)
+                else:
+                    df[column] = df[column].map(_number)
+            index.clear()
+            records.clear()
+            return df
+
+        for cells in rows:
+            rowno += 1
+            if len(cells) < width:
+                cells = tuple(cells) + (None,) * (width - len(cells))
+            rec = [cells[p] for p in positions]
+            followups = [cells[p] for p in follow_pos]
+            if all(v is None or (isinstance(v, str) and not v.strip()) for v in rec + followups):
+                continue
+            if follow_pos:
+                # 뒤쪽 빈 연차는 아직 도래하지 않은 연도로 보고 잘라냄
+                while followups and followups[-1] is None:
+                    followups.pop()
+                rec.append([_number(v) for v in followups])
+            index.append(rowno)
+            records.append(rec)
+            if len(records) >= chunk_size:
+                yield _frame()
+        if records:
+            yield _frame()
+    finally:
+        wb.close()  # 읽기 전용 모드는 파일 핸들을 열어 둠
+
+
+def read_xlsx(
+    source: Union[str, bytes, io.IOBase],
+    sheet: Optional[str] = None,
+    header_scan: int = DEFAULT_HEADER_SCAN,
+) -> pd.DataFrame:
+    """.xlsx 전체 -> DataFrame (앱 화면용: 읽기는 스트리밍, 결과 프레임만 메모리에 보관)"""
+    chunks = list(iter_xlsx_chunks(source, sheet, chunk_size=50_000, header_scan=header_scan))
+    if not chunks:
+        return pd.DataFrame(columns=list(HEADER_REQUIRED), index=pd.Index([], name="row"))
+    return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+
+def iter_xlsx_results(
+    source: Union[str, bytes, io.IOBase],
+    params: PolicyParameters,
+    clawback_method: str = "proportional",
+    tiered_thresholds: Optional[Dict[str, float]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    sheet: Optional[str] = None,
+    cache=None,
+    compiled: Optional[CompiledPolicy] = None,
+    exact: bool = False,
+) -> Iterator[Tuple[pd.DataFrame, PortfolioResult]]:
+    """
+    .xlsx -> 묶음별 (입력 DataFrame, PortfolioResult)
+    - 지역·기업규모 자동 판정(fill_regions / fill_company_sizes) 후 calc_portfolio로 계산
+    - 필수 열 누락 같은 구조 오류는 첫 묶음에서 ValueError로 올라옵니다.
+    """
+    compiled = compiled or compile_policy(params)
+    for df in iter_xlsx_chunks(source, sheet, chunk_size):
+        df = fill_company_sizes(fill_regions(df))
+        yield df, calc_portfolio(df, params, compiled, clawback_method, tiered_thresholds, cache=cache, exact=exact)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="고객 인원 엑셀(.xlsx) 스트리밍 가져오기 + 일괄 계산")
+    parser.add_argument("workbook", help="고객 인원 통합문서 (.xlsx)")
+    parser.add_argument("--params-json", required=True, help="법령 단가·기간 설정 JSON 경로")
+    parser.add_argument("--sheet", default=None, help="시트 이름 (기본: 활성 시트)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="한 번에 모아 계산할 행 수")
+    parser.add_argument("--clawback-method", choices=["proportional", "all_or_nothing", "tiered"], default="proportional")
+    parser.add_argument("--exact", action="store_true", help="최저한세·추징액을 정수 연산으로 계산")
+    parser.add_argument("--out", default="-", help="결과 JSON Lines 경로 (기본: 표준출력)")
+    add_metrics_argument(parser)
+    args = parser.parse_args()
+    start = time.perf_counter()
+
+    try:
+        params = load_params_from_json(args.params_json)
+    except PolicyValidationError as e:
+        parser.error(str(e))
+
+    out = sys.stdout.buffer if args.out == "-" else open(args.out, "wb")
+    ok = failed = 0
+    try:
+        results = iter_xlsx_results(
+            args.workbook, params, args.clawback_method, chunk_size=max(1, args.chunk_size),
+            sheet=args.sheet, exact=args.exact,
+        )
+        for df, result in results:
+            for row, rec in zip(df.index.tolist(), portfolio_records(df, result)):
+                out.write(dumps_line({"row": row, **rec}))
+            failed += result.errors["row"].nunique()
+            ok += len(result.results)
+            out.flush()
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+    BATCH_ROWS.labels(job="xlsx_import", outcome="ok").inc(ok)
+    BATCH_ROWS.labels(job="xlsx_import", outcome="error").inc(failed)
+    BATCH_SECONDS.labels(job="xlsx_import").observe(time.perf_counter() - start)
+    print(f"엑셀 {ok + failed:,}행 계산: 완료 {ok:,} / 오류·제외 {failed:,}", file=sys.stderr)
+    dump_metrics(args.metrics_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import json
+
+import streamlit as st
+
+from employment_tax_credit_calc import calc_gross_credit, apply_caps_and_min_tax, calc_clawback, params_to_dict
+from employment_tax_credit_report import build_result_record
+from app_shared import policy_sidebar, company_sidebar, clawback_method_select, headcount_inputs
+
+st.set_page_config(page_title="통합고용세액공제 계산기", layout="wide")
+
+st.title("통합고용세액공제 계산기 (조특법 §29조의8)")
+st.caption("파라미터(JSON)만 바꾸면 연도별 법령 단가/요건을 반영할 수 있습니다.")
+
+with st.sidebar:
+    params = policy_sidebar("1) 정책 파라미터 불러오기")
+
+    st.divider()
+    size, region = company_sidebar("2) 기업 정보")
+
+    st.divider()
+    st.header("3) 사후관리 옵션")
+    clawback_method = clawback_method_select()
+    clawback_year_index = st.number_input(
+        "사후관리 연차 (1부터 유지기간 이내)",
+        min_value=1, value=1, step=1,
+        help="공제연도로부터 몇 년차인지 입력 (예: 1년차)"
+    )
+
+heads, tax_before_credit = headcount_inputs()
+
+st.divider()
+run = st.button("계산하기", type="primary", disabled=(params is None))
+
+if run:
+    if params is None:
+        st.error("파라미터(JSON)를 먼저 불러오세요.")
+    else:
+        gross = calc_gross_credit(size, region, heads, params)
+        applied = apply_caps_and_min_tax(gross, params, tax_before_credit=tax_before_credit)
+        retention_years = params.retention_years[size]
+
+        st.subheader("① 공제액 계산 결과")
+        st.metric("총공제액 (최저한세/한도 적용 전)", f"{gross:,} 원")
+        st.metric("적용 공제액 (최저한세/한도 적용 후)", f"{applied:,} 원")
+        st.write(f"유지기간(사후관리 대상): **{retention_years}년**")
+
+        st.subheader("② 사후관리(추징) 시뮬레이션")
+        followup = st.number_input(
+            "사후관리 연도 말 상시근로자 수",
+            min_value=0, value=max(0, heads.curr_total - 3), step=1,
+            help="감소 인원에 따라 추징세액이 달라집니다."
+        )
+        clawback = calc_clawback(
+            credit_applied=applied,
+            base_headcount_at_credit=heads.curr_total,
+            headcount_in_followup_year=int(followup),
+            retention_years_for_company=retention_years,
+            year_index_from_credit=int(clawback_year_index),
+            method=clawback_method,
+            tiers=params.clawback_tiers,
+        )
+        st.metric("추징세액", f"{clawback:,} 원")
+        st.caption("※ 감소율·방식(비례/전액/구간)에 따라 상이합니다.")
+
+        st.subheader("③ 세부 입력/출력 JSON 내려받기")
+        schedule = [{"연차": int(clawback_year_index), "사후연도 인원": int(followup), "추징세액": int(clawback)}]
+        payload = build_result_record(
+            size, region, heads, tax_before_credit, clawback_method,
+            gross, applied, retention_years, schedule,
+        )
+        st.download_button(
+            label="JSON 다운로드",
+            file_name="tax_credit_result.json",
+            mime="application/json",
+            data=json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+        )
+
+        with st.expander("참고: 사용 중인 정책 파라미터 보기"):
+            st.code(json.dumps(params_to_dict(params), ensure_ascii=False, indent=2), language="json")
+
+else:
+    st.info("좌측에서 파라미터(JSON)를 불러오고, 인원을 입력한 뒤 **계산하기**를 눌러주세요.")
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import streamlit as st
+
+from employment_tax_credit_calc import calc_gross_credit, apply_caps_and_min_tax, params_to_dict
+from employment_tax_credit_report import (
+    XLSX_MIME, build_result_record, render_workbook, result_json_bytes, workbook_file_name,
+)
+from app_shared import (
+    policy_sidebar, report_options_sidebar, company_sidebar, clawback_method_select, headcount_inputs,
+    clawback_schedule_frame, memprof_session, memprof_panel,
+)
+
+st.set_page_config(page_title="통합고용세액공제 계산기 (Pro)", layout="wide")
+
+st.title("통합고용세액공제 계산기 · Pro (조특법 §29조의8)")
+st.caption("결과를 엑셀로 내보낼 때 로고/머리글, 통화 서식, 다년 추징표까지 포함합니다. 로고는 메모리에서 직접 삽입합니다(임시파일X).")
+
+# 진단 모드: 정책 불러오기(캐시에 없을 때)부터 보고서 생성까지 한 세션으로 측정
+with memprof_session() as prof:
+    with st.sidebar:
+        params = policy_sidebar("1) 정책 파라미터")
+        company_name, logo_png = report_options_sidebar("2) 보고서 옵션")
+
+        st.divider()
+        size, region = company_sidebar("3) 기업 정보")
+
+        st.divider()
+        st.header("4) 사후관리 옵션")
+        clawback_method = clawback_method_select()
+
+    heads, tax_before_credit = headcount_inputs()
+
+    st.divider()
+    run = st.button("계산하기", type="primary", disabled=(params is None))
+
+    if run:
+        # 계산 후에는 추징표 편집 등으로 재실행되어도 결과를 계속 표시
+        st.session_state.calculated = True
+
+    if run or st.session_state.get("calculated"):
+        if params is None:
+            st.error("파라미터(JSON)를 먼저 불러오세요.")
+        else:
+            gross = calc_gross_credit(size, region, heads, params)
+            applied = apply_caps_and_min_tax(gross, params, tax_before_credit=tax_before_credit)
+            retention_years = params.retention_years[size]
+
+            st.subheader("① 공제액 계산 결과")
+            st.metric("총공제액 (최저한세/한도 적용 전)", f"{gross:,} 원")
+            st.metric("적용 공제액 (최저한세/한도 적용 후)", f"{applied:,} 원")
+            st.write(f"유지기간(사후관리 대상): **{retention_years}년**")
+
+            # 다년 추징표 입력/계산
+            st.subheader("② 사후관리(추징) 시뮬레이션 - 다년표")
+            init_rows = [{"연차": yr, "사후연도 인원": max(0, heads.curr_total - yr)} for yr in range(1, int(retention_years) + 1)]
+            edited = st.data_editor(pd.DataFrame(init_rows), num_rows="dynamic")
+            # 추징표 계산 (열 단위 일괄 계산, 바뀐 행만 재계산)
+            schedule_df = clawback_schedule_frame(
+                edited, int(applied), heads.curr_total, int(retention_years), clawback_method, params.clawback_tiers,
+            )
+            schedule = schedule_df.to_dict("records")
+            st.dataframe(schedule_df, use_container_width=True)
+            total_clawback = int(schedule_df["추징세액"].sum())
+            st.metric("추징세액 합계", f"{total_clawback:,} 원")
+
+            # ③ JSON & 엑셀 다운로드
+            st.subheader("③ 결과 다운로드")
+            record = build_result_record(
+                size, region, heads, tax_before_credit, clawback_method,
+                gross, applied, retention_years, schedule,
+            )
+            st.download_button(
+                label="JSON 다운로드",
+                file_name="tax_credit_result.json",
+                mime="application/json",
+                data=result_json_bytes(record)
+            )
+            xlsx = render_workbook(record, params_to_dict(params), company_name, logo_png)
+            st.download_button(
+                label="엑셀 다운로드 (.xlsx, Pro 포맷)",
+                file_name=workbook_file_name(),
+                mime=XLSX_MIME,
+                data=xlsx,
+            )
+    else:
+        st.info("좌측에서 파라미터(JSON)를 불러오고, 인원을 입력한 뒤 **계산하기**를 눌러주세요.")
+
+memprof_panel(prof)
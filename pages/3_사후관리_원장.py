@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from employment_tax_credit_ledger import CREDIT_COLUMNS, HEADCOUNT_COLUMNS
+from app_shared import open_ledger, ledger_names, policy_sidebar, clawback_method_select
+
+st.set_page_config(page_title="통합고용세액공제 · 사후관리 원장", layout="wide")
+
+st.title("사후관리 원장")
+st.caption("공제연도 인원·적용 공제액과 연도 말 인원을 원장에 저장해 두고, 특정 연도의 추징세액을 전 고객에 대해 일괄 계산합니다.")
+
+with st.sidebar:
+    params = policy_sidebar("1) 정책 파라미터")
+
+    st.divider()
+    st.header("2) 원장 DB")
+    names = ledger_names()
+    NEW_LEDGER = "새 원장 만들기…"
+    choice = st.selectbox("원장", names + [NEW_LEDGER], index=names.index("client_ledger") if "client_ledger" in names else 0)
+    ledger_name = st.text_input("새 원장 이름", value="client_ledger") if choice == NEW_LEDGER else choice
+    try:
+        ledger = open_ledger(ledger_name.strip())
+    except ValueError as e:
+        st.error(str(e))
+        st.stop()
+
+    st.divider()
+    st.header("3) 원장 가져오기 (CSV)")
+    credits_file = st.file_uploader(f"공제 내역 ({', '.join(CREDIT_COLUMNS)})", type=["csv"])
+    heads_file = st.file_uploader(f"연도 말 인원 ({', '.join(HEADCOUNT_COLUMNS)})", type=["csv"])
+    if st.button("원장에 저장", disabled=(credits_file is None and heads_file is None)):
+        try:
+            if credits_file is not None:
+                n = ledger.add_credits(pd.read_csv(credits_file, dtype={"company_id": str}))
+                st.success(f"공제 내역 {n:,}건 저장")
+            if heads_file is not None:
+                n = ledger.add_headcounts(pd.read_csv(heads_file, dtype={"company_id": str}))
+                st.success(f"연도 말 인원 {n:,}건 저장")
+        except Exception as e:
+            st.error(f"원장 저장 실패: {e}")
+
+    st.divider()
+    st.header("4) 사후관리 옵션")
+    clawback_method = clawback_method_select()
+
+year = st.number_input("사후관리 대상 연도", min_value=2000, max_value=2100, value=datetime.now().year - 1, step=1)
+result = ledger.clawbacks_for_year(
+    int(year), method=clawback_method, tiers=params.clawback_tiers if params is not None else None,
+)
+
+col1, col2, col3 = st.columns(3)
+col1.metric("유지기간이 열린 공제 건수", f"{len(result):,} 건")
+col2.metric("연도 말 인원 미입력", f"{int(result['followup_total'].isna().sum()):,} 건")
+col3.metric("추징세액 합계", f"{int(result['clawback'].sum()):,} 원")
+
+st.dataframe(result, use_container_width=True)
+st.download_button(
+    label="CSV 다운로드",
+    file_name=f"clawbacks_{int(year)}.csv",
+    mime="text/csv",
+    data=result.to_csv(index=False).encode("utf-8-sig"),
+)
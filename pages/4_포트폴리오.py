@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import io
+
+import pandas as pd
+import streamlit as st
+
+from employment_tax_credit_batch import ERROR_COLUMNS, RULE_EXCLUDED_INDUSTRY
+from employment_tax_credit_jobs import iter_portfolio_upload
+from employment_tax_credit_memprof import memory_stage
+from employment_tax_credit_ndjson import portfolio_records, write_ndjson
+from app_shared import policy_sidebar, clawback_method_select, memprof_session, memprof_panel
+
+PREVIEW_ROWS = 10_000  # 화면 표에 보여 줄 최대 행 수 (전체 결과는 다운로드 파일에)
+
+st.set_page_config(page_title="통합고용세액공제 · 포트폴리오 일괄 계산", layout="wide")
+
+st.title("포트폴리오 일괄 계산")
+st.caption("여러 기업의 인원 자료(CSV 또는 JSON Lines)를 한 번에 검증·계산합니다. 잘못된 행은 오류표로 모으고 나머지는 계속 계산합니다. 큰 파일·보고서 일괄 생성은 **백그라운드 작업** 페이지를 사용하세요.")
+
+with st.sidebar:
+    params = policy_sidebar("1) 정책 파라미터")
+
+    st.divider()
+    st.header("2) 사후관리 옵션")
+    clawback_method = clawback_method_select()
+
+uploaded = st.file_uploader(
+    "기업 목록 — CSV·JSON Lines·엑셀(.xlsx, 한글 머리글 가능) (company_id, company_size 또는 revenue/assets, region 또는 district_code/address, prev_total, curr_total, prev_youth, curr_youth, industry_code, ...)",
+    type=["csv", "ndjson", "jsonl", "xlsx"],
+)
+
+if uploaded is not None and params is not None:
+    # 기업별 결과를 묶음마다 한 줄씩 기록하고, 화면용으로는 오류표·합계·앞부분 행만 모음
+    buffer = io.BytesIO()
+    error_parts, preview_parts = [], []
+    n_rows = n_calculated = applied_total = preview_rows = 0
+    with memprof_session() as prof:
+        try:
+            for df, result in iter_portfolio_upload(uploaded.name, uploaded.getvalue(), params, clawback_method):
+                with memory_stage("ndjson_export"):
+                    write_ndjson(portfolio_records(df, result), buffer)
+                n_rows += len(df)
+                n_calculated += len(result.results)
+                applied_total += int(result.results["applied_credit"].sum())
+                error_parts.append(result.errors)
+                if preview_rows < PREVIEW_ROWS:
+                    preview_parts.append(df.iloc[:PREVIEW_ROWS - preview_rows].join(result.results, how="left"))
+                    preview_rows += len(preview_parts[-1])
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+
+    errors = pd.concat(error_parts, ignore_index=True) if error_parts else pd.DataFrame(columns=ERROR_COLUMNS)
+    excluded = errors["rule"] == RULE_EXCLUDED_INDUSTRY
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("계산 완료", f"{n_calculated:,} 개사")
+    col2.metric("제외 업종", f"{errors.loc[excluded, 'row'].nunique():,} 개사")
+    col3.metric("입력 오류", f"{errors.loc[~excluded, 'row'].nunique():,} 개사")
+    col4.metric("적용 공제액 합계", f"{applied_total:,} 원")
+
+    if len(errors):
+        st.subheader("입력 오류")
+        st.dataframe(errors, use_container_width=True)
+    st.subheader("계산 결과")
+    if n_rows > preview_rows:
+        st.caption(f"전체 {n_rows:,}행 중 앞 {preview_rows:,}행만 표시합니다. 전체 결과는 아래 파일로 내려받으세요.")
+    st.dataframe(pd.concat(preview_parts) if preview_parts else pd.DataFrame(), use_container_width=True)
+
+    st.download_button(
+        label="결과 다운로드 (JSON Lines)",
+        file_name="tax_credit_results.ndjson",
+        mime="application/x-ndjson",
+        data=buffer.getvalue(),
+    )
+    memprof_panel(prof)
+elif params is None:
+    st.info("좌측에서 파라미터(JSON)를 먼저 불러오세요.")
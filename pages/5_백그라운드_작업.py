@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import streamlit as st
+
+from employment_tax_credit_jobs import JOB_CANCELLED, JOB_DONE, JOB_FAILED, portfolio_job
+from app_shared import policy_sidebar, clawback_method_select, report_options_sidebar, job_runner, session_owner
+
+POLL_SECONDS = 1.0
+
+st.set_page_config(page_title="통합고용세액공제 · 백그라운드 작업", layout="wide")
+
+st.title("백그라운드 일괄 작업")
+st.caption(
+    "포트폴리오 계산과 기업별 엑셀 보고서 생성을 화면 밖에서 실행합니다. 위젯을 바꾸거나 다른 페이지로 가도 작업은 계속되며, "
+    "결과 파일은 만료 전까지 이 페이지에서 내려받을 수 있습니다."
+)
+
+runner = job_runner()
+owner = session_owner()
+
+with st.sidebar:
+    params = policy_sidebar("1) 정책 파라미터")
+
+    st.divider()
+    st.header("2) 사후관리 옵션")
+    clawback_method = clawback_method_select()
+
+    st.divider()
+    _, logo_png = report_options_sidebar("3) 보고서 옵션")  # 회사명은 기업별 보고서마다 각 기업명을 사용
+
+with st.form("submit_job", clear_on_submit=True):
+    uploaded = st.file_uploader(
+        "기업 목록 — CSV·JSON Lines·엑셀(.xlsx)",
+        type=["csv", "ndjson", "jsonl", "xlsx"],
+    )
+    render_reports = st.checkbox("기업별 엑셀 보고서도 생성 (zip)", value=False)
+    submitted = st.form_submit_button("작업 시작", type="primary", disabled=(params is None))
+
+if submitted:
+    if uploaded is None:
+        st.warning("기업 목록 파일을 선택하세요.")
+    else:
+        runner.submit(
+            portfolio_job, uploaded.getvalue(), uploaded.name, params, clawback_method,
+            render_reports=render_reports, logo_png=logo_png,
+            label=uploaded.name, owner=owner,
+        )
+elif params is None:
+    st.info("좌측에서 파라미터(JSON)를 먼저 불러오세요.")
+
+
+def _job_panel(job) -> None:
+    created = datetime.fromtimestamp(job.created).strftime("%H:%M:%S")
+    with st.container(border=True):
+        st.markdown(f"**{job.label}** · {created} · {job.stage}")
+        if job.active:
+            label = f"{job.done:,} / {job.total:,}" if job.total else f"{job.done:,}행" if job.done else job.stage
+            col1, col2 = st.columns([5, 1])
+            col1.progress(job.fraction, text=label)
+            if col2.button("취소", key=f"cancel_{job.id}"):
+                runner.cancel(job.id)
+            return
+        if job.status == JOB_FAILED:
+            st.error(job.error)
+        elif job.status == JOB_CANCELLED:
+            st.warning("취소된 작업입니다.")
+        elif job.status == JOB_DONE:
+            s = job.summary
+            st.write(
+                f"계산 완료 {s.get('calculated', 0):,}개사 · 오류·제외 {s.get('errors', 0):,}개사 · "
+                f"적용 공제액 합계 {s.get('applied_total', 0):,}원 ({job.finished - job.started:.1f}초)"
+            )
+            for k, artifact in enumerate(job.artifacts):
+                st.download_button(
+                    label=f"{artifact.name} 다운로드 ({len(artifact.data) / 1024:,.0f} KB)",
+                    data=artifact.data, file_name=artifact.name, mime=artifact.mime,
+                    key=f"download_{job.id}_{k}",
+                )
+
+
+def _jobs_view() -> None:
+    runner.purge_expired()
+    jobs = runner.jobs(owner)
+    if not jobs:
+        st.caption("이 세션에서 시작한 작업이 없습니다.")
+    for job in jobs:
+        _job_panel(job)
+    # 진행 중이던 작업이 모두 끝나면 전체를 한 번 재실행해 주기적 갱신을 멈춤
+    active = any(job.active for job in jobs)
+    if st.session_state.get("jobs_polling") and not active:
+        st.session_state.jobs_polling = False
+        st.rerun()
+
+
+st.subheader("작업 목록")
+st.caption(f"끝난 작업의 결과 파일은 {runner.ttl_seconds / 60:.0f}분 동안 보관됩니다.")
+polling = any(job.active for job in runner.jobs(owner))
+st.session_state.jobs_polling = polling
+# 진행 중인 작업이 있을 때만 이 부분만 주기적으로 다시 그림 (스크립트 전체는 재실행하지 않음)
+st.fragment(run_every=POLL_SECONDS if polling else None)(_jobs_view)()
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+통합고용세액공제 계산기 - 멀티페이지 앱 진입점
+
+실행: streamlit run streamlit_app.py
+- 기존 5개 변형 스크립트(app_streamlit_tax_credit*.py)의 기능을 pages/ 아래 페이지로 통합했습니다.
+- 정책 파라미터·로고·엑셀 서식은 app_shared의 프로세스 공유 캐시를 사용하므로
+  서버 프로세스 하나에서 한 번만 적재됩니다.
+"""
+import streamlit as st
+
+from app_shared import DEMO_POLICY_BYTES, load_policy
+
+st.set_page_config(page_title="통합고용세액공제 계산기", layout="wide")
+
+# 데모 파라미터를 미리 적재해 첫 페이지 진입 시 지연을 없앰 (프로세스당 1회)
+load_policy(DEMO_POLICY_BYTES)
+
+st.title("통합고용세액공제 계산기 (조특법 §29조의8)")
+st.caption("파라미터(JSON)만 바꾸면 연도별 법령 단가/요건을 반영할 수 있습니다.")
+
+st.markdown(
+    """
+왼쪽 메뉴에서 페이지를 선택하세요.
+
+- **기본 계산기**: 공제액과 단일 연차 추징세액을 계산하고 JSON으로 내려받습니다.
+- **Pro 보고서**: 다년 추징표를 편집하고, 로고·머리글·통화 서식이 적용된 엑셀 보고서를 내려받습니다.
+- **사후관리 원장**: 고객 원장(SQLite)에 저장된 공제 내역으로 특정 연도의 추징세액을 일괄 계산합니다.
+- **포트폴리오**: 여러 기업의 인원 자료를 한 번에 검증·계산하고 기업별 결과를 JSON Lines로 내려받습니다.
+- **백그라운드 작업**: 큰 포트폴리오 계산·기업별 엑셀 보고서 생성을 화면 밖에서 실행하고, 진행률을 보며 결과 파일을 내려받습니다.
+"""
+)